@@ -0,0 +1,307 @@
+--------------------------------------------------------------------------------
+-- Testbench replaying an exported configuration on a flow generator
+--
+-- The stimulus file is a flow configuration in the configuration file format
+-- (lines of 32 bits words, header parts ended by $ and data parts ended by #).
+-- Header parts are removed as the frame merger does, data parts are sent as
+-- parts of one frame, and the start word is sent after the configuration.
+-- Each generated word is written to the output file:
+-- data (hexadecimal), REM, SOF and EOF (1 if set).
+-- The simulation stops after FRAMES generated frames or MAX_CYCLES cycles.
+--
+-- Cases are exported and run by generator_testbench.py (configuration tool).
+--------------------------------------------------------------------------------
+LIBRARY ieee;
+USE ieee.std_logic_1164.ALL;
+USE ieee.numeric_std.ALL;
+USE std.textio.ALL;
+
+ENTITY tb_flow_vectors IS
+    GENERIC (
+        STIMULUS_FILE : string := "stimulus.txt";
+        OUTPUT_FILE : string := "output.txt";
+        FRAMES : integer := 1;
+        MAX_CYCLES : integer := 100000
+    );
+END tb_flow_vectors;
+
+ARCHITECTURE behavior OF tb_flow_vectors IS
+
+    -- Component Declaration for the Unit Under Test (UUT)
+
+    COMPONENT flow_generator
+    PORT(
+         CLK : IN  std_logic;
+         RESET : IN  std_logic;
+         RX_DATA : IN  std_logic_vector(63 downto 0);
+         RX_REM : IN  std_logic_vector(2 downto 0);
+         RX_SOF_N : IN  std_logic;
+         RX_EOF_N : IN  std_logic;
+         RX_SOP_N : IN  std_logic;
+         RX_EOP_N : IN  std_logic;
+         RX_SRC_RDY_N : IN  std_logic;
+         RX_DST_RDY_N : OUT  std_logic;
+         TX_DATA : OUT  std_logic_vector(63 downto 0);
+         TX_REM : OUT  std_logic_vector(2 downto 0);
+         TX_SOF_N : OUT  std_logic;
+         TX_EOF_N : OUT  std_logic;
+         TX_SOP_N : OUT  std_logic;
+         TX_EOP_N : OUT  std_logic;
+         TX_SRC_RDY_N : OUT  std_logic;
+         TX_DST_RDY_N : IN  std_logic;
+         RECONF : IN std_logic
+        );
+    END COMPONENT;
+
+
+   --Inputs
+   signal CLK : std_logic := '0';
+   signal RESET : std_logic := '0';
+   signal RX_DATA : std_logic_vector(63 downto 0) := (others => '0');
+   signal RX_REM : std_logic_vector(2 downto 0) := (others => '0');
+   signal RX_SOF_N : std_logic := '1';
+   signal RX_EOF_N : std_logic := '1';
+   signal RX_SOP_N : std_logic := '1';
+   signal RX_EOP_N : std_logic := '1';
+   signal RX_SRC_RDY_N : std_logic := '1';
+   signal TX_DST_RDY_N : std_logic := '0';
+
+ 	--Outputs
+   signal RX_DST_RDY_N : std_logic;
+   signal TX_DATA : std_logic_vector(63 downto 0);
+   signal TX_REM : std_logic_vector(2 downto 0);
+   signal TX_SOF_N : std_logic;
+   signal TX_EOF_N : std_logic;
+   signal TX_SOP_N : std_logic;
+   signal TX_EOP_N : std_logic;
+   signal TX_SRC_RDY_N : std_logic;
+
+   -- Set when the output has been recorded: stops the clock
+   signal done : boolean := false;
+
+   -- Clock period definitions
+   constant CLK_period : time := 10 ns;
+
+   -- Value of an hexadecimal digit
+   function hex_value(c : character) return std_logic_vector is
+   begin
+      case c is
+         when '0' => return "0000";
+         when '1' => return "0001";
+         when '2' => return "0010";
+         when '3' => return "0011";
+         when '4' => return "0100";
+         when '5' => return "0101";
+         when '6' => return "0110";
+         when '7' => return "0111";
+         when '8' => return "1000";
+         when '9' => return "1001";
+         when 'a' | 'A' => return "1010";
+         when 'b' | 'B' => return "1011";
+         when 'c' | 'C' => return "1100";
+         when 'd' | 'D' => return "1101";
+         when 'e' | 'E' => return "1110";
+         when 'f' | 'F' => return "1111";
+         when others => return "XXXX";
+      end case;
+   end function;
+
+   -- Hexadecimal digit of 4 bits
+   function hex_digit(value : std_logic_vector(3 downto 0)) return character is
+      constant DIGITS : string(1 to 16) := "0123456789ABCDEF";
+   begin
+      if is_x(value) then
+         return 'X';
+      end if;
+      return DIGITS(to_integer(unsigned(value)) + 1);
+   end function;
+
+   -- Output flag: 1 if the (active low) signal is set
+   function flag(value_n : std_logic) return character is
+   begin
+      if value_n = '0' then
+         return '1';
+      end if;
+      return '0';
+   end function;
+
+BEGIN
+
+	-- Instantiate the Unit Under Test (UUT)
+   uut: flow_generator PORT MAP (
+          CLK => CLK,
+          RESET => RESET,
+          RX_DATA => RX_DATA,
+          RX_REM => RX_REM,
+          RX_SOF_N => RX_SOF_N,
+          RX_EOF_N => RX_EOF_N,
+          RX_SOP_N => RX_SOP_N,
+          RX_EOP_N => RX_EOP_N,
+          RX_SRC_RDY_N => RX_SRC_RDY_N,
+          RX_DST_RDY_N => RX_DST_RDY_N,
+          TX_DATA => TX_DATA,
+          TX_REM => TX_REM,
+          TX_SOF_N => TX_SOF_N,
+          TX_EOF_N => TX_EOF_N,
+          TX_SOP_N => TX_SOP_N,
+          TX_EOP_N => TX_EOP_N,
+          TX_SRC_RDY_N => TX_SRC_RDY_N,
+          TX_DST_RDY_N => TX_DST_RDY_N,
+          RECONF => '0'
+        );
+
+   -- Clock process definitions
+   CLK_process :process
+   begin
+		if done then
+			wait;
+		end if;
+		CLK <= '0';
+		wait for CLK_period/2;
+		CLK <= '1';
+		wait for CLK_period/2;
+   end process;
+
+
+   -- Stimulus process
+   stim_proc: process
+      file stimulus : text open read_mode is STIMULUS_FILE;
+      -- Token kinds: 'W' for a 32 bits word, '$', '#', 'E' at the end of the file
+      variable kind : character;
+      variable low : std_logic_vector(31 downto 0);
+      variable high : std_logic_vector(31 downto 0);
+      variable current : std_logic_vector(63 downto 0);
+      variable last : boolean;
+      variable sof : std_logic;
+      variable sop : std_logic;
+
+      -- Read the next meaningful line of the stimulus file
+      procedure read_token(kind : out character; value : out std_logic_vector(31 downto 0)) is
+         variable l : line;
+         variable c : character;
+      begin
+         value := (others => '0');
+         loop
+            if endfile(stimulus) then
+               kind := 'E';
+               return;
+            end if;
+            readline(stimulus, l);
+            if l'length > 0 then
+               c := l(l'low);
+               if c = '$' or c = '#' then
+                  kind := c;
+                  return;
+               elsif c /= '-' then
+                  -- Missing digits are zeros, as read by the traffic_generator tool
+                  for i in 0 to 7 loop
+                     if i < l'length then
+                        value(31-4*i downto 28-4*i) := hex_value(l(l'low+i));
+                     end if;
+                  end loop;
+                  kind := 'W';
+                  return;
+               end if;
+            end if;
+         end loop;
+      end procedure;
+
+      -- Send one word and wait for it to be accepted (flags active high)
+      procedure send_word(data : std_logic_vector(63 downto 0); rem_value : std_logic_vector(2 downto 0); sof, eof, sop, eop : std_logic) is
+      begin
+         RX_DATA <= data;
+         RX_REM <= rem_value;
+         RX_SOF_N <= not sof;
+         RX_EOF_N <= not eof;
+         RX_SOP_N <= not sop;
+         RX_EOP_N <= not eop;
+         RX_SRC_RDY_N <= '0';
+         wait until rising_edge(CLK) and RX_DST_RDY_N = '0';
+      end procedure;
+   begin
+      RESET <= '1';
+      wait for 100 ns;
+      RESET <= '0';
+
+      wait for CLK_period*10;
+      wait until rising_edge(CLK);
+
+      sof := '1';
+      loop
+         -- Header part: the first bit tells if this is the last part of the flow
+         read_token(kind, low);
+         exit when kind = 'E';
+         last := low(0) = '1';
+         while kind /= '$' and kind /= 'E' loop
+            read_token(kind, low);
+         end loop;
+         -- Data part, with one word of look-ahead to find its end
+         read_token(kind, low);
+         read_token(kind, high);
+         current := high & low;
+         sop := '1';
+         loop
+            read_token(kind, low);
+            if kind /= 'W' then
+               if last then
+                  send_word(current, "111", sof, '1', sop, '1');
+               else
+                  send_word(current, "111", sof, '0', sop, '1');
+               end if;
+               exit;
+            end if;
+            read_token(kind, high);
+            send_word(current, "111", sof, '0', sop, '0');
+            current := high & low;
+            sof := '0';
+            sop := '0';
+         end loop;
+         if last then
+            sof := '1';
+         else
+            sof := '0';
+         end if;
+      end loop;
+
+      -- Start word
+      send_word((others => '0'), "000", '1', '1', '1', '1');
+      RX_SRC_RDY_N <= '1';
+
+      wait;
+   end process;
+
+   -- Output recording process
+   out_proc: process
+      file results : text open write_mode is OUTPUT_FILE;
+      variable l : line;
+      variable frames_sent : integer := 0;
+      variable cycles : integer := 0;
+   begin
+      loop
+         wait until rising_edge(CLK);
+         cycles := cycles + 1;
+         if TX_SRC_RDY_N = '0' and TX_DST_RDY_N = '0' then
+            for i in 15 downto 0 loop
+               write(l, hex_digit(TX_DATA(4*i+3 downto 4*i)));
+            end loop;
+            write(l, ' ');
+            write(l, hex_digit('0' & TX_REM));
+            write(l, ' ');
+            write(l, flag(TX_SOF_N));
+            write(l, ' ');
+            write(l, flag(TX_EOF_N));
+            writeline(results, l);
+            if TX_EOF_N = '0' then
+               frames_sent := frames_sent + 1;
+            end if;
+         end if;
+         exit when frames_sent >= FRAMES or cycles >= MAX_CYCLES;
+      end loop;
+      if frames_sent < FRAMES then
+         report "Timeout: " & integer'image(frames_sent) & " frames generated" severity warning;
+      end if;
+      done <= true;
+      wait;
+   end process;
+
+END;
@@ -0,0 +1,3 @@
+from .device import Device, ToolDevice, SimulatedDevice
+from .schedule import Schedule, Phase
+from .orchestrator import Orchestrator
\ No newline at end of file
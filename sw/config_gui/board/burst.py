@@ -0,0 +1,286 @@
+"""
+Compilation of burst and on/off traffic profiles. The Rate modifier
+only keeps a fixed gap between the frames of a flow, so a burst pattern
+is approximated either by several flow instances sending one frame each
+per period (bursts at the link rate, all sent by the board), or by a
+schedule with one phase per burst and idle delays between the phases
+(any burst rate, off times limited by the host).
+Plans predict the obtained pattern and its error, including the 8-byte
+granularity of the gaps.
+"""
+
+from config_editor import Hardware, CompiledConfig
+from config_editor.skeleton import resizeFlow
+from config_editor.modifiers.rate import gapFromRate, rateFromGap, MIN_GAP, MAX_RATE
+from .meter import LINK_BYTE_RATE
+from .schedule import Schedule, Phase
+
+# Gaps are counted in words of the bus: each actual gap may be up to
+# WORD_SIZE - 1 bytes longer or shorter, only the average is exact (see rate.vhd)
+WORD_SIZE = 8
+# Usual time to reset, configure and start a board between two phases (s)
+SWITCH_TIME = 1e-3
+# Approximation strategies
+STRATEGIES = ["instances", "phases"]
+
+def formatTime(seconds):
+	"""
+	Human-readable duration
+	"""
+	for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+		if abs(seconds) >= scale:
+			return "%.3f %s" % (seconds / scale, unit)
+	return "%.1f ns" % (seconds * 1e9)
+
+class BurstSpec:
+	"""
+	Requested burst pattern: bursts of burstSize frames sent at burstRate,
+	separated by offTime. The off time may be given by the duty cycle
+	(on time / period) instead.
+	"""
+
+	def __init__(self, burstSize, burstRate = MAX_RATE, offTime = None, dutyCycle = None, bursts = 1):
+		"""
+		burstSize: frames per burst
+		burstRate: rate during a burst (Mb/s, as the Rate modifier)
+		offTime: idle time between bursts (s)
+		dutyCycle: fraction of the period spent sending (0 to 1)
+		bursts: number of bursts
+		"""
+		if burstSize < 1 or bursts < 1:
+			raise ValueError("the burst size and number of bursts should be at least 1")
+		if burstRate < 1 or burstRate > MAX_RATE:
+			raise ValueError("the burst rate should be between 1 and " + str(MAX_RATE) + " Mb/s")
+		if (offTime is None) == (dutyCycle is None):
+			raise ValueError("set either the off time or the duty cycle")
+		if offTime is not None and offTime < 0:
+			raise ValueError("the off time may not be negative")
+		if dutyCycle is not None and not 0 < dutyCycle <= 1:
+			raise ValueError("the duty cycle should be between 0 and 1")
+		self.burstSize = burstSize
+		self.burstRate = burstRate
+		self.offTime = offTime
+		self.dutyCycle = dutyCycle
+		self.bursts = bursts
+
+	def pattern(self, frameSize):
+		"""
+		Exact requested pattern for a frame size (bytes):
+		dictionnary of burst size, burst rate, on and off times, period and duty cycle
+		"""
+		# Bytes used by each frame on the link at the burst rate (see gapFromRate)
+		slot = (frameSize + 1 + MIN_GAP) * MAX_RATE / self.burstRate
+		onTime = self.burstSize * slot / LINK_BYTE_RATE
+		offTime = self.offTime if self.offTime is not None else onTime * (1 - self.dutyCycle) / self.dutyCycle
+		return patternOf(self.burstSize, self.burstRate, onTime, offTime)
+
+def patternOf(burstSize, burstRate, onTime, offTime):
+	"""
+	Pattern dictionnary (see BurstSpec.pattern)
+	"""
+	return {
+		"burst_size": burstSize,
+		"burst_rate": burstRate,
+		"on_time": onTime,
+		"off_time": offTime,
+		"period": onTime + offTime,
+		"duty_cycle": onTime / (onTime + offTime)
+	}
+
+class BurstPlan:
+	"""
+	Approximation of a burst pattern by one strategy
+	"""
+
+	# Compared quantities: key, name, is a time
+	QUANTITIES = [("burst_size", "burst size", False), ("burst_rate", "burst rate (Mb/s)", False), ("on_time", "on time", True), ("off_time", "off time", True), ("period", "period", True), ("duty_cycle", "duty cycle", False)]
+
+	def __init__(self, strategy, spec, frameSize, instances, gap, iterations, predicted, requested, switchTime = 0):
+		"""
+		strategy: "instances" or "phases"
+		spec: BurstSpec
+		frameSize: frame size (bytes, with FCS)
+		instances: number of flow instances used
+		gap: inter-frame gap of each instance (bytes)
+		iterations: frames sent by each instance (per phase)
+		predicted, requested: pattern dictionnaries
+		switchTime: minimum off time of the phases (s)
+		"""
+		self.strategy = strategy
+		self.spec = spec
+		self.frameSize = frameSize
+		self.instances = instances
+		self.gap = gap
+		self.iterations = iterations
+		self.predicted = predicted
+		self.requested = requested
+		self.switchTime = switchTime
+		# Compiled configuration, set by the compiler
+		self.config = None
+
+	@property
+	def errors(self):
+		"""
+		Relative error of each quantity of the pattern
+		"""
+		errors = {}
+		for key, name, isTime in self.QUANTITIES:
+			requested = self.requested[key]
+			errors[key] = (self.predicted[key] - requested) / requested if requested else (0 if self.predicted[key] == requested else float("inf"))
+		return errors
+
+	@property
+	def error(self):
+		"""
+		Largest relative error of the pattern quantities,
+		the on time error being widened by the gap granularity
+		"""
+		errors = self.errors
+		return max([abs(error) for error in errors.values()] + [abs(errors["on_time"]) + self.jitter / self.predicted["on_time"]])
+
+	@property
+	def jitter(self):
+		"""
+		Largest deviation of one frame from its average position (s),
+		due to the gap granularity (0 if the gap is a multiple of WORD_SIZE)
+		"""
+		return 0 if self.gap % WORD_SIZE == 0 else (WORD_SIZE - 1) / LINK_BYTE_RATE
+
+	def timeline(self, count = None):
+		"""
+		Predicted (start, end) times of the first count bursts (all if None)
+		"""
+		count = self.spec.bursts if count is None else min(count, self.spec.bursts)
+		period = self.predicted["period"]
+		onTime = self.predicted["on_time"]
+		return [(i * period, i * period + onTime) for i in range(count)]
+
+	def timelineText(self, periods = 3, width = 72):
+		"""
+		Timeline of the first bursts drawn with characters:
+		# sending, : partly sending, . idle
+		"""
+		bursts = self.timeline(periods)
+		end = periods * self.predicted["period"]
+		step = end / width
+		line = ""
+		for column in range(width):
+			begin = column * step
+			covered = sum(max(0, min(stop, begin + step) - max(start, begin)) for start, stop in bursts)
+			line+= "#" if covered > step / 2 else (":" if covered > 0 else ".")
+		scale = "0" + formatTime(end).rjust(width - 1)
+		return line + "\n" + scale
+
+	def schedule(self):
+		"""
+		Schedule sending the pattern: one phase with all instances,
+		or one phase per burst separated by the off time
+		"""
+		if self.strategy == "instances":
+			return Schedule([Phase("bursts", self.config, self.spec.bursts * self.predicted["period"])])
+		offTime = self.requested["off_time"]
+		return Schedule([Phase("burst " + str(i + 1), self.config, self.predicted["on_time"], offTime if i > 0 else 0) for i in range(self.spec.bursts)])
+
+	def __str__(self):
+		lines = []
+		if self.strategy == "instances":
+			lines.append("Strategy: instances (%d flow instances, gap of %d bytes, %d frames each)" % (self.instances, self.gap, self.iterations))
+		else:
+			lines.append("Strategy: phases (%d phases of %d frames, gap of %d bytes, off time by the host, at least %s)" % (self.spec.bursts, self.iterations, self.gap, formatTime(self.switchTime)))
+		lines.append("%-20s %14s %14s %10s" % ("", "requested", "predicted", "error"))
+		errors = self.errors
+		for key, name, isTime in self.QUANTITIES:
+			if isTime:
+				requested, predicted = formatTime(self.requested[key]), formatTime(self.predicted[key])
+			else:
+				requested, predicted = "%g" % self.requested[key], "%g" % self.predicted[key]
+			lines.append("%-20s %14s %14s %9.2f%%" % (name, requested, predicted, errors[key] * 100))
+		if self.jitter:
+			lines.append("Gap granularity: each gap may be up to %d bytes (%s) off, the average gap is exact:" % (WORD_SIZE - 1, formatTime(self.jitter)))
+			lines.append("the on time of each burst is within %s (%.2f%%) of the prediction" % (formatTime(self.jitter), self.jitter / self.predicted["on_time"] * 100))
+		return "\n".join(lines)
+
+class BurstCompiler:
+	"""
+	Compiles burst patterns with the flows of a hardware.
+	The first enabled flow of the base configuration is the template
+	of every flow instance used.
+	"""
+
+	def __init__(self, hardwarePath, baseConfig = None, frameSize = None, switchTime = SWITCH_TIME):
+		"""
+		hardwarePath: hardware configuration file (JSON)
+		baseConfig: saved configuration to start from (.gcf), if any
+		frameSize: frame size (bytes, with FCS), the template size if not set
+		switchTime: minimum idle time between two phases (s)
+		"""
+		self.__hardware = Hardware(hardwarePath)
+		base = Hardware(hardwarePath)
+		if baseConfig is not None and not base.load(baseConfig, remember = False):
+			raise ValueError(baseConfig + " could not be loaded")
+		enabled = [flow for flow in base.flows if flow.enabled]
+		self.__template = enabled[0] if enabled else base.flows[0]
+		if frameSize is None:
+			frameSize = self.__template.getModifierByType("skeleton_sender").getField("size").value
+		self.frameSize = frameSize
+		self.switchTime = switchTime
+
+	@property
+	def hardware(self):
+		"""
+		Hardware with the last compiled plan
+		"""
+		return self.__hardware
+
+	def plan(self, spec, strategy):
+		"""
+		Approximation of a BurstSpec by a strategy,
+		or None if the strategy cannot be used
+		"""
+		size = self.frameSize
+		requested = spec.pattern(size)
+		if strategy == "instances":
+			# All instances start together and send back to back: bursts at the link rate
+			if spec.burstSize > len(self.__hardware.flows):
+				return None
+			onTime = spec.burstSize * (size + 1 + MIN_GAP) / LINK_BYTE_RATE
+			gap = max(MIN_GAP, int(round(requested["period"] * LINK_BYTE_RATE)) - size - 1)
+			period = (size + 1 + gap) / LINK_BYTE_RATE
+			# The Rate modifier does not go below 1 Mb/s
+			if period < onTime or rateFromGap(gap, size) < 1:
+				return None
+			predicted = patternOf(spec.burstSize, MAX_RATE, onTime, period - onTime)
+			return BurstPlan(strategy, spec, size, spec.burstSize, gap, spec.bursts, predicted, requested)
+		if strategy == "phases":
+			gap = gapFromRate(spec.burstRate, size)
+			slot = size + 1 + gap
+			onTime = spec.burstSize * slot / LINK_BYTE_RATE
+			burstRate = (size + 1 + MIN_GAP) * MAX_RATE / slot
+			offTime = max(requested["off_time"], self.switchTime) if spec.bursts > 1 else requested["off_time"]
+			predicted = patternOf(spec.burstSize, burstRate, onTime, offTime)
+			return BurstPlan(strategy, spec, size, 1, gap, spec.burstSize, predicted, requested, self.switchTime)
+		raise ValueError("unknown strategy: " + strategy)
+
+	def compile(self, spec, strategy = None):
+		"""
+		Configure the hardware for a BurstSpec and return the plan,
+		with the strategy of the smallest error if not set.
+		Raises ValueError if no strategy can be used.
+		"""
+		plans = [self.plan(spec, name) for name in ([strategy] if strategy is not None else STRATEGIES)]
+		plans = [plan for plan in plans if plan is not None]
+		if not plans:
+			raise ValueError("the pattern cannot be approximated with " + (strategy or "any strategy"))
+		plan = min(plans, key = lambda plan: plan.error)
+		for i, flow in enumerate(self.__hardware.flows):
+			flow.enabled = i < plan.instances
+			if i < plan.instances:
+				for modifier in self.__template.modifiers:
+					flow.updateModifier(modifier)
+				resizeFlow(flow, plan.frameSize)
+				for modifierType, fieldId, value in (("rate", "gap", plan.gap), ("skeleton_sender", "iterations", plan.iterations)):
+					field = flow.getModifierByType(modifierType).getField(fieldId)
+					field.userValue = value
+					field.auto = False
+		plan.config = CompiledConfig.fromHardware(self.__hardware)
+		return plan
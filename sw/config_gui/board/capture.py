@@ -0,0 +1,313 @@
+"""
+Reading of captured traffic (pcap files) and attribution
+of captured packets to the configured flows.
+"""
+
+import os
+import struct
+import signal
+import subprocess
+
+from .exceptions import CaptureError
+
+# Magic numbers of pcap files (microsecond and nanosecond timestamps)
+_MAGIC_US = 0xa1b2c3d4
+_MAGIC_NS = 0xa1b23c4d
+# Link type of Ethernet captures
+LINKTYPE_ETHERNET = 1
+# Ethernet FCS size
+FCS_SIZE = 4
+
+def parsePcapHeader(header):
+	"""
+	Read the global header of a pcap file (24 bytes).
+	Returns the record header structure and the timestamp fraction unit (s).
+	"""
+	endian = None
+	for prefix in ('<', '>'):
+		magic = struct.unpack(prefix + 'I', header[0:4])[0]
+		if magic in (_MAGIC_US, _MAGIC_NS):
+			endian = prefix
+			break
+	if endian is None:
+		raise CaptureError("not a pcap file")
+	scale = 1e-9 if magic == _MAGIC_NS else 1e-6
+	return struct.Struct(endian + 'IIII'), scale
+
+def readPcap(pcapFile):
+	"""
+	Iterate over the packets of a pcap file (path or binary file object).
+	Yields (timestamp in seconds, packet data).
+	"""
+	if isinstance(pcapFile, str):
+		with open(pcapFile, 'rb') as opened:
+			yield from readPcap(opened)
+		return
+	header = pcapFile.read(24)
+	if len(header) < 24:
+		raise CaptureError("pcap file too short")
+	record, scale = parsePcapHeader(header)
+	while True:
+		recordHeader = pcapFile.read(record.size)
+		if len(recordHeader) < record.size:
+			return
+		seconds, fraction, capturedLength, length = record.unpack(recordHeader)
+		data = pcapFile.read(capturedLength)
+		if len(data) < capturedLength:
+			return
+		yield seconds + fraction * scale, data
+
+class PcapWriter:
+	"""
+	Writes packets to a pcap file (microsecond timestamps)
+	"""
+
+	def __init__(self, filename):
+		self.__file = open(filename, 'wb')
+		self.__file.write(struct.pack('<IHHiIII', _MAGIC_US, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+		self.__record = struct.Struct('<IIII')
+
+	def write(self, timestamp, data):
+		"""
+		Write one packet
+		"""
+		seconds = int(timestamp)
+		self.__file.write(self.__record.pack(seconds, int(round((timestamp - seconds) * 1e6)), len(data), len(data)))
+		self.__file.write(data)
+
+	def close(self):
+		"""
+		Close the file
+		"""
+		self.__file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+class FlowMatcher:
+	"""
+	Attributes captured packets to flows by comparing them with
+	the flow skeletons. Bytes changed by modifiers are ignored:
+	only bytes stable in every flow are compared.
+	"""
+
+	def __init__(self, skeletons, volatile, fcsIncluded = False):
+		"""
+		skeletons: list of packet skeletons (bytes), one per flow
+		volatile: list of sets of byte offsets changed by modifiers, one per flow
+		fcsIncluded: do captured packets include the Ethernet FCS?
+		"""
+		self.__count = len(skeletons)
+		self.__fcsIncluded = fcsIncluded
+		lengths = [len(skeleton) if fcsIncluded else len(skeleton) - FCS_SIZE for skeleton in skeletons]
+		# Offsets compared: stable in every flow, grouped in contiguous slices
+		shortest = min(lengths) if lengths else 0
+		stable = [offset for offset in range(shortest) if not any(offset in changed for changed in volatile)]
+		self.__slices = []
+		for offset in stable:
+			if self.__slices and self.__slices[-1][1] == offset:
+				self.__slices[-1][1] = offset + 1
+			else:
+				self.__slices.append([offset, offset + 1])
+		self.__slices = [slice(start, stop) for start, stop in self.__slices]
+		# Captured packet of each flow, and the offsets changed in any flow
+		self.__packets = [skeleton[:lengths[index]] for index, skeleton in enumerate(skeletons)]
+		self.__unstable = set().union(*volatile)
+		# Key of each flow
+		self.__flows = {}
+		for index, skeleton in enumerate(skeletons):
+			key = self.__key(skeleton[:lengths[index]])
+			if key in self.__flows:
+				raise CaptureError("flows " + str(self.__flows[key]+1) + " and " + str(index+1) + " cannot be told apart")
+			self.__flows[key] = index
+
+	@classmethod
+	def fromHardware(cls, hardware, fcsIncluded = False):
+		"""
+		Build a matcher for the enabled flows of a hardware,
+		in the order of hardware.flows
+		"""
+		skeletons = []
+		volatile = []
+		for flow in hardware.flows:
+			if not flow.enabled:
+				continue
+			skeleton = bytes(flow.getModifierByType("skeleton_sender").getField("data").value)
+			changed = set()
+			for modifier in flow.enabled_modifiers:
+				if modifier.type == "increment":
+					offset = modifier.getField("offset").value
+					changed.update((offset, offset + 1))
+				elif modifier.type == "checksum":
+					offset = modifier.getField("value-offset").value
+					changed.update((offset, offset + 1))
+				elif modifier.type == "ethernet_fcs":
+					changed.update(range(len(skeleton) - FCS_SIZE, len(skeleton)))
+			skeletons.append(skeleton)
+			volatile.append(changed)
+		return cls(skeletons, volatile, fcsIncluded)
+
+	def __key(self, data):
+		"""
+		Key of a packet: its length and its compared bytes
+		"""
+		return (len(data), b''.join([data[part] for part in self.__slices]))
+
+	def match(self, data):
+		"""
+		Index of the flow of a packet, or None
+		"""
+		return self.__flows.get(self.__key(data))
+
+	@property
+	def flowCount(self):
+		"""
+		Number of flows
+		"""
+		return self.__count
+
+	def spanIndex(self, widths = (1, 2, 4, 8, 16)):
+		"""
+		Shortest span of bytes stable in every flow that tells the flows
+		apart with the packet length, for a faster attribution than match().
+		Returns (start, stop, {length: {span bytes: flow index}}), or None
+		if there is none. Other traffic is only rejected by its length and span.
+		"""
+		packets = self.__packets
+		if not packets:
+			return None
+		shortest = min(len(packet) for packet in packets)
+		for width in widths:
+			for start in range(shortest - width + 1):
+				if any(offset in self.__unstable for offset in range(start, start + width)):
+					continue
+				index = {}
+				for flow, packet in enumerate(packets):
+					keys = index.setdefault(len(packet), {})
+					key = packet[start:start+width]
+					if key in keys:
+						break
+					keys[key] = flow
+				else:
+					return start, start + width, index
+		return None
+
+	def count(self, packets):
+		"""
+		Count packets per flow.
+		packets: iterable of packet data, or of (timestamp, data)
+		Returns the list of counts per flow and the number of unmatched packets.
+		"""
+		counts = [0] * self.__count
+		unmatched = 0
+		flows = self.__flows
+		key = self.__key
+		for packet in packets:
+			if isinstance(packet, tuple):
+				packet = packet[1]
+			index = flows.get(key(packet))
+			if index is None:
+				unmatched+= 1
+			else:
+				counts[index]+= 1
+		return counts, unmatched
+
+	def countPcap(self, pcapFile):
+		"""
+		Count the packets of a pcap file per flow
+		"""
+		return self.count(readPcap(pcapFile))
+
+class Receiver:
+	"""
+	Capture of the traffic received from the device under test:
+	this is an abstract class.
+	"""
+
+	def start(self):
+		"""
+		Start capturing
+		(to override)
+		"""
+		raise NotImplementedError()
+
+	def stop(self):
+		"""
+		Stop capturing and return the path of the pcap file
+		(to override)
+		"""
+		raise NotImplementedError()
+
+class CommandReceiver(Receiver):
+	"""
+	Capture with an external command (tcpdump for example),
+	stopped with SIGINT
+	"""
+
+	def __init__(self, command, path):
+		"""
+		command: list of arguments, "{path}" is replaced by the pcap path
+		path: pcap file written by the command
+		"""
+		self.__command = [argument.replace("{path}", path) for argument in command]
+		self.__path = path
+		self.__process = None
+
+	def start(self):
+		"""
+		Launch the command
+		"""
+		if os.path.exists(self.__path):
+			os.remove(self.__path)
+		self.__process = subprocess.Popen(self.__command)
+
+	def stop(self):
+		"""
+		Interrupt the command and wait for it
+		"""
+		self.__process.send_signal(signal.SIGINT)
+		self.__process.wait()
+		self.__process = None
+		return self.__path
+
+class SimulatedReceiver(Receiver):
+	"""
+	Local stand-in for a device under test and its capture:
+	writes the packets sent by a SimulatedDevice, dropping
+	packets above the capacity of the device under test
+	"""
+
+	def __init__(self, device, path, capacity = None):
+		"""
+		device: SimulatedDevice
+		path: pcap file to write
+		capacity: maximum number of frames per second forwarded, None for no limit
+		"""
+		self.__device = device
+		self.__path = path
+		self.__capacity = capacity
+
+	def start(self):
+		"""
+		Nothing to do: packets are written when stopping
+		"""
+		pass
+
+	def stop(self):
+		"""
+		Write the forwarded packets, without FCS
+		"""
+		flows = self.__device.sentFlows()
+		frameRates = [1.25e9 / (len(skeleton) + 1 + gap) for skeleton, iterations, gap in flows]
+		ratio = 1.0
+		if self.__capacity is not None and sum(frameRates) > self.__capacity:
+			ratio = self.__capacity / sum(frameRates)
+		with PcapWriter(self.__path) as writer:
+			for (skeleton, iterations, gap), frameRate in zip(flows, frameRates):
+				packet = skeleton[:-FCS_SIZE]
+				for i in range(int(iterations * ratio)):
+					writer.write(i / (frameRate * ratio), packet)
+		return self.__path
@@ -0,0 +1,319 @@
+"""
+Access to a generator board: status and action registers,
+and the configuration upload path.
+"""
+
+import os
+import time
+import tempfile
+import subprocess
+import threading
+
+from .exceptions import BoardError
+
+# Status register values (see control.vhd)
+STATUS_CONFIG = 1
+STATUS_FULL_CONFIG = 2
+STATUS_SENDING = 3
+STATUS_FINISHED = 4
+# Action register values
+ACTION_START = 1
+ACTION_RESET = 2
+
+# Human-readable statuses, as printed by the traffic_generator tool
+STATUS_NAMES = {
+	STATUS_CONFIG: "ready to receive configuration",
+	STATUS_FULL_CONFIG: "fully configured",
+	STATUS_SENDING: "sending traffic",
+	STATUS_FINISHED: "finished"
+}
+
+class Device:
+	"""
+	Generic generator board: this is an abstract class.
+	Subclasses give access to the registers and upload path.
+	"""
+
+	def __init__(self, name, instances = None):
+		"""
+		name: name of the board (for messages)
+		instances: number of flow generators, if known
+		"""
+		self.__name = name
+		self.__instances = instances
+
+	@property
+	def name(self):
+		"""
+		Name of the board
+		"""
+		return self.__name
+
+	@property
+	def instances(self):
+		"""
+		Number of flow generators of the board, or None if unknown
+		"""
+		return self.__instances
+
+	def readStatus(self):
+		"""
+		Read the status register
+		(to override)
+		"""
+		raise NotImplementedError()
+
+	def sendAction(self, action):
+		"""
+		Write the action register
+		(to override)
+		"""
+		raise NotImplementedError()
+
+	def prepare(self, frames):
+		"""
+		Prepare frames for a later upload, so that uploading does
+		not need any more work. Returns an object for upload.
+		(may be overridden)
+		"""
+		return list(frames)
+
+	def upload(self, prepared):
+		"""
+		Send prepared frames to the board
+		(to override)
+		"""
+		raise NotImplementedError()
+
+	@property
+	def status(self):
+		"""
+		Current status of the board
+		"""
+		return self.readStatus()
+
+	def reset(self):
+		"""
+		Forget the configuration and stop sending
+		"""
+		self.sendAction(ACTION_RESET)
+
+	def start(self):
+		"""
+		Start sending traffic
+		"""
+		self.sendAction(ACTION_START)
+
+	def waitStatus(self, statuses, timeout = None, interval = 1e-4, until = None):
+		"""
+		Poll the status register until it has one of the given values.
+		If until is set (perf_counter value), sleep up to it before polling.
+		Returns the status and the perf_counter time when it was seen.
+		Raises a BoardError on timeout (seconds).
+		"""
+		begin = time.perf_counter()
+		if until is not None and until > begin:
+			time.sleep(until - begin)
+		while True:
+			status = self.readStatus()
+			now = time.perf_counter()
+			if status in statuses:
+				return status, now
+			if timeout is not None and now - begin > timeout:
+				raise BoardError(self, "timeout while waiting for status " + " or ".join(str(s) for s in statuses))
+			time.sleep(interval)
+
+class ToolDevice(Device):
+	"""
+	Board controlled through the traffic_generator tool
+	"""
+
+	def __init__(self, name = "board", instances = None, command = "traffic_generator"):
+		"""
+		command: path to the traffic_generator executable
+		"""
+		super().__init__(name, instances)
+		self.__command = command
+		self.__tempFiles = []
+
+	def __run(self, *args):
+		"""
+		Run the tool and return its output
+		"""
+		result = subprocess.run([self.__command] + list(args), stdout = subprocess.PIPE, universal_newlines = True)
+		if result.returncode != 0:
+			raise BoardError(self, "traffic_generator " + " ".join(args) + " failed: " + result.stdout.strip())
+		return result.stdout
+
+	def readStatus(self):
+		"""
+		Read the status printed by the tool
+		"""
+		output = self.__run("status")
+		for line in output.split("\n"):
+			if line.startswith("Current status: "):
+				text = line[len("Current status: "):]
+				for status, name in STATUS_NAMES.items():
+					if name == text:
+						return status
+		return 0
+
+	def sendAction(self, action):
+		"""
+		Send an action with the tool
+		"""
+		if action == ACTION_START:
+			self.__run("start")
+		elif action == ACTION_RESET:
+			self.__run("reset")
+		else:
+			raise BoardError(self, "unknown action " + str(action))
+
+	def prepare(self, frames):
+		"""
+		Write the frames to a temporary configuration file
+		"""
+		configFile = tempfile.NamedTemporaryFile('w', suffix = ".txt", delete = False)
+		with configFile:
+			configFile.write("".join(frame.configData for frame in frames))
+		self.__tempFiles.append(configFile.name)
+		return configFile.name
+
+	def upload(self, prepared):
+		"""
+		Send a prepared configuration file with the tool
+		"""
+		self.__run("config", prepared)
+
+	def close(self):
+		"""
+		Remove the prepared temporary files
+		"""
+		for path in self.__tempFiles:
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+		self.__tempFiles = []
+
+class SimulatedDevice(Device):
+	"""
+	Local stand-in for a board, following the control.vhd state machine.
+	Sending lasts the time the configured flows need on a 10 Gb/s link.
+	"""
+
+	def __init__(self, name = "simulated", instances = 2, skeletonId = 1, rateId = 5, uploadModel = None, timeScale = 1.0):
+		"""
+		instances: number of flow generators
+		skeletonId, rateId: identifiers of the skeleton sender and rate modifiers
+		uploadModel: if set (diff.UploadModel), uploads and actions last the predicted time
+		timeScale: factor applied to the sending duration
+		"""
+		super().__init__(name, instances)
+		self.__skeletonId = skeletonId
+		self.__rateId = rateId
+		self.__uploadModel = uploadModel
+		self.__timeScale = timeScale
+		self.__lock = threading.Lock()
+		self.__state = STATUS_CONFIG
+		self.__flows = []
+		self.__current = []
+		self.__endTime = None
+		self.__startTime = None
+
+	@property
+	def flows(self):
+		"""
+		Frames received by each configured flow generator
+		"""
+		return list(self.__flows)
+
+	@property
+	def startTime(self):
+		"""
+		perf_counter time of the last start, or None
+		"""
+		return self.__startTime
+
+	def readStatus(self):
+		"""
+		Current state of the simulated board
+		"""
+		with self.__lock:
+			if self.__state == STATUS_SENDING and time.perf_counter() >= self.__endTime:
+				self.__state = STATUS_FINISHED
+			return self.__state
+
+	def sendAction(self, action):
+		"""
+		Apply an action like control.vhd does
+		"""
+		if self.__uploadModel is not None:
+			time.sleep(self.__uploadModel.actionTime)
+		with self.__lock:
+			if action == ACTION_RESET:
+				self.__state = STATUS_CONFIG
+				self.__flows = []
+				self.__current = []
+				self.__endTime = None
+			elif action == ACTION_START:
+				if self.__state == STATUS_FULL_CONFIG or (self.__state == STATUS_CONFIG and self.__flows):
+					self.__startTime = time.perf_counter()
+					self.__endTime = self.__startTime + self.__duration() * self.__timeScale
+					self.__state = STATUS_SENDING
+			else:
+				raise BoardError(self, "unknown action " + str(action))
+
+	def upload(self, prepared):
+		"""
+		Receive frames: each last frame completes one flow generator
+		"""
+		if self.__uploadModel is not None:
+			time.sleep(self.__uploadModel.uploadTime(prepared))
+		with self.__lock:
+			for frame in prepared:
+				if self.__state != STATUS_CONFIG:
+					raise BoardError(self, "frame received while not accepting configuration")
+				self.__current.append(frame)
+				if frame.last:
+					self.__flows.append(self.__current)
+					self.__current = []
+					if len(self.__flows) >= self.instances:
+						self.__state = STATUS_FULL_CONFIG
+
+	def sentFlows(self):
+		"""
+		Decode the configured flows.
+		Returns a list of (skeleton data, iterations, gap) per flow.
+		"""
+		with self.__lock:
+			flows = list(self.__flows)
+		return [self.__decode(frames) for frames in flows]
+
+	def __decode(self, frames):
+		"""
+		Decode the frames of one flow: (skeleton data, iterations, gap)
+		"""
+		skeleton = b''
+		iterations = 0
+		gap = 12
+		for frame in frames:
+			word = int.from_bytes(frame.data[0:8], 'little')
+			if frame.modifierId == self.__skeletonId:
+				iterations = (word >> 24) & 0xFFFFFFFF
+				size = word & 0x7FF
+				# Packet data follows the first word, in bus order
+				skeleton = frame.data[8:8+size]
+			elif frame.modifierId == self.__rateId:
+				gap = (word >> 24) & 0xFFFFFFFF
+		return skeleton, iterations, gap
+
+	def __duration(self):
+		"""
+		Time needed to send all configured flows (seconds)
+		"""
+		duration = 0
+		for frames in self.__flows:
+			skeleton, iterations, gap = self.__decode(frames)
+			duration = max(duration, iterations * (len(skeleton) + 1 + gap) * 8 / 10e9)
+		return duration
@@ -0,0 +1,22 @@
+class BoardError(Exception):
+	"""
+	Error while communicating with a generator board
+	"""
+
+	def __init__(self, device, message):
+		self.__device = device
+		self.__message = message
+
+	def __str__(self):
+		return self.__device.name + ": " + self.__message
+
+class CaptureError(Exception):
+	"""
+	Error in captured traffic
+	"""
+
+	def __init__(self, message):
+		self.__message = message
+
+	def __str__(self):
+		return self.__message
\ No newline at end of file
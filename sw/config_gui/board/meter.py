@@ -0,0 +1,281 @@
+"""
+Live measurement of the rate and inter-frame gap of each flow in a
+capture written to a pipe or a growing pcap file: packets are parsed
+in batches from large reads, attributed to the configured flows by
+comparing them with the skeletons, and counted in a fixed number of
+time buckets forming a sliding window. Measured rates are compared
+with the rates predicted from the Rate modifier settings.
+"""
+
+import os
+import stat
+import time
+
+from .capture import FlowMatcher, parsePcapHeader
+from .exceptions import CaptureError
+
+# Size of the reads (bytes)
+CHUNK_SIZE = 1 << 20
+# Time to wait for a growing file (s)
+POLL_INTERVAL = 0.01
+# Bytes per second on the link (10 Gb/s, see the Rate modifier)
+LINK_BYTE_RATE = 1.25e9
+# Header of a pcap record
+PCAP_HEADER_SIZE = 24
+RECORD_HEADER_SIZE = 16
+
+class RateMeter:
+	"""
+	Per-flow rate and inter-frame gap statistics of a capture, in fixed memory.
+	Time is the capture time (packet timestamps).
+	"""
+
+	def __init__(self, matcher, predicted = None, interval = 1.0, window = 1.0, buckets = 10, strict = False):
+		"""
+		matcher: FlowMatcher of the flows
+		predicted: list of dictionnaries per flow (see fromHardware), or None
+		interval: time between reports (s)
+		window: duration of the sliding window of the rates (s)
+		buckets: number of time buckets of the window
+		strict: compare all stable bytes of each packet (match()),
+			instead of the shortest span telling the flows apart
+		"""
+		self.__matcher = matcher
+		self.predicted = predicted
+		self.interval = interval
+		self.window = window
+		self.__flowCount = matcher.flowCount
+		self.__bucketCount = buckets
+		self.__bucketDuration = window / buckets
+		self.__span = None if strict else matcher.spanIndex()
+		self.__started = False
+
+	@classmethod
+	def fromHardware(cls, hardware, fcsIncluded = False, interval = 1.0, window = 1.0, buckets = 10, strict = False):
+		"""
+		Meter of the enabled flows of a hardware, in the order of hardware.flows,
+		with the rates predicted from their Rate modifier
+		"""
+		predicted = []
+		for i, flow in enumerate(hardware.flows):
+			if flow.enabled:
+				rate = flow.getModifierByType("rate")
+				predicted.append({
+					"number": i+1,
+					"size": flow.getModifierByType("skeleton_sender").getField("size").value,
+					"rate": rate.getField("rate").value,
+					"gap": rate.getField("gap").value,
+					"frame_rate": rate.frameRate
+				})
+		return cls(FlowMatcher.fromHardware(hardware, fcsIncluded), predicted, interval, window, buckets, strict)
+
+	def __start(self, timestamp):
+		"""
+		Start counting at a capture time
+		"""
+		# One more counter for the unmatched packets
+		count = self.__flowCount + 1
+		buckets = self.__bucketCount
+		# Packets and bytes per bucket and flow: the current bucket is
+		# reused for the oldest one when the time passes its end
+		self.__packets = [[0] * count for i in range(buckets)]
+		self.__bytes = [[0] * count for i in range(buckets)]
+		self.__bucket = 0
+		self.__bucketStart = timestamp
+		self.__bucketEnd = timestamp + self.__bucketDuration
+		# Counts of the buckets that left the window
+		self.__oldPackets = [0] * count
+		self.__oldBytes = [0] * count
+		self.__firstTime = timestamp
+		self.__lastTime = timestamp
+		self.__nextReport = timestamp + self.interval
+		# Time of the last packet of each flow
+		self.__arrival = [None] * count
+		self.__started = True
+		self.clearIntervals()
+
+	def __rotate(self, timestamp):
+		"""
+		Move to the bucket of a capture time, forgetting the oldest buckets
+		"""
+		buckets = self.__bucketCount
+		passed = max(0, int((timestamp - self.__bucketStart) // self.__bucketDuration))
+		for step in range(min(passed, buckets)):
+			self.__bucket = (self.__bucket + 1) % buckets
+			for counts, old in ((self.__packets[self.__bucket], self.__oldPackets), (self.__bytes[self.__bucket], self.__oldBytes)):
+				for flow, value in enumerate(counts):
+					if value:
+						old[flow]+= value
+						counts[flow] = 0
+		self.__bucketStart+= passed * self.__bucketDuration
+		self.__bucketEnd = self.__bucketStart + self.__bucketDuration
+
+	def process(self, data, offset, scale, record):
+		"""
+		Count the complete pcap records of a buffer from an offset.
+		Stops at the first record after the report time.
+		Returns the offset of the first record not counted,
+		and True if a report is due.
+		"""
+		unpack = record.unpack_from
+		size = len(data)
+		if not self.__started:
+			if offset + RECORD_HEADER_SIZE > size:
+				return offset, False
+			seconds, fraction, captured, length = unpack(data, offset)
+			self.__start(seconds + fraction * scale)
+		unmatched = self.__flowCount
+		packets = self.__packets[self.__bucket]
+		octets = self.__bytes[self.__bucket]
+		arrival = self.__arrival
+		gapCount = self.__gapCount
+		gapSum = self.__gapSum
+		gapSquares = self.__gapSquares
+		gapMin = self.__gapMin
+		gapMax = self.__gapMax
+		if self.__span is not None:
+			spanStart, spanStop, byLength = self.__span
+		else:
+			byLength = None
+			match = self.__matcher.match
+		# Bucket end or report time: checked once per packet
+		limit = min(self.__bucketEnd, self.__nextReport)
+		timestamp = self.__lastTime
+		due = False
+		while offset + RECORD_HEADER_SIZE <= size:
+			seconds, fraction, captured, length = unpack(data, offset)
+			start = offset + RECORD_HEADER_SIZE
+			end = start + captured
+			if end > size:
+				break
+			timestamp = seconds + fraction * scale
+			if timestamp >= limit:
+				if timestamp >= self.__nextReport:
+					# Report the state at the report time
+					timestamp = self.__nextReport
+					self.__rotate(timestamp)
+					self.__nextReport+= self.interval
+					due = True
+					break
+				self.__rotate(timestamp)
+				packets = self.__packets[self.__bucket]
+				octets = self.__bytes[self.__bucket]
+				limit = min(self.__bucketEnd, self.__nextReport)
+			if byLength is not None:
+				flows = byLength.get(captured)
+				index = flows.get(data[start+spanStart:start+spanStop], unmatched) if flows is not None else unmatched
+			else:
+				index = match(data[start:end])
+				if index is None:
+					index = unmatched
+			packets[index]+= 1
+			octets[index]+= length
+			previous = arrival[index]
+			arrival[index] = timestamp
+			if previous is not None:
+				gap = timestamp - previous
+				gapCount[index]+= 1
+				gapSum[index]+= gap
+				gapSquares[index]+= gap * gap
+				if gap < gapMin[index]:
+					gapMin[index] = gap
+				if gap > gapMax[index]:
+					gapMax[index] = gap
+			offset = end
+		if timestamp > self.__lastTime:
+			self.__lastTime = timestamp
+		return offset, due
+
+	def snapshot(self):
+		"""
+		Statistics of each flow: dictionnary with the capture "time",
+		"flows" (list of dictionnaries, in the order of the matcher)
+		and "unmatched" (same keys, for the packets of no flow).
+		Rates are measured over the sliding window, inter-arrival times
+		and gaps since the last clearIntervals().
+		"""
+		if not self.__started:
+			return {"time": None, "flows": [], "unmatched": None}
+		now = self.__lastTime
+		# Window covered: complete buckets and the current one
+		covered = min((self.__bucketCount - 1) * self.__bucketDuration + (now - self.__bucketStart), now - self.__firstTime)
+		results = []
+		for flow in range(self.__flowCount + 1):
+			windowPackets = sum(bucket[flow] for bucket in self.__packets)
+			windowBytes = sum(bucket[flow] for bucket in self.__bytes)
+			result = {
+				"packets": self.__oldPackets[flow] + windowPackets,
+				"bytes": self.__oldBytes[flow] + windowBytes,
+				"frame_rate": windowPackets / covered if covered > 0 else None,
+				"rate": windowBytes * 8 / covered / 1e6 if covered > 0 else None
+			}
+			count = self.__gapCount[flow]
+			if count:
+				mean = self.__gapSum[flow] / count
+				result["interval"] = mean
+				result["interval_min"] = self.__gapMin[flow]
+				result["interval_max"] = self.__gapMax[flow]
+				result["jitter"] = max(0, self.__gapSquares[flow] / count - mean * mean) ** 0.5
+			if flow < self.__flowCount and self.predicted is not None:
+				predicted = self.predicted[flow]
+				result["number"] = predicted["number"]
+				result["predicted_frame_rate"] = predicted["frame_rate"]
+				result["predicted_gap"] = predicted["gap"]
+				if result["frame_rate"] is not None:
+					result["error"] = (result["frame_rate"] / predicted["frame_rate"] - 1) * 100
+				if count:
+					# Bytes on the link between two frames, as the gap field
+					result["gap"] = mean * LINK_BYTE_RATE - predicted["size"] - 1
+			results.append(result)
+		return {"time": now, "flows": results[:-1], "unmatched": results[-1]}
+
+	def clearIntervals(self):
+		"""
+		Start new inter-arrival statistics (the rates keep their window)
+		"""
+		count = self.__flowCount + 1
+		self.__gapCount = [0] * count
+		self.__gapSum = [0.0] * count
+		self.__gapSquares = [0.0] * count
+		self.__gapMin = [float("inf")] * count
+		self.__gapMax = [0.0] * count
+
+	def run(self, pcapFile, callback = None, follow = False, chunkSize = CHUNK_SIZE):
+		"""
+		Read a pcap stream (binary file object: pipe or file) until its end.
+		callback is called with snapshot() each interval of capture time,
+		then inter-arrival statistics are cleared.
+		If follow, a regular file is read again when it grows (until interrupted).
+		Returns the last snapshot.
+		"""
+		read = getattr(pcapFile, "read1", pcapFile.read)
+		waitGrowth = follow and stat.S_ISREG(os.fstat(pcapFile.fileno()).st_mode)
+		def readChunk():
+			while True:
+				chunk = read(chunkSize)
+				if chunk or not waitGrowth:
+					return chunk
+				time.sleep(POLL_INTERVAL)
+		# Global header
+		data = b""
+		while len(data) < PCAP_HEADER_SIZE:
+			chunk = readChunk()
+			if not chunk:
+				raise CaptureError("pcap stream too short")
+			data+= chunk
+		record, scale = parsePcapHeader(data)
+		offset = PCAP_HEADER_SIZE
+		while True:
+			offset, due = self.process(data, offset, scale, record)
+			if due:
+				if callback is not None:
+					callback(self.snapshot())
+				self.clearIntervals()
+				continue
+			chunk = readChunk()
+			if not chunk:
+				break
+			# Incomplete record kept for the next read
+			data = data[offset:] + chunk
+			offset = 0
+		return self.snapshot()
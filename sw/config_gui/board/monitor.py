@@ -0,0 +1,330 @@
+"""
+Continuous monitoring of a generator board: the status, action and
+debug registers are polled through a memory mapping of the register
+window, samples are kept in a fixed-size ring buffer, status transitions
+are timestamped, and metrics are served in the Prometheus text format.
+"""
+
+import os
+import json
+import mmap
+import time
+import struct
+import threading
+from array import array
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+from .device import STATUS_NAMES, STATUS_SENDING, STATUS_FINISHED
+
+# Register window of the generator (see traffic_generator.h)
+GEN_BASE_ADDR = 0x80000
+GEN_WORD_SIZE = 0x0100
+# Register offsets in the window
+REG_STATUS = 0x00
+REG_ACTION = 0x04
+# Debug registers of the FrameLink input (see generator_debug.sh and fl_debug.sh)
+REG_WORD_COUNTER = 0x08
+REG_DREM = 0x0C
+REG_FLAGS = 0x10
+# Sampled registers, in the order of the ring buffer columns
+REGISTERS = [("status", REG_STATUS), ("action", REG_ACTION), ("word_counter", REG_WORD_COUNTER), ("drem", REG_DREM), ("flags", REG_FLAGS)]
+# Short status names for metric labels
+STATUS_LABELS = {1: "config", 2: "full_config", 3: "sending", 4: "finished"}
+
+def statusLabel(status):
+	"""
+	Short name of a status register value
+	"""
+	return STATUS_LABELS.get(status, "unknown")
+
+class RegisterWindow:
+	"""
+	Memory mapping of the register window of a board.
+	The file may be the device memory (PCI resource)
+	or a regular file used as a fake register space.
+	"""
+
+	# 32-bit register, as read by cs_space_read_4
+	REGISTER = struct.Struct("<I")
+
+	def __init__(self, path, offset = GEN_BASE_ADDR, size = GEN_WORD_SIZE, writable = False):
+		"""
+		path: file to map
+		offset: offset of the register window in the file (multiple of the page size)
+		size: size of the window (bytes)
+		"""
+		self.path = path
+		self.__file = open(path, 'r+b' if writable else 'rb')
+		access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+		self.__map = mmap.mmap(self.__file.fileno(), size, access = access, offset = offset)
+
+	def read(self, register):
+		"""
+		Read a 32-bit register
+		"""
+		return self.REGISTER.unpack_from(self.__map, register)[0]
+
+	def write(self, register, value):
+		"""
+		Write a 32-bit register (window opened writable)
+		"""
+		self.REGISTER.pack_into(self.__map, register, value)
+
+	def close(self):
+		"""
+		Remove the mapping
+		"""
+		self.__map.close()
+		self.__file.close()
+
+def createFakeRegisters(path, offset = GEN_BASE_ADDR, size = GEN_WORD_SIZE):
+	"""
+	Create a file usable as a register space (sparse, all zeros)
+	and return its window opened writable, to play the board in tests
+	"""
+	with open(path, 'ab') as registerFile:
+		if registerFile.tell() < offset + size:
+			registerFile.truncate(offset + size)
+	return RegisterWindow(path, offset, size, writable = True)
+
+class SampleRing:
+	"""
+	Fixed-size ring buffer of register samples:
+	one array per column, the oldest samples are overwritten
+	"""
+
+	def __init__(self, capacity):
+		self.capacity = capacity
+		self.__times = array('d', bytes(8 * capacity))
+		self.__columns = [array('I', [0]) * capacity for name, register in REGISTERS]
+		# Total number of samples added
+		self.count = 0
+
+	def add(self, timestamp, values):
+		"""
+		Add a sample: time and register values in the REGISTERS order
+		"""
+		index = self.count % self.capacity
+		self.__times[index] = timestamp
+		for column, value in zip(self.__columns, values):
+			column[index] = value
+		self.count+= 1
+
+	def last(self, number = None):
+		"""
+		Last samples, oldest first: list of dictionnaries
+		with "time" and the register values
+		"""
+		available = min(self.count, self.capacity)
+		if number is None or number > available:
+			number = available
+		samples = []
+		for position in range(self.count - number, self.count):
+			index = position % self.capacity
+			sample = {"time": self.__times[index]}
+			for (name, register), column in zip(REGISTERS, self.__columns):
+				sample[name] = column[index]
+			samples.append(sample)
+		return samples
+
+class StatusMonitor:
+	"""
+	Polls the registers of a board in a thread
+	"""
+
+	def __init__(self, window, board = "board", frequency = 1000, capacity = 65536, transitions = 1024, onTransition = None):
+		"""
+		window: RegisterWindow of the board
+		board: board name (metric label)
+		frequency: number of samples per second
+		capacity: number of samples kept
+		transitions: number of status transitions kept
+		onTransition: function called with each (time, old status, new status), in the polling thread
+		"""
+		self.__window = window
+		self.board = board
+		self.__period = 1.0 / frequency
+		self.__onTransition = onTransition
+		self.__lock = threading.Lock()
+		self.__ring = SampleRing(capacity)
+		# (time, old status, new status), time from time.time()
+		self.__transitions = deque(maxlen = transitions)
+		# (old, new) -> count
+		self.__transitionCounts = {}
+		# Status -> seconds spent
+		self.__statusTime = {}
+		self.__status = None
+		self.__statusSince = None
+		self.__values = None
+		# Duration of the last sending (s)
+		self.__lastSending = None
+		# Samples taken later than planned by more than one period
+		self.overruns = 0
+		self.__stop = threading.Event()
+		self.__thread = None
+
+	def start(self):
+		"""
+		Start polling in a thread
+		"""
+		self.__stop.clear()
+		self.__thread = threading.Thread(target = self.__run, name = "status monitor " + self.board, daemon = True)
+		self.__thread.start()
+
+	def stop(self):
+		"""
+		Stop polling
+		"""
+		self.__stop.set()
+		if self.__thread is not None:
+			self.__thread.join()
+			self.__thread = None
+
+	def __run(self):
+		"""
+		Polling loop, at a fixed period
+		"""
+		deadline = time.monotonic()
+		while not self.__stop.is_set():
+			self.poll()
+			deadline+= self.__period
+			delay = deadline - time.monotonic()
+			if delay > 0:
+				self.__stop.wait(delay)
+			elif delay < -self.__period:
+				# Too late: skip the missed samples
+				self.overruns+= 1
+				deadline = time.monotonic()
+
+	def poll(self):
+		"""
+		Take one sample
+		"""
+		values = [self.__window.read(register) for name, register in REGISTERS]
+		now = time.time()
+		status = values[0]
+		transition = None
+		with self.__lock:
+			self.__ring.add(now, values)
+			self.__values = values
+			if status != self.__status:
+				if self.__status is not None:
+					transition = (now, self.__status, status)
+					self.__transitions.append(transition)
+					key = (self.__status, status)
+					self.__transitionCounts[key] = self.__transitionCounts.get(key, 0) + 1
+					self.__statusTime[self.__status] = self.__statusTime.get(self.__status, 0) + now - self.__statusSince
+					if self.__status == STATUS_SENDING and status == STATUS_FINISHED:
+						self.__lastSending = now - self.__statusSince
+				self.__status = status
+				self.__statusSince = now
+		if transition is not None and self.__onTransition is not None:
+			self.__onTransition(*transition)
+
+	def samples(self, number = None):
+		"""
+		Last samples, oldest first (see SampleRing.last)
+		"""
+		with self.__lock:
+			return self.__ring.last(number)
+
+	def transitions(self):
+		"""
+		Kept status transitions: list of (time, old status, new status)
+		"""
+		with self.__lock:
+			return list(self.__transitions)
+
+	def metrics(self):
+		"""
+		Metrics in the Prometheus text exposition format
+		"""
+		with self.__lock:
+			now = time.time()
+			values = self.__values
+			status = self.__status
+			statusTime = dict(self.__statusTime)
+			if status is not None:
+				statusTime[status] = statusTime.get(status, 0) + now - self.__statusSince
+			transitionCounts = dict(self.__transitionCounts)
+			lastTransition = self.__transitions[-1][0] if self.__transitions else None
+			lastSending = self.__lastSending
+			sampleCount = self.__ring.count
+		board = 'board="' + self.board + '"'
+		lines = []
+		def metric(name, kind, help, samples):
+			lines.append("# HELP traffic_generator_" + name + " " + help)
+			lines.append("# TYPE traffic_generator_" + name + " " + kind)
+			for labels, value in samples:
+				lines.append("traffic_generator_" + name + "{" + ",".join([board] + labels) + "} " + repr(value))
+		metric("samples_total", "counter", "Number of register samples.", [([], sampleCount)])
+		metric("poll_overruns_total", "counter", "Number of polls later than one period.", [([], self.overruns)])
+		if values is not None:
+			for (name, register), value in zip(REGISTERS, values):
+				metric("register_" + name, "gauge", "Last value of the " + name + " register.", [([], value)])
+			metric("status", "gauge", "1 for the current status of the generator.", [(['status="' + label + '"'], 1 if statusLabel(status) == label else 0) for label in sorted(set(STATUS_LABELS.values()) | {"unknown"})])
+		metric("status_seconds_total", "counter", "Time spent in each status.", [(['status="' + statusLabel(key) + '"'], value) for key, value in sorted(statusTime.items())])
+		metric("transitions_total", "counter", "Number of status transitions.", [(['from="' + statusLabel(old) + '"', 'to="' + statusLabel(new) + '"'], count) for (old, new), count in sorted(transitionCounts.items())])
+		if lastTransition is not None:
+			metric("last_transition_timestamp_seconds", "gauge", "Time of the last status transition.", [([], lastTransition)])
+		if lastSending is not None:
+			metric("last_sending_duration_seconds", "gauge", "Duration of the last sending (sending to finished).", [([], lastSending)])
+		return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+	"""
+	Serves /metrics (Prometheus), /samples and /transitions (JSON)
+	"""
+
+	def do_GET(self):
+		monitor = self.server.monitor
+		path, unused, query = self.path.partition("?")
+		if path == "/metrics":
+			self.__send(monitor.metrics(), "text/plain; version=0.0.4")
+		elif path == "/samples":
+			number = int(query[2:]) if query.startswith("n=") and query[2:].isdigit() else 1000
+			self.__send(json.dumps(monitor.samples(number)), "application/json")
+		elif path == "/transitions":
+			transitions = [{"time": when, "from": STATUS_NAMES.get(old, "unknown"), "to": STATUS_NAMES.get(new, "unknown")} for when, old, new in monitor.transitions()]
+			self.__send(json.dumps(transitions), "application/json")
+		else:
+			self.send_error(404)
+
+	def __send(self, text, contentType):
+		"""
+		Send a successful response
+		"""
+		data = text.encode()
+		self.send_response(200)
+		self.send_header("Content-Type", contentType)
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def address_string(self):
+		# Unix socket clients have no address
+		return str(self.client_address[0]) if self.client_address else "unix"
+
+	def log_message(self, format, *args):
+		pass
+
+class _UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+	daemon_threads = True
+
+def serveMetrics(monitor, address):
+	"""
+	Serve the metrics of a monitor in a thread.
+	address: (host, port) for HTTP over TCP, or a Unix socket path
+	Returns the server (call shutdown() to stop).
+	"""
+	if isinstance(address, str):
+		if os.path.exists(address):
+			os.remove(address)
+		server = _UnixHTTPServer(address, _MetricsHandler)
+	else:
+		server = ThreadingHTTPServer(address, _MetricsHandler)
+	server.monitor = monitor
+	threading.Thread(target = server.serve_forever, name = "metrics " + monitor.board, daemon = True).start()
+	return server
@@ -0,0 +1,138 @@
+"""
+Concurrent control of several boards with asyncio:
+configurations are uploaded to every board at the same time,
+then the start action is sent to all boards as close together as possible.
+"""
+
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config_editor.compiled import CompiledConfig
+from .device import STATUS_FULL_CONFIG, STATUS_FINISHED, ACTION_START
+
+class StartReport:
+	"""
+	Start times of each board (perf_counter times)
+	"""
+
+	def __init__(self, devices, startTimes):
+		"""
+		startTimes: for each device, (time before, time after) the start action
+		"""
+		self.devices = devices
+		self.startTimes = startTimes
+
+	@property
+	def skew(self):
+		"""
+		Maximum difference between the start times of two boards (seconds).
+		The start time of a board is the middle of its start action.
+		"""
+		middles = [(before + after) / 2 for before, after in self.startTimes]
+		return max(middles) - min(middles)
+
+	@property
+	def uncertainty(self):
+		"""
+		Longest start action (seconds): precision of the skew measure
+		"""
+		return max(after - before for before, after in self.startTimes)
+
+	def __str__(self):
+		first = min(before for before, after in self.startTimes)
+		lines = []
+		for device, (before, after) in zip(self.devices, self.startTimes):
+			lines.append("%-20s start at +%9.3f us (action: %.3f us)" % (device.name, (before - first) * 1e6, (after - before) * 1e6))
+		lines.append("Start skew: %.3f us (+/- %.3f us)" % (self.skew * 1e6, self.uncertainty * 1e6))
+		return "\n".join(lines)
+
+class Orchestrator:
+	"""
+	Drives several boards concurrently.
+	Blocking device calls are run in a thread pool with one thread per board.
+	"""
+
+	def __init__(self, devices):
+		"""
+		devices: list of Device
+		"""
+		self.__devices = list(devices)
+		self.__executor = ThreadPoolExecutor(max(1, len(self.__devices)))
+
+	@property
+	def devices(self):
+		"""
+		Get a copy of the devices list
+		"""
+		return list(self.__devices)
+
+	async def __call(self, function, *args):
+		"""
+		Run a blocking call in the thread pool
+		"""
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(self.__executor, function, *args)
+
+	async def configure(self, configs, timeout = None):
+		"""
+		Reset every board and upload its configuration concurrently.
+		configs: one CompiledConfig or Hardware per device
+		"""
+		async def configureOne(device, config):
+			if not isinstance(config, CompiledConfig):
+				config = CompiledConfig.fromHardware(config)
+			prepared = device.prepare(config.frames)
+			await self.__call(device.reset)
+			await self.__call(device.upload, prepared)
+			if device.instances is not None and len(config.flows) >= device.instances:
+				await self.__call(device.waitStatus, [STATUS_FULL_CONFIG], timeout)
+		await asyncio.gather(*[configureOne(device, config) for device, config in zip(self.__devices, configs)])
+
+	async def start(self, sequential = False):
+		"""
+		Send the start action to every board as close together as possible.
+		By default, each board thread waits on a barrier then sends its action,
+		so that slow actions (external tool) run in parallel.
+		If sequential, one thread sends all actions back to back,
+		which is closer for fast actions (memory-mapped registers).
+		Returns a StartReport.
+		"""
+		def startOne(device):
+			before = time.perf_counter()
+			device.sendAction(ACTION_START)
+			return before, time.perf_counter()
+		if sequential:
+			startTimes = await self.__call(lambda: [startOne(device) for device in self.__devices])
+		else:
+			barrier = threading.Barrier(len(self.__devices))
+			def startAfterBarrier(device):
+				barrier.wait()
+				return startOne(device)
+			startTimes = await asyncio.gather(*[self.__call(startAfterBarrier, device) for device in self.__devices])
+		return StartReport(self.__devices, list(startTimes))
+
+	async def wait(self, timeout = None, interval = 1e-3):
+		"""
+		Wait for every board to finish sending.
+		Returns the perf_counter time each board was seen finished.
+		"""
+		results = await asyncio.gather(*[self.__call(device.waitStatus, [STATUS_FINISHED], timeout, interval) for device in self.__devices])
+		return [finishTime for status, finishTime in results]
+
+	async def run(self, configs, timeout = None, sequential = False):
+		"""
+		Configure all boards, start them together and wait for the end.
+		Returns the StartReport.
+		"""
+		await self.configure(configs, timeout)
+		report = await self.start(sequential)
+		await self.wait(timeout)
+		return report
+
+	def close(self):
+		"""
+		Stop the thread pool
+		"""
+		self.__executor.shutdown()
@@ -0,0 +1,161 @@
+"""
+Multi-phase traffic schedule: phases are run one after the other
+on one board, with a reset, a configuration and a start each.
+Configurations are compiled and prepared before running,
+so that switching from one phase to the next is as short as possible.
+"""
+
+import time
+
+from config_editor.compiled import CompiledConfig
+from .device import STATUS_FULL_CONFIG, STATUS_FINISHED
+
+class Phase:
+	"""
+	One phase of a schedule
+	"""
+
+	def __init__(self, name, config, duration = None, delay = 0):
+		"""
+		name: name of the phase (for reports)
+		config: Hardware, CompiledConfig or path to an exported configuration
+		duration: expected sending duration (seconds), computed from
+			the hardware if not set. Used to poll the board less often.
+		delay: minimum idle time between the end of the previous phase
+			and the start of this one (seconds)
+		"""
+		self.name = name
+		self.delay = delay
+		if isinstance(config, CompiledConfig):
+			self.config = config
+		elif isinstance(config, str):
+			self.config = CompiledConfig.fromFile(config)
+		else:
+			self.config = CompiledConfig.fromHardware(config)
+			if duration is None:
+				duration = predictedDuration(config)
+		self.duration = duration
+
+class PhaseResult:
+	"""
+	Timings measured for one phase (perf_counter times)
+	"""
+
+	def __init__(self, phase):
+		self.phase = phase
+		self.resetTime = None
+		self.configuredTime = None
+		self.startTime = None
+		self.finishTime = None
+
+	@property
+	def sendingDuration(self):
+		"""
+		Time between start and detected end (seconds)
+		"""
+		return self.finishTime - self.startTime
+
+	@property
+	def switchDuration(self):
+		"""
+		Time between reset and start (seconds)
+		"""
+		return self.startTime - self.resetTime
+
+class ScheduleReport:
+	"""
+	Results of a schedule run
+	"""
+
+	def __init__(self, results):
+		self.results = results
+
+	@property
+	def gaps(self):
+		"""
+		Idle time between the end of each phase and the start
+		of the next one (seconds), one value per transition
+		"""
+		gaps = []
+		for previous, current in zip(self.results, self.results[1:]):
+			gaps.append(current.startTime - previous.finishTime)
+		return gaps
+
+	def __str__(self):
+		lines = []
+		for i, result in enumerate(self.results):
+			line = "%-20s sending: %10.3f ms, switch: %8.3f ms" % (result.phase.name, result.sendingDuration * 1e3, result.switchDuration * 1e3)
+			if result.phase.duration is not None:
+				line+= " (predicted sending: %.3f ms)" % (result.phase.duration * 1e3)
+			lines.append(line)
+			if i < len(self.results) - 1:
+				lines.append("\tgap to " + self.results[i+1].phase.name + ": %.3f ms" % (self.gaps[i] * 1e3))
+		return "\n".join(lines)
+
+class Schedule:
+	"""
+	Ordered list of phases run on one board
+	"""
+
+	def __init__(self, phases = None):
+		self.__phases = []
+		if phases is not None:
+			for phase in phases:
+				self.addPhase(phase)
+
+	def addPhase(self, phase):
+		"""
+		Add a phase at the end of the schedule
+		"""
+		self.__phases.append(phase)
+
+	@property
+	def phases(self):
+		"""
+		Get a copy of the phases list
+		"""
+		return list(self.__phases)
+
+	def run(self, device, timeout = None, interval = 1e-4, margin = 2e-3):
+		"""
+		Run all phases on the device and return a ScheduleReport.
+		The end of each phase is detected by polling the status register
+		every interval seconds. When the phase duration is known, polling
+		starts margin seconds before the expected end.
+		timeout: maximum time (seconds) to wait for one phase to finish
+		"""
+		# Prepare every upload before starting
+		prepared = [device.prepare(phase.config.frames) for phase in self.__phases]
+		results = []
+		for phase, upload in zip(self.__phases, prepared):
+			result = PhaseResult(phase)
+			result.resetTime = time.perf_counter()
+			device.reset()
+			device.upload(upload)
+			if device.instances is not None and len(phase.config.flows) >= device.instances:
+				device.waitStatus([STATUS_FULL_CONFIG], timeout, interval)
+			result.configuredTime = time.perf_counter()
+			if phase.delay and results:
+				remaining = results[-1].finishTime + phase.delay - result.configuredTime
+				if remaining > 0:
+					time.sleep(remaining)
+			device.start()
+			result.startTime = time.perf_counter()
+			until = None
+			if phase.duration is not None:
+				until = result.startTime + phase.duration - margin
+			status, result.finishTime = device.waitStatus([STATUS_FINISHED], timeout, interval, until)
+			results.append(result)
+		return ScheduleReport(results)
+
+def predictedDuration(hardware):
+	"""
+	Time needed to send all enabled flows of a hardware (seconds)
+	"""
+	duration = 0
+	for flow in hardware.flows:
+		if flow.enabled:
+			rate = flow.getModifierByType("rate")
+			iterations = flow.getModifierByType("skeleton_sender").getField("iterations").value
+			duration = max(duration, iterations / rate.frameRate)
+	return duration
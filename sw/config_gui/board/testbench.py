@@ -0,0 +1,385 @@
+"""
+Simulation vectors of the flow generators. A flow of a configuration
+is exported as stimulus in the configuration file format, and the words
+expected at the output of its flow generator are computed in software
+with the effects of the modifiers. Cases are simulated in parallel with
+GHDL (hw/traffic_generator/sim/tb_flow_vectors.vhd) and the recorded
+words are compared with the expected ones.
+"""
+
+import os
+import struct
+import shutil
+import zlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config_editor.compiled import compileFlow
+
+# Size of a FrameLink word
+WORD_SIZE = 8
+# Frames recorded per case by default
+PACKETS = 16
+# Top entity of the testbench and its sources, relative to the hardware directory
+TESTBENCH = "tb_flow_vectors"
+SOURCES = ["utils", "modifiers/core", "modifiers", "flow_generator.vhd", "sim/" + TESTBENCH + ".vhd"]
+# The utilities use the Synopsys std_logic_unsigned package
+GHDL_OPTIONS = ["--ieee=synopsys", "-fexplicit"]
+# Clock cycles before the configuration is sent (reset), and margin of the cycles limit
+SETUP_CYCLES = 100
+CYCLES_MARGIN = 4
+# Bytes of the IPv4 header in the pseudo-header: protocol, source and destination addresses
+IPV4_PSEUDO_HEADER = [9] + list(range(12, 20))
+
+def fieldValue(modifier, fieldId):
+	"""
+	Value of a modifier field as sent in the configuration
+	"""
+	field = modifier.getField(fieldId)
+	return field.getInt(field.auto)
+
+def setWord(packet, offset, value):
+	"""
+	Write a 16 bits value in network order, bytes after the packet end are dropped
+	"""
+	for i, byte in enumerate(value.to_bytes(2, 'big')):
+		if offset + i < len(packet):
+			packet[offset + i] = byte
+
+def applyIncrement(modifier, packets):
+	"""
+	Incrementing field, with the 16 bits counter of increment.vhd
+	"""
+	minimum, maximum, skip, mode, step, offset = (fieldValue(modifier, fieldId) for fieldId in ("min", "max", "skip", "mode", "step", "offset"))
+	counter = maximum if mode else minimum
+	for i, packet in enumerate(packets):
+		setWord(packet, offset, counter)
+		if i % (skip + 1) == skip:
+			if not mode:
+				counter = minimum if counter > (maximum - step) & 0xFFFF else (counter + step) & 0xFFFF
+			else:
+				counter = maximum if counter < (minimum + step) & 0xFFFF else (counter - step) & 0xFFFF
+
+def applyChecksum(modifier, packets):
+	"""
+	Internet checksum of a range of bytes, with the IPv4 pseudo-header if configured
+	(the IPv6 pseudo-header is not implemented by checksum.vhd)
+	"""
+	start, end, valueOffset, ipOffset, checksumType = (fieldValue(modifier, fieldId) for fieldId in ("start-offset", "end-offset", "value-offset", "ip-offset", "type"))
+	for packet in packets:
+		positions = set(range(start, min(end, len(packet) - 1) + 1))
+		total = 0
+		if checksumType == 1:
+			positions.update(ipOffset + i for i in IPV4_PSEUDO_HEADER if ipOffset + i < len(packet))
+			# Payload length: total length - header length
+			if ipOffset + 3 < len(packet):
+				total+= (((packet[ipOffset + 2] << 8) | packet[ipOffset + 3]) - (packet[ipOffset] & 0x0F) * 4) & 0xFFFF
+		for position in positions:
+			total+= packet[position] << 8 if position % 2 == 0 else packet[position]
+		while total >> 16:
+			total = (total & 0xFFFF) + (total >> 16)
+		setWord(packet, valueOffset, ~total & 0xFFFF)
+
+def applyEthernetFCS(modifier, packets):
+	"""
+	Ethernet FCS on the 4 last bytes of each packet
+	"""
+	for packet in packets:
+		packet[-4:] = struct.pack('<I', zlib.crc32(bytes(packet[:-4])))
+
+# Effect of each modifier type on the packets, None if it does not change data
+MODIFIER_EFFECTS = {
+	"skeleton_sender": None,
+	"increment": applyIncrement,
+	"checksum": applyChecksum,
+	"ethernet_fcs": applyEthernetFCS,
+	"rate": None
+}
+
+def expectedPackets(flow, count):
+	"""
+	First count packets sent by a flow generator (fewer if less iterations),
+	the modifiers being applied in the order of the flow generator.
+	Raises a ValueError if a modifier has no software model.
+	"""
+	skeleton = flow.getModifierByType("skeleton_sender")
+	count = min(count, fieldValue(skeleton, "iterations"))
+	data = skeleton.getField("data").value
+	packets = [bytearray(data) for i in range(count)]
+	for modifier in flow.enabled_modifiers:
+		if modifier.type not in MODIFIER_EFFECTS:
+			raise ValueError("no software model of the " + modifier.name + " modifier")
+		effect = MODIFIER_EFFECTS[modifier.type]
+		if effect is not None:
+			effect(modifier, packets)
+	return packets
+
+def packetWords(packet):
+	"""
+	Words of a packet at the output of a flow generator:
+	(data, REM, SOF, EOF), data bytes in the order of the bus (first byte in bits 7..0)
+	"""
+	words = []
+	for start in range(0, len(packet), WORD_SIZE):
+		chunk = bytes(packet[start:start+WORD_SIZE])
+		words.append((int.from_bytes(chunk, 'little'), len(chunk) - 1, start == 0, start + WORD_SIZE >= len(packet)))
+	return words
+
+def formatWord(word):
+	"""
+	Line of a word, as written by the testbench
+	"""
+	data, remValue, sof, eof = word
+	return "%016X %d %d %d" % (data, remValue, int(sof), int(eof))
+
+def parseWords(text):
+	"""
+	Words written by the testbench, unknown values (X, U...) being kept as None
+	"""
+	words = []
+	for line in text.split("\n"):
+		parts = line.split()
+		if len(parts) != 4:
+			continue
+		try:
+			words.append((int(parts[0], 16), int(parts[1]), parts[2] == "1", parts[3] == "1"))
+		except ValueError:
+			words.append(None)
+	return words
+
+def compareWords(expected, actual):
+	"""
+	Compare the expected and recorded words: bytes after the REM of the
+	last word of a frame are ignored. Returns None if equal or a message
+	describing the first difference.
+	"""
+	frame = 1
+	for i, word in enumerate(expected):
+		if i >= len(actual):
+			return "word %d (frame %d): missing, %d words recorded" % (i, frame, len(actual))
+		got = actual[i]
+		mask = (1 << 8 * (word[1] + 1)) - 1 if word[3] else (1 << 8 * WORD_SIZE) - 1
+		if got is None or (got[0] & mask, got[1], got[2], got[3]) != (word[0] & mask, word[1], word[2], word[3]):
+			return "word %d (frame %d): expected %s, got %s" % (i, frame, formatWord(word), formatWord(got) if got is not None else "unknown value")
+		if word[3]:
+			frame+= 1
+	if len(actual) > len(expected):
+		return "%d words recorded after the expected ones" % (len(actual) - len(expected))
+	return None
+
+class TestCase:
+	"""
+	Simulation case: stimulus and expected output of one flow
+	"""
+
+	def __init__(self, name, flow, packets = PACKETS, keepRate = False):
+		"""
+		name: case name, used for file names
+		flow: configured flow
+		packets: number of frames to compare
+		keepRate: send the Rate modifier configuration (slower simulation,
+		the rate only changes the timing of the frames)
+		"""
+		self.name = name
+		frames = compileFlow(flow).frames
+		rate = flow.getModifierByType("rate")
+		rateEnabled = rate is not None and rate.enabled
+		if rateEnabled and not keepRate:
+			frames = [frame for frame in frames if frame.modifierId != rate.id]
+		self.__frames = frames
+		self.__packets = expectedPackets(flow, packets)
+		self.__expected = [word for packet in self.__packets for word in packetWords(packet)]
+		gap = fieldValue(rate, "gap") if rateEnabled and keepRate else 0
+		# Generous bound: configuration, frames with their 2 header words, and gaps
+		configWords = sum(len(frame.data) + len(frame.header) for frame in frames) // WORD_SIZE
+		frameCycles = sum(len(packet) // WORD_SIZE + 3 + gap // WORD_SIZE for packet in self.__packets)
+		self.maxCycles = SETUP_CYCLES + CYCLES_MARGIN * (configWords + frameCycles)
+
+	@property
+	def frames(self):
+		"""
+		Number of frames expected
+		"""
+		return len(self.__packets)
+
+	@property
+	def stimulusData(self):
+		"""
+		Configuration sent to the flow generator, in the configuration file format
+		"""
+		return "".join(frame.configData for frame in self.__frames)
+
+	@property
+	def expected(self):
+		"""
+		Expected output words (see packetWords)
+		"""
+		return self.__expected
+
+	@property
+	def expectedData(self):
+		"""
+		Expected output words, in the output format of the testbench
+		"""
+		return "".join(formatWord(word) + "\n" for word in self.__expected)
+
+	@property
+	def key(self):
+		"""
+		Identical cases have the same key: they are simulated once
+		"""
+		return (self.stimulusData, self.frames)
+
+	def write(self, directory):
+		"""
+		Write the stimulus and expected output files of the case,
+		returns the path of the stimulus file
+		"""
+		stimulusPath = os.path.join(directory, self.name + ".stimulus.txt")
+		with open(stimulusPath, 'w') as stimulusFile:
+			stimulusFile.write("-- " + self.name + "\n")
+			stimulusFile.write(self.stimulusData)
+		with open(os.path.join(directory, self.name + ".expected.txt"), 'w') as expectedFile:
+			expectedFile.write(self.expectedData)
+		return stimulusPath
+
+def hardwareCases(hardware, name, packets = PACKETS, keepRate = False):
+	"""
+	Cases of the enabled flows of a hardware, named after the flow numbers
+	"""
+	return [TestCase(name + "_flow" + str(i + 1), flow, packets, keepRate) for i, flow in enumerate(hardware.flows) if flow.enabled]
+
+def duplicateNames(cases):
+	"""
+	Names used by several cases: their files would overwrite each other
+	"""
+	seen = set()
+	duplicates = set()
+	for case in cases:
+		if case.name in seen:
+			duplicates.add(case.name)
+		seen.add(case.name)
+	return sorted(duplicates)
+
+class CaseResult:
+	"""
+	Result of the simulation of a case
+	"""
+
+	def __init__(self, case, passed, message = None):
+		"""
+		passed: True if the output is as expected, False if not, None if the simulation failed
+		message: difference or error
+		"""
+		self.case = case
+		self.passed = passed
+		self.message = message
+
+	def __str__(self):
+		status = "PASS" if self.passed else ("FAIL" if self.passed is not None else "ERROR")
+		return status + " " + self.case.name + ("" if self.message is None else ": " + self.message)
+
+class GhdlRunner:
+	"""
+	Simulates cases with GHDL. The sources are analysed and the testbench
+	elaborated once in the work directory, then the cases are run in parallel
+	with their files as generics of the testbench.
+	"""
+
+	def __init__(self, hdlPath, workDir, jobs = None, command = "ghdl"):
+		"""
+		hdlPath: hardware directory (hw/traffic_generator)
+		workDir: directory of the compiled design and of the case files
+		jobs: parallel simulations, the number of processors if None
+		command: GHDL executable
+		"""
+		self.__hdlPath = hdlPath
+		self.__workDir = os.path.abspath(workDir)
+		self.__jobs = jobs if jobs is not None else (os.cpu_count() or 1)
+		self.__command = shutil.which(command)
+		self.__prepared = False
+
+	@property
+	def available(self):
+		"""
+		Is GHDL installed?
+		"""
+		return self.__command is not None
+
+	def __ghdl(self, args, timeout = None):
+		"""
+		Run a GHDL command in the work directory, returns (success, output)
+		"""
+		try:
+			result = subprocess.run([self.__command] + args, cwd = self.__workDir, stdout = subprocess.PIPE, stderr = subprocess.STDOUT, universal_newlines = True, timeout = timeout)
+		except subprocess.TimeoutExpired:
+			return False, "timeout"
+		return result.returncode == 0, result.stdout.strip()
+
+	def prepare(self):
+		"""
+		Analyse the sources and elaborate the testbench.
+		Raises a RuntimeError if GHDL is missing or fails.
+		"""
+		if not self.available:
+			raise RuntimeError("GHDL is not installed")
+		sources = []
+		for source in SOURCES:
+			path = os.path.abspath(os.path.join(self.__hdlPath, source))
+			if os.path.isdir(path):
+				sources+= sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".vhd"))
+			else:
+				sources.append(path)
+		os.makedirs(self.__workDir, exist_ok = True)
+		options = ["--workdir=" + self.__workDir] + GHDL_OPTIONS
+		for args in (["-i"] + options + sources, ["-m"] + options + [TESTBENCH]):
+			success, output = self.__ghdl(args)
+			if not success:
+				raise RuntimeError("ghdl " + args[0] + " failed: " + output)
+		self.__prepared = True
+
+	def runCase(self, case):
+		"""
+		Simulate one case and compare its output
+		"""
+		stimulusPath = case.write(self.__workDir)
+		outputPath = os.path.join(self.__workDir, case.name + ".output.txt")
+		args = ["-r", "--workdir=" + self.__workDir] + GHDL_OPTIONS + [TESTBENCH,
+			"-gSTIMULUS_FILE=" + stimulusPath, "-gOUTPUT_FILE=" + outputPath,
+			"-gFRAMES=" + str(case.frames), "-gMAX_CYCLES=" + str(case.maxCycles),
+			"--ieee-asserts=disable"]
+		success, output = self.__ghdl(args)
+		if not success:
+			return CaseResult(case, None, output.splitlines()[-1] if output else "simulation failed")
+		try:
+			with open(outputPath) as outputFile:
+				actual = parseWords(outputFile.read())
+		except OSError as e:
+			return CaseResult(case, None, str(e))
+		difference = compareWords(case.expected, actual)
+		return CaseResult(case, difference is None, difference)
+
+	def run(self, cases, callback = None):
+		"""
+		Simulate cases in parallel, identical cases once.
+		Raises a ValueError if different cases have the same name.
+		callback is called with each result as it is available.
+		Returns the results in the order of the cases.
+		"""
+		if not self.__prepared:
+			self.prepare()
+		unique = {}
+		for case in cases:
+			unique.setdefault(case.key, case)
+		duplicates = duplicateNames(unique.values())
+		if duplicates:
+			raise ValueError("several cases are named " + ", ".join(duplicates))
+		results = {}
+		with ThreadPoolExecutor(max_workers = self.__jobs) as executor:
+			for future in as_completed([executor.submit(self.runCase, case) for case in unique.values()]):
+				result = future.result()
+				results[result.case.key] = result
+				if callback is not None:
+					callback(result)
+		# Duplicates get the result of the simulated case
+		return [CaseResult(case, results[case.key].passed, results[case.key].message) for case in cases]
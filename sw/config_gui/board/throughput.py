@@ -0,0 +1,169 @@
+"""
+RFC 2544 throughput test: binary search of the highest rate
+at which the device under test forwards every frame,
+for each frame size.
+"""
+
+from math import ceil
+
+from config_editor.sweep import SweepBuilder
+from .capture import FlowMatcher
+from .device import STATUS_FULL_CONFIG, STATUS_FINISHED
+
+# Maximum rate of the link (Mb/s)
+MAX_RATE = 10000
+
+class TrialResult:
+	"""
+	Result of one trial at a given frame size and rate
+	"""
+
+	def __init__(self, frameSize, rate, sent, received, unmatched, lossTolerance):
+		"""
+		sent, received: lists of packet counts per flow
+		unmatched: number of captured packets attributed to no flow
+		lossTolerance: fraction of lost frames accepted
+		"""
+		self.frameSize = frameSize
+		self.rate = rate
+		self.sent = sent
+		self.received = received
+		self.unmatched = unmatched
+		self.lost = sum(max(0, s - r) for s, r in zip(sent, received))
+		self.passed = self.lost <= lossTolerance * sum(sent)
+
+	def __str__(self):
+		return "%5d bytes at %5d Mb/s: %s (lost %d of %d)" % (self.frameSize, self.rate, "pass" if self.passed else "fail", self.lost, sum(self.sent))
+
+class ThroughputResult:
+	"""
+	Zero-loss throughput found for one frame size
+	"""
+
+	def __init__(self, frameSize, rate, frameRate, trials):
+		"""
+		rate: highest rate that passed (Mb/s on the link), 0 if none
+		frameRate: frames per second sent at this rate
+		trials: list of TrialResult, in order
+		"""
+		self.frameSize = frameSize
+		self.rate = rate
+		self.frameRate = frameRate
+		self.trials = trials
+
+	@property
+	def bitRate(self):
+		"""
+		Throughput in bits per second (frame bits only)
+		"""
+		return self.frameRate * self.frameSize * 8
+
+	def __str__(self):
+		return "%5d bytes: %12.0f frames/s, %8.3f Gb/s (rate setting %d Mb/s, %d trials)" % (self.frameSize, self.frameRate, self.bitRate / 1e9, self.rate, len(self.trials))
+
+class ThroughputSearch:
+	"""
+	Binary search driver over the Rate modifier rate
+	"""
+
+	def __init__(self, device, receiver, hardwarePath, baseConfig = None, flowCount = 1, resolution = 10, lossTolerance = 0, duration = None, timeout = None, fcsIncluded = False):
+		"""
+		device: board sending the traffic (Device)
+		receiver: capture of the traffic forwarded by the device under test (Receiver)
+		hardwarePath, baseConfig: hardware configuration and base configuration (see SweepBuilder)
+		flowCount: number of flows sharing the rate
+		resolution: search stops when the pass/fail interval is smaller (Mb/s)
+		lossTolerance: fraction of lost frames accepted in a trial
+		duration: trial duration (seconds), iterations of the base configuration if None
+		timeout: maximum time (seconds) to wait for the board in a trial
+		fcsIncluded: do captured packets include the Ethernet FCS?
+		"""
+		self.__device = device
+		self.__receiver = receiver
+		self.__builder = SweepBuilder(hardwarePath, baseConfig)
+		self.__flowCount = flowCount
+		self.__resolution = resolution
+		self.__lossTolerance = lossTolerance
+		self.__duration = duration
+		self.__timeout = timeout
+		self.__fcsIncluded = fcsIncluded
+		# (frame size, rate) -> (prepared upload, iterations per flow, frame rate)
+		self.__configs = {}
+		# frame size -> FlowMatcher
+		self.__matchers = {}
+
+	def __config(self, frameSize, rate):
+		"""
+		Compile and prepare the configuration of a trial, or reuse it
+		"""
+		key = (frameSize, rate)
+		if key not in self.__configs:
+			builder = self.__builder
+			builder.apply({"frame_size": frameSize, "flow_count": self.__flowCount, "rate": rate})
+			flows = [flow for flow in builder.hardware.flows if flow.enabled]
+			if self.__duration is not None:
+				for flow in flows:
+					iterationsField = flow.getModifierByType("skeleton_sender").getField("iterations")
+					iterationsField.userValue = max(1, int(ceil(self.__duration * flow.getModifierByType("rate").frameRate)))
+					iterationsField.auto = False
+			iterations = [flow.getModifierByType("skeleton_sender").getField("iterations").value for flow in flows]
+			prepared = self.__device.prepare(builder.compile().frames)
+			self.__configs[key] = (prepared, iterations, builder.predict()["frame_rate"])
+			if frameSize not in self.__matchers:
+				self.__matchers[frameSize] = FlowMatcher.fromHardware(builder.hardware, self.__fcsIncluded)
+		return self.__configs[key]
+
+	def trial(self, frameSize, rate):
+		"""
+		Run one trial: reconfigure, start, wait for the end
+		and count the received packets per flow
+		"""
+		prepared, iterations, frameRate = self.__config(frameSize, rate)
+		device = self.__device
+		device.reset()
+		device.upload(prepared)
+		if device.instances is not None and self.__flowCount >= device.instances:
+			device.waitStatus([STATUS_FULL_CONFIG], self.__timeout)
+		self.__receiver.start()
+		device.start()
+		device.waitStatus([STATUS_FINISHED], self.__timeout)
+		pcapPath = self.__receiver.stop()
+		received, unmatched = self.__matchers[frameSize].countPcap(pcapPath)
+		return TrialResult(frameSize, rate, iterations, received, unmatched, self.__lossTolerance)
+
+	def search(self, frameSize, callback = None):
+		"""
+		Binary search of the throughput for one frame size.
+		callback: called with each TrialResult, if set
+		"""
+		trials = []
+		def runTrial(rate):
+			result = self.trial(frameSize, rate)
+			trials.append(result)
+			if callback is not None:
+				callback(result)
+			return result.passed
+		# Highest passing and lowest failing rates
+		low = 0
+		high = MAX_RATE
+		if runTrial(high):
+			low = high
+		else:
+			while high - low > self.__resolution:
+				middle = (low + high) // 2
+				if middle == low:
+					break
+				if runTrial(middle):
+					low = middle
+				else:
+					high = middle
+		frameRate = 0
+		if low > 0:
+			frameRate = self.__config(frameSize, low)[2]
+		return ThroughputResult(frameSize, low, frameRate, trials)
+
+	def run(self, frameSizes, callback = None):
+		"""
+		Search the throughput of each frame size
+		"""
+		return [self.search(frameSize, callback) for frameSize in frameSizes]
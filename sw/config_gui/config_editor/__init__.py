@@ -1 +1,20 @@
-from .hardware import Hardware
\ No newline at end of file
+from .hardware import Hardware
+
+# Other classes, imported on first access
+__classModules = {
+	'CompiledConfig': 'compiled',
+	'ConfigDiff': 'diff',
+	'Archive': 'archive',
+	'ArchiveWriter': 'archive',
+	'FlowTable': 'flow_table',
+	'CompileCache': 'compile_cache'
+}
+
+def __getattr__(name):
+	"""
+	Import a class of the package when it is first accessed
+	"""
+	if name in __classModules:
+		from importlib import import_module
+		return getattr(import_module(__name__ + '.' + __classModules[name]), name)
+	raise AttributeError("module " + __name__ + " has no attribute " + name)
\ No newline at end of file
@@ -0,0 +1,275 @@
+"""
+Archive of many compiled configurations (scenarios) in one file.
+
+Each scenario is identified by a name and optional parameters.
+Identical frames (shared skeletons for example) are stored only once.
+The file is read through mmap: loading one scenario only reads
+the index entries of a binary search, its record and its frames.
+
+File layout (little endian):
+ * header: magic, version, scenario count, frame count,
+   offsets of the frame table and of the index
+ * frame data and scenario records, in the order they were added
+ * frame table: offset and size of each unique frame
+ * index: (key hash, record offset, record size), sorted by hash
+"""
+
+import json
+import mmap
+import struct
+import hashlib
+
+from .compiled import Frame, CompiledFlow, CompiledConfig, FRAME_HEADER, LAST_FRAME_HEADER
+
+MAGIC = b'TGCA'
+VERSION = 1
+
+# magic, version, scenario count, frame count, frame table offset, index offset
+_HEADER = struct.Struct('<4sIIIQQ')
+# frame data offset, frame data size, flags (bit 0: last frame of a flow)
+_FRAME = struct.Struct('<QII')
+# key hash, record offset, record size
+_INDEX = struct.Struct('<QQI')
+# key size, parameters size, flow count
+_RECORD = struct.Struct('<HIH')
+# flow number (0 if unknown), frame count
+_FLOW = struct.Struct('<HH')
+
+def scenarioKey(name, params = None):
+	"""
+	Unique key of a scenario: its name and its sorted parameters
+	"""
+	if not params:
+		return name
+	return name + "?" + json.dumps(params, sort_keys = True, separators = (',', ':'))
+
+def _keyHash(key):
+	"""
+	64 bits hash of a key, used to sort the index
+	"""
+	return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size = 8).digest(), 'little')
+
+class ArchiveWriter:
+	"""
+	Writes scenarios to a new archive file.
+	Use as a context manager or call close() to write the index.
+	"""
+
+	def __init__(self, filename):
+		self.__filename = filename
+		self.__file = open(filename, 'wb')
+		self.__file.write(bytes(_HEADER.size))
+		# Frame -> frame number
+		self.__frameIds = {}
+		# (offset, size, flags) for each frame number
+		self.__frameTable = []
+		# Key -> (hash, record offset, record size)
+		self.__index = {}
+		self.__referencedFrames = 0
+
+	def add(self, name, config, params = None):
+		"""
+		Add a scenario.
+		config: CompiledConfig or Hardware
+		params: dictionnary of parameters (JSON serializable), part of the key
+		"""
+		if not isinstance(config, CompiledConfig):
+			config = CompiledConfig.fromHardware(config)
+		if "?" in name:
+			raise ValueError("scenario names may not contain '?'")
+		key = scenarioKey(name, params)
+		if key in self.__index:
+			raise KeyError("scenario " + key + " is already in the archive")
+		# Frames first, so that the record is written in one block
+		flows = []
+		for flow in config.flows:
+			flows.append((flow.number or 0, [self.__addFrame(frame) for frame in flow.frames]))
+		keyBytes = key.encode('utf-8')
+		paramsBytes = json.dumps(params or {}, sort_keys = True).encode('utf-8')
+		record = bytearray(_RECORD.pack(len(keyBytes), len(paramsBytes), len(flows)))
+		record+= keyBytes + paramsBytes
+		for number, frameIds in flows:
+			record+= _FLOW.pack(number, len(frameIds))
+			record+= struct.pack('<%dI' % len(frameIds), *frameIds)
+		offset = self.__file.tell()
+		self.__file.write(record)
+		self.__index[key] = (_keyHash(key), offset, len(record))
+
+	def __addFrame(self, frame):
+		"""
+		Write a frame if it is not already in the archive,
+		and return its number
+		"""
+		self.__referencedFrames+= 1
+		frameId = self.__frameIds.get(frame)
+		if frameId is None:
+			frameId = len(self.__frameTable)
+			offset = self.__file.tell()
+			self.__file.write(frame.data)
+			self.__frameTable.append((offset, len(frame.data), 1 if frame.last else 0))
+			self.__frameIds[frame] = frameId
+		return frameId
+
+	@property
+	def uniqueFrames(self):
+		"""
+		Number of frames actually stored
+		"""
+		return len(self.__frameTable)
+
+	@property
+	def referencedFrames(self):
+		"""
+		Number of frames referenced by scenarios
+		"""
+		return self.__referencedFrames
+
+	def close(self):
+		"""
+		Write the frame table, the index and the header
+		"""
+		if self.__file is None:
+			return
+		frameTableOffset = self.__file.tell()
+		for entry in self.__frameTable:
+			self.__file.write(_FRAME.pack(*entry))
+		indexOffset = self.__file.tell()
+		for entry in sorted(self.__index.values()):
+			self.__file.write(_INDEX.pack(*entry))
+		self.__file.seek(0)
+		self.__file.write(_HEADER.pack(MAGIC, VERSION, len(self.__index), len(self.__frameTable), frameTableOffset, indexOffset))
+		self.__file.close()
+		self.__file = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+class Archive:
+	"""
+	Read-only random access to the scenarios of an archive
+	"""
+
+	def __init__(self, filename):
+		self.__file = open(filename, 'rb')
+		self.__map = mmap.mmap(self.__file.fileno(), 0, access = mmap.ACCESS_READ)
+		magic, version, self.__count, self.__frameCount, self.__frameTableOffset, self.__indexOffset = _HEADER.unpack_from(self.__map, 0)
+		if magic != MAGIC:
+			raise ValueError(filename + " is not a configuration archive")
+		if version != VERSION:
+			raise ValueError(filename + ": unsupported archive version " + str(version))
+
+	def __len__(self):
+		"""
+		Number of scenarios
+		"""
+		return self.__count
+
+	@property
+	def frameCount(self):
+		"""
+		Number of unique frames stored
+		"""
+		return self.__frameCount
+
+	def __findRecord(self, key):
+		"""
+		Binary search of a key in the index.
+		Returns the record offset and size, or None.
+		"""
+		keyHash = _keyHash(key)
+		low = 0
+		high = self.__count
+		while low < high:
+			middle = (low + high) // 2
+			entryHash = _INDEX.unpack_from(self.__map, self.__indexOffset + middle * _INDEX.size)[0]
+			if entryHash < keyHash:
+				low = middle + 1
+			else:
+				high = middle
+		# Check each entry with the same hash (collisions)
+		while low < self.__count:
+			entryHash, offset, size = _INDEX.unpack_from(self.__map, self.__indexOffset + low * _INDEX.size)
+			if entryHash != keyHash:
+				break
+			keySize = _RECORD.unpack_from(self.__map, offset)[0]
+			start = offset + _RECORD.size
+			if self.__map[start:start+keySize] == key.encode('utf-8'):
+				return offset, size
+			low+= 1
+		return None
+
+	def __readRecord(self, offset):
+		"""
+		Read a record: key, parameters and flows (list of (number, frame ids))
+		"""
+		keySize, paramsSize, flowCount = _RECORD.unpack_from(self.__map, offset)
+		position = offset + _RECORD.size
+		key = self.__map[position:position+keySize].decode('utf-8')
+		position+= keySize
+		params = json.loads(self.__map[position:position+paramsSize].decode('utf-8'))
+		position+= paramsSize
+		flows = []
+		for i in range(flowCount):
+			number, frameCount = _FLOW.unpack_from(self.__map, position)
+			position+= _FLOW.size
+			frameIds = struct.unpack_from('<%dI' % frameCount, self.__map, position)
+			position+= 4 * frameCount
+			flows.append((number, frameIds))
+		return key, params, flows
+
+	def __readFrame(self, frameId):
+		"""
+		Read one frame from the frame table
+		"""
+		offset, size, flags = _FRAME.unpack_from(self.__map, self.__frameTableOffset + frameId * _FRAME.size)
+		return Frame(LAST_FRAME_HEADER if flags & 1 else FRAME_HEADER, self.__map[offset:offset+size])
+
+	def __contains__(self, scenario):
+		"""
+		Is a scenario in the archive? scenario: a name, or (name, params)
+		as given to get (operator in)
+		"""
+		name, params = scenario if isinstance(scenario, tuple) else (scenario, None)
+		return self.__findRecord(scenarioKey(name, params)) is not None
+
+	def get(self, name, params = None):
+		"""
+		Load one scenario as a CompiledConfig.
+		Raises a KeyError if it is not in the archive.
+		"""
+		key = scenarioKey(name, params)
+		found = self.__findRecord(key)
+		if found is None:
+			raise KeyError(key)
+		key, params, flows = self.__readRecord(found[0])
+		compiledFlows = []
+		for number, frameIds in flows:
+			compiledFlows.append(CompiledFlow([self.__readFrame(frameId) for frameId in frameIds], number or None))
+		return CompiledConfig(compiledFlows)
+
+	def scenarios(self):
+		"""
+		Iterate over (name, parameters) of all scenarios, in index order
+		"""
+		for i in range(self.__count):
+			offset = _INDEX.unpack_from(self.__map, self.__indexOffset + i * _INDEX.size)[1]
+			key, params, flows = self.__readRecord(offset)
+			yield key.split("?", 1)[0], params
+
+	def close(self):
+		"""
+		Close the archive file
+		"""
+		if self.__map is not None:
+			self.__map.close()
+			self.__file.close()
+			self.__map = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
@@ -0,0 +1,332 @@
+"""
+Benchmarks of the hot paths of the configuration model and export,
+with baselines stored in a JSON file to detect regressions.
+Each benchmark gives the best time of one call over several repeats.
+A fixed reference work, independent of the sources, is measured just
+before each repeat: times are compared relative to it, so that a slower
+or busier machine does not look like a regression.
+"""
+
+import os
+import re
+import json
+import time
+import timeit
+import pickle
+import platform
+import tempfile
+
+from .hardware import Hardware
+
+# Version of the baselines file format
+BASELINES_FORMAT = 1
+# Flow counts of the export benchmarks
+FLOW_COUNTS = [2, 16, 64, 256]
+# Skeleton sizes of the PacketField benchmarks (bytes)
+PACKET_SIZES = [64, 512, 1522]
+# Slowdown below which a benchmark is never a regression (s):
+# sub-microsecond benchmarks vary by more than the threshold between runs
+MIN_DELTA = 1e-6
+# Data of the reference work
+REFERENCE_DATA = bytes(range(256))
+# Duration of one measure of the reference work (s)
+REFERENCE_TIME = 0.02
+
+def referenceWork():
+	"""
+	Fixed reference work: integer, bytes and string operations
+	like the ones of the model, but not using it
+	"""
+	value = 0
+	for byte in REFERENCE_DATA:
+		value = ((value << 8) | byte) & 0xFFFFFFFFFFFFFFFF
+	return REFERENCE_DATA.hex().upper() + str(value)
+
+def calibratedTimer(function, minTime):
+	"""
+	Timer of a function, and the number of calls
+	of one measure lasting at least minTime
+	"""
+	timer = timeit.Timer(function)
+	number = 1
+	while timer.timeit(number) < minTime:
+		number*= 2
+	return timer, number
+
+def machineName():
+	"""
+	Name of this machine, stored with the baselines
+	"""
+	return platform.node()
+
+class Benchmark:
+	"""
+	One measured operation
+	"""
+
+	def __init__(self, name, setup):
+		"""
+		name: unique name, "group/case"
+		setup: function called once before measuring,
+		returns the function to measure (without argument)
+		"""
+		self.name = name
+		self.__setup = setup
+
+	def run(self, reference, repeat = 5, minTime = 0.05):
+		"""
+		Time of one call (s): best of repeat measures,
+		each running the function for at least minTime.
+		reference: (timer, number) of the reference work, measured
+		before each measure (same machine load)
+		Returns (time of one call, time of one reference call)
+		"""
+		timer, number = calibratedTimer(self.__setup(), minTime)
+		referenceTimer, referenceNumber = reference
+		times = []
+		referenceTimes = []
+		for i in range(repeat):
+			referenceTimes.append(referenceTimer.timeit(referenceNumber) / referenceNumber)
+			times.append(timer.timeit(number) / number)
+		return min(times), min(referenceTimes)
+
+class BenchmarkSuite:
+	"""
+	Benchmarks built from a hardware configuration file
+	"""
+
+	def __init__(self, hardwarePath):
+		self.__hardwarePath = hardwarePath
+		with open(hardwarePath) as hardwareFile:
+			self.__hardwareConfig = json.load(hardwareFile)
+		self.__directory = tempfile.TemporaryDirectory()
+		# Number of flows -> hardware configuration path
+		self.__paths = {}
+		# Reference work timer, calibrated on first run
+		self.__reference = None
+		# Name -> time of the reference measured with the benchmark (s)
+		self.references = {}
+		self.benchmarks = []
+		self.__addModifierBenchmarks()
+		self.__addPacketBenchmarks()
+		self.__addRateBenchmarks()
+		self.__addHardwareBenchmarks()
+
+	def close(self):
+		"""
+		Remove the temporary files
+		"""
+		self.__directory.cleanup()
+
+	def __hardwarePathFor(self, flowCount):
+		"""
+		Hardware configuration file with flowCount flow generators
+		"""
+		if flowCount not in self.__paths:
+			config = dict(self.__hardwareConfig)
+			config['flow_generator'] = dict(config['flow_generator'], instances = flowCount)
+			path = os.path.join(self.__directory.name, "hardware-" + str(flowCount) + ".json")
+			with open(path, 'w') as hardwareFile:
+				json.dump(config, hardwareFile)
+			self.__paths[flowCount] = path
+		return self.__paths[flowCount]
+
+	def __hardware(self, flowCount):
+		"""
+		Hardware with all flows and modifiers enabled,
+		with 256-byte skeletons
+		"""
+		hardware = Hardware(self.__hardwarePathFor(flowCount))
+		for flow in hardware.flows:
+			flow.enabled = True
+			for modifier in flow.modifiers:
+				modifier.enabled = True
+			data = flow.getModifierByType("skeleton_sender").getField("data")
+			data.userValue = bytearray(range(256))
+			data.auto = False
+		return hardware
+
+	def __add(self, name, setup):
+		self.benchmarks.append(Benchmark(name, setup))
+
+	def __addModifierBenchmarks(self):
+		"""
+		Modifier.bytes of each modifier of the hardware
+		"""
+		names = set()
+		for modifierConfig in self.__hardwareConfig['flow_generator']['modifiers']:
+			if modifierConfig['type'] in names:
+				continue
+			names.add(modifierConfig['type'])
+			def setup(modifierType = modifierConfig['type']):
+				modifier = self.__hardware(1).flows[0].getModifierByType(modifierType)
+				return lambda: modifier.bytes
+			self.__add("modifier.bytes/" + modifierConfig['type'], setup)
+
+	def __addPacketBenchmarks(self):
+		"""
+		Skeleton PacketField set and get
+		"""
+		for size in PACKET_SIZES:
+			def setupSet(size = size):
+				field = self.__hardware(1).flows[0].getModifierByType("skeleton_sender").getField("data")
+				# Alternate values so that each set changes the field
+				values = [bytearray([i]) * size for i in range(2)]
+				def run():
+					field.userValue = values[0]
+					field.userValue = values[1]
+				return run
+			def setupGet(size = size):
+				field = self.__hardware(1).flows[0].getModifierByType("skeleton_sender").getField("data")
+				field.userValue = bytearray(size)
+				return lambda: field.value
+			self.__add("packet_field.set/" + str(size), setupSet)
+			self.__add("packet_field.get/" + str(size), setupGet)
+
+	def __addRateBenchmarks(self):
+		"""
+		Rate change and skeleton size change updating the gap
+		"""
+		def setupRate():
+			rate = self.__hardware(1).flows[0].getModifierByType("rate").getField("rate")
+			def run():
+				rate.userValue = 1000
+				rate.auto = False
+				rate.userValue = 2000
+			return run
+		def setupCascade():
+			flow = self.__hardware(1).flows[0]
+			rate = flow.getModifierByType("rate").getField("rate")
+			rate.userValue = 1000
+			rate.auto = False
+			data = flow.getModifierByType("skeleton_sender").getField("data")
+			values = [bytearray(64), bytearray(1518)]
+			def run():
+				data.userValue = values[0]
+				data.userValue = values[1]
+			return run
+		self.__add("rate.set", setupRate)
+		self.__add("rate.cascade", setupCascade)
+
+	def __addHardwareBenchmarks(self):
+		"""
+		Export, save and load of the whole hardware, and startup
+		"""
+		for flowCount in FLOW_COUNTS:
+			def setupConfigData(flowCount = flowCount):
+				hardware = self.__hardware(flowCount)
+				return lambda: hardware.configData
+			def setupExport(flowCount = flowCount):
+				hardware = self.__hardware(flowCount)
+				path = os.path.join(self.__directory.name, "export.txt")
+				return lambda: hardware.exportConfig(path)
+			def setupSave(flowCount = flowCount):
+				hardware = self.__hardware(flowCount)
+				hardware.saveTo(os.path.join(self.__directory.name, "save.gcf"))
+				return hardware.save
+			def setupLoad(flowCount = flowCount):
+				path = os.path.join(self.__directory.name, "load-" + str(flowCount) + ".gcf")
+				with open(path, 'wb') as saveFile:
+					pickle.dump(self.__hardware(flowCount), saveFile)
+				hardware = Hardware(self.__hardwarePathFor(flowCount))
+				return lambda: hardware.load(path)
+			self.__add("hardware.configData/" + str(flowCount), setupConfigData)
+			self.__add("hardware.exportConfig/" + str(flowCount), setupExport)
+			self.__add("hardware.save/" + str(flowCount), setupSave)
+			self.__add("hardware.load/" + str(flowCount), setupLoad)
+		self.__add("hardware.startup", lambda: lambda: Hardware(self.__hardwarePath))
+
+	def run(self, pattern = None, repeat = 5, progress = None, names = None):
+		"""
+		Run the benchmarks whose name matches the regular expression pattern (all if None),
+		and is in names if given.
+		progress: function called with each (name, time)
+		Returns a dictionnary name -> time of one call (s),
+		the reference times are stored in references
+		"""
+		if self.__reference is None:
+			self.__reference = calibratedTimer(referenceWork, REFERENCE_TIME)
+		results = {}
+		for benchmark in self.benchmarks:
+			if pattern is not None and not re.search(pattern, benchmark.name):
+				continue
+			if names is not None and benchmark.name not in names:
+				continue
+			results[benchmark.name], self.references[benchmark.name] = benchmark.run(self.__reference, repeat)
+			if progress is not None:
+				progress(benchmark.name, results[benchmark.name])
+		return results
+
+class Baselines:
+	"""
+	Results saved under a version label (release, commit...),
+	in a JSON file kept with the sources
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		# Version label -> {"date", "host", "python", "machine", "results", "references"}, in saving order
+		self.versions = {}
+		if os.path.exists(path):
+			with open(path) as baselinesFile:
+				content = json.load(baselinesFile)
+			if content.get('format') != BASELINES_FORMAT:
+				raise ValueError(path + ": unsupported baselines format " + str(content.get('format')))
+			self.versions = content['versions']
+
+	@property
+	def latest(self):
+		"""
+		Label of the last saved version, or None
+		"""
+		if not self.versions:
+			return None
+		return list(self.versions)[-1]
+
+	def latestOn(self, host):
+		"""
+		Label of the last version saved on a machine (see machineName), or None
+		"""
+		versions = [version for version, baseline in self.versions.items() if baseline.get('host') == host]
+		return versions[-1] if versions else None
+
+	def save(self, version, results, references):
+		"""
+		Store results and their reference times (see BenchmarkSuite.run)
+		under a version label (replaced if it exists) and write the file
+		"""
+		self.versions.pop(version, None)
+		self.versions[version] = {
+			'date': time.strftime("%Y-%m-%d %H:%M:%S"),
+			'host': machineName(),
+			'python': platform.python_version(),
+			'machine': (platform.machine() + " " + platform.processor()).strip(),
+			'results': results,
+			'references': dict((name, references[name]) for name in results)
+		}
+		with open(self.path, 'w') as baselinesFile:
+			json.dump({'format': BASELINES_FORMAT, 'versions': self.versions}, baselinesFile, indent = 1, sort_keys = False)
+			baselinesFile.write("\n")
+
+	def compare(self, version, results, references, threshold, minDelta = MIN_DELTA):
+		"""
+		Compare results with a saved version. Baseline times are scaled
+		by the ratio of the reference times measured with each benchmark
+		(not scaled for baselines saved without them).
+		threshold: accepted slowdown (0.2 for 20%)
+		minDelta: accepted slowdown whatever the ratio (s)
+		Returns a list of (name, scaled baseline time, time, ratio, regression?)
+		for the benchmarks present in both
+		"""
+		baseline = self.versions[version]['results']
+		baselineReferences = self.versions[version].get('references', {})
+		comparison = []
+		for name, value in results.items():
+			if name not in baseline:
+				continue
+			expected = baseline[name]
+			if name in baselineReferences and name in references:
+				expected*= references[name] / baselineReferences[name]
+			ratio = value / expected
+			comparison.append((name, expected, value, ratio, ratio > 1 + threshold and value - expected > minDelta))
+		return comparison
@@ -0,0 +1,186 @@
+"""
+Persistent cache of compiled modifiers, shared by exports and sweeps
+between runs. Each entry is the configuration bytes of one modifier
+(Modifier.bytes), stored in a file named after a hash of the modifier
+type, identifier and configuration field bytes.
+The least recently used entries are removed when the cache is too big.
+"""
+
+import os
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+# Default size limit of the cache directory (bytes)
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+# Default directory of the cache
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "traffic_generator")
+# Version of the key computation: changing it invalidates all entries
+KEY_VERSION = b"2"
+
+def modifierKey(modifier):
+	"""
+	Stable key of the compiled bytes of a modifier (hexadecimal)
+	"""
+	digest = hashlib.sha256(KEY_VERSION)
+	digest.update(modifier.type.encode() + b"\0" + str(modifier.id).encode())
+	for field in modifier.fields:
+		if field.inConfig:
+			view = field.getView(field.auto)
+			digest.update(len(view).to_bytes(4, 'big') + field.bitSize.to_bytes(4, 'big'))
+			digest.update(view)
+	return digest.hexdigest()
+
+class CompileCache:
+	"""
+	Cache directory of compiled modifiers,
+	with the most recent entries also kept in memory
+	"""
+
+	def __init__(self, directory = DEFAULT_DIRECTORY, maxSize = DEFAULT_MAX_SIZE, memoryEntries = 4096):
+		"""
+		directory: cache directory, created if needed
+		maxSize: size limit of the stored entries (bytes)
+		memoryEntries: number of entries also kept in memory
+		"""
+		self.__directory = directory
+		self.__maxSize = maxSize
+		self.__memoryEntries = memoryEntries
+		# Key -> bytes, least recently used first
+		self.__memory = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		os.makedirs(directory, exist_ok = True)
+		self.__size = sum(size for path, size, mtime in self.__entries())
+
+	@property
+	def directory(self):
+		"""
+		Cache directory
+		"""
+		return self.__directory
+
+	@property
+	def size(self):
+		"""
+		Size of the stored entries (bytes), as known by this instance
+		"""
+		return self.__size
+
+	@property
+	def hitRate(self):
+		"""
+		Fraction of the lookups found in the cache, None before any lookup
+		"""
+		lookups = self.hits + self.misses
+		if lookups == 0:
+			return None
+		return self.hits / lookups
+
+	def report(self):
+		"""
+		Human-readable statistics
+		"""
+		if self.hitRate is None:
+			return "compile cache: no lookup"
+		return "compile cache: %d hits, %d misses (%.1f%% hit rate), %.1f MiB in %s" % (self.hits, self.misses, self.hitRate * 100, self.__size / (1024 * 1024), self.__directory)
+
+	def __path(self, key):
+		return os.path.join(self.__directory, key[:2], key[2:])
+
+	def __entries(self):
+		"""
+		List of (path, size, last use time) of the stored entries
+		"""
+		entries = []
+		for subdirectory in os.scandir(self.__directory):
+			if not subdirectory.is_dir():
+				continue
+			for entry in os.scandir(subdirectory.path):
+				if entry.name.endswith(".tmp"):
+					continue
+				try:
+					stat = entry.stat()
+				except FileNotFoundError:
+					# Removed by an other process
+					continue
+				entries.append((entry.path, stat.st_size, stat.st_mtime))
+		return entries
+
+	def __remember(self, key, data):
+		"""
+		Keep an entry in memory
+		"""
+		self.__memory[key] = data
+		self.__memory.move_to_end(key)
+		if len(self.__memory) > self.__memoryEntries:
+			self.__memory.popitem(last = False)
+
+	def get(self, key):
+		"""
+		Get the bytes of an entry, or None (not counted in the statistics)
+		"""
+		data = self.__memory.get(key)
+		if data is not None:
+			self.__memory.move_to_end(key)
+			return data
+		path = self.__path(key)
+		try:
+			with open(path, 'rb') as entryFile:
+				data = entryFile.read()
+			# Last use time, for the eviction
+			os.utime(path)
+		except FileNotFoundError:
+			return None
+		self.__remember(key, data)
+		return data
+
+	def put(self, key, data):
+		"""
+		Store an entry. The file is written atomically
+		so that several processes can share the cache.
+		"""
+		data = bytes(data)
+		self.__remember(key, data)
+		path = self.__path(key)
+		os.makedirs(os.path.dirname(path), exist_ok = True)
+		with tempfile.NamedTemporaryFile('wb', dir = os.path.dirname(path), suffix = ".tmp", delete = False) as entryFile:
+			entryFile.write(data)
+		os.replace(entryFile.name, path)
+		self.__size+= len(data)
+		if self.__size > self.__maxSize:
+			self.evict()
+
+	def evict(self, targetSize = None):
+		"""
+		Remove the least recently used entries until the cache
+		is below targetSize (90% of the size limit by default)
+		"""
+		if targetSize is None:
+			targetSize = self.__maxSize * 9 // 10
+		entries = sorted(self.__entries(), key = lambda entry: entry[2])
+		size = sum(entry[1] for entry in entries)
+		for path, entrySize, mtime in entries:
+			if size <= targetSize:
+				break
+			try:
+				os.remove(path)
+			except FileNotFoundError:
+				pass
+			size-= entrySize
+		self.__size = size
+
+	def modifierBytes(self, modifier):
+		"""
+		Get the configuration bytes of a modifier (see Modifier.bytes),
+		from the cache if possible
+		"""
+		key = modifierKey(modifier)
+		data = self.get(key)
+		if data is not None:
+			self.hits+= 1
+			return data
+		self.misses+= 1
+		data = modifier.bytes
+		self.put(key, data)
+		return data
@@ -0,0 +1,281 @@
+"""
+Compiled configuration: the list of frames sent to the board.
+Frames are read and written with the same format as the
+configuration files read by the traffic_generator tool.
+"""
+
+import re
+from math import ceil
+
+# Header of a frame, depending on whether it is the last part of a flow
+FRAME_HEADER = bytes(8)
+LAST_FRAME_HEADER = b'\xff' * 8
+# Size of a FrameLink word
+WORD_SIZE = 8
+
+class Frame:
+	"""
+	One configuration frame as sent to the board:
+	a header of 8 bytes and the configuration of one modifier.
+	Data is stored in the order it is sent on the bus.
+	"""
+
+	def __init__(self, header, data):
+		"""
+		header: 8 bytes, all bits set if the frame is the last part of a flow
+		data: modifier configuration, as sent on the bus
+		"""
+		self.__header = bytes(header)
+		self.__data = bytes(data)
+
+	@classmethod
+	def fromModifierBytes(cls, modifierBytes, last):
+		"""
+		Build a frame from the bytes of a modifier (Modifier.bytes):
+		bytes are padded to a multiple of 8 and each word is reversed
+		"""
+		padding = -len(modifierBytes) % WORD_SIZE
+		if padding:
+			modifierBytes = bytes(modifierBytes) + bytes(padding)
+		data = bytearray(len(modifierBytes))
+		for start in range(0, len(modifierBytes), WORD_SIZE):
+			data[start:start+WORD_SIZE] = modifierBytes[start:start+WORD_SIZE][::-1]
+		return cls(LAST_FRAME_HEADER if last else FRAME_HEADER, data)
+
+	@property
+	def header(self):
+		"""
+		Header bytes
+		"""
+		return self.__header
+
+	@property
+	def data(self):
+		"""
+		Configuration bytes, as sent on the bus
+		"""
+		return self.__data
+
+	@property
+	def last(self):
+		"""
+		Is this frame the last part of a flow configuration?
+		"""
+		return self.__header[0] & 0x01 == 1
+
+	@property
+	def modifierId(self):
+		"""
+		Identifier of the configured modifier (first byte of the modifier
+		configuration, sent as the most significant byte of the first word)
+		"""
+		if len(self.__data) < WORD_SIZE:
+			return None
+		return self.__data[WORD_SIZE - 1]
+
+	@property
+	def size(self):
+		"""
+		Number of bytes sent for this frame
+		"""
+		return len(self.__header) + len(self.__data)
+
+	@property
+	def configData(self):
+		"""
+		Get the frame in the configuration file format
+		"""
+		return formatWords(self.__header) + "$\n" + formatWords(self.__data) + "#\n"
+
+	def __eq__(self, other):
+		return isinstance(other, Frame) and self.__header == other.header and self.__data == other.data
+
+	def __hash__(self):
+		return hash((self.__header, self.__data))
+
+	def __repr__(self):
+		return "Frame(id=" + str(self.modifierId) + ", last=" + str(self.last) + ", " + str(self.size) + " bytes)"
+
+class CompiledFlow:
+	"""
+	Frames of one flow generator, in the order they are sent
+	"""
+
+	def __init__(self, frames, number = None):
+		"""
+		frames: list of frames, the last one has the last header
+		number: flow number in the hardware (1-based), if known
+		"""
+		self.__frames = tuple(frames)
+		self.__number = number
+
+	@property
+	def frames(self):
+		"""
+		Frames of the flow
+		"""
+		return self.__frames
+
+	@property
+	def number(self):
+		"""
+		Flow number in the hardware (1-based), or None if unknown
+		"""
+		return self.__number
+
+	@property
+	def size(self):
+		"""
+		Number of bytes sent for this flow
+		"""
+		return sum(frame.size for frame in self.__frames)
+
+	def getFrame(self, modId):
+		"""
+		Get the frame configuring the modifier of given id, or None
+		"""
+		for frame in self.__frames:
+			if frame.modifierId == modId:
+				return frame
+		return None
+
+	def __eq__(self, other):
+		return isinstance(other, CompiledFlow) and self.__frames == other.frames
+
+	def __hash__(self):
+		return hash(self.__frames)
+
+class CompiledConfig:
+	"""
+	Full compiled configuration: frames of each enabled flow,
+	in the order they are dispatched to flow generators by the board.
+	"""
+
+	def __init__(self, flows):
+		"""
+		flows: list of CompiledFlow
+		"""
+		self.__flows = tuple(flows)
+
+	@classmethod
+	def fromHardware(cls, hardware):
+		"""
+		Compile the current configuration of a hardware
+		"""
+		flows = []
+		for i, flow in enumerate(hardware.flows):
+			if flow.enabled:
+				flows.append(compileFlow(flow, i+1))
+		return cls(flows)
+
+	@classmethod
+	def fromConfigData(cls, data):
+		"""
+		Parse a configuration in the file format.
+		Parsing follows the traffic_generator tool: comments are ignored,
+		each frame has a header part ended by $ and a data part ended by #.
+		"""
+		flows = []
+		frames = []
+		header = bytearray()
+		body = bytearray()
+		current = header
+		for line in data.split("\n"):
+			match = _LINE.match(line)
+			if match is None:
+				continue
+			value = match.group(0)
+			if value[0] == '$':
+				current = body
+			elif value[0] == '#':
+				if current is not body:
+					raise ValueError("configuration frame without header part")
+				frame = Frame(header, body)
+				frames.append(frame)
+				if frame.last:
+					flows.append(CompiledFlow(frames))
+					frames = []
+				header = bytearray()
+				body = bytearray()
+				current = header
+			else:
+				current+= bytes.fromhex(value.ljust(8, '0')[:8])[::-1]
+		if frames:
+			flows.append(CompiledFlow(frames))
+		return cls(flows)
+
+	@classmethod
+	def fromFile(cls, filename):
+		"""
+		Read a configuration file
+		"""
+		with open(filename) as configFile:
+			return cls.fromConfigData(configFile.read())
+
+	@property
+	def flows(self):
+		"""
+		Compiled flows, in dispatch order
+		"""
+		return self.__flows
+
+	@property
+	def frames(self):
+		"""
+		All frames, in sending order
+		"""
+		return [frame for flow in self.__flows for frame in flow.frames]
+
+	@property
+	def size(self):
+		"""
+		Number of bytes sent for the whole configuration
+		"""
+		return sum(flow.size for flow in self.__flows)
+
+	@property
+	def configData(self):
+		"""
+		Get the configuration in the file format (without comments)
+		"""
+		return "".join(frame.configData for frame in self.frames)
+
+	def exportConfig(self, filename):
+		"""
+		Export the configuration to a file
+		"""
+		with open(filename, 'w') as configFile:
+			configFile.write(self.configData)
+
+	def __eq__(self, other):
+		return isinstance(other, CompiledConfig) and self.__flows == other.flows
+
+	def __hash__(self):
+		return hash(self.__flows)
+
+# Meaningful part of a configuration line, as read by the traffic_generator tool
+_LINE = re.compile(r'[$#0-9A-Fa-f]{1,8}')
+
+def compileFlow(flow, number = None):
+	"""
+	Compile the frames of one flow generator.
+	Modifiers are sent in reverse order, the first one (skeleton sender)
+	being the last part of the flow configuration.
+	"""
+	modifiers = flow.enabled_modifiers
+	count = len(modifiers)
+	frames = []
+	for i, modifier in enumerate(reversed(modifiers)):
+		frames.append(Frame.fromModifierBytes(modifier.bytes, i == count - 1))
+	return CompiledFlow(frames, number)
+
+def formatWords(data):
+	"""
+	Format bytes as lines of 32 bits words,
+	as read by the traffic_generator tool
+	"""
+	lines = ""
+	for start in range(0, int(ceil(len(data)/4))*4, 4):
+		word = bytes(data[start:start+4]).ljust(4, b'\x00')
+		lines+= word[::-1].hex().upper() + "\n"
+	return lines
@@ -0,0 +1,251 @@
+"""
+Difference between two compiled configurations,
+to upload only what the board needs after a change.
+
+The board dispatches configuration frames to flow generators in order
+(see control.vhd): it has no way to address one flow generator directly.
+A reset (action 2) sends the reconf signal to every flow generator,
+which forgets its whole configuration, and restarts dispatching at the
+first flow. So:
+ * an unchanged configuration needs nothing,
+ * flows appended to a configuration still being received (status 1,
+   board not started) can be sent alone, without reset,
+ * any other change needs a reset and all frames to be sent again.
+"""
+
+from .compiled import CompiledConfig
+
+class FrameChange:
+	"""
+	Change of the frame of one modifier in one flow
+	"""
+
+	ADDED = "added"
+	REMOVED = "removed"
+	MODIFIED = "modified"
+
+	def __init__(self, flowIndex, modifierId, kind, oldFrame, newFrame):
+		"""
+		flowIndex: position of the flow in the dispatch order (0-based)
+		modifierId: identifier of the modifier
+		kind: ADDED, REMOVED or MODIFIED
+		oldFrame, newFrame: frames before and after (None if absent)
+		"""
+		self.flowIndex = flowIndex
+		self.modifierId = modifierId
+		self.kind = kind
+		self.oldFrame = oldFrame
+		self.newFrame = newFrame
+
+	def __str__(self):
+		return "flow " + str(self.flowIndex+1) + ": modifier " + str(self.modifierId) + " " + self.kind
+
+class UploadModel:
+	"""
+	Cost model of an upload with the traffic_generator tool.
+	Default values are rough estimates: calibrate them by timing
+	the tool on the target machine.
+	"""
+
+	def __init__(self, bandwidth = 100e6, frameOverhead = 50e-6, actionTime = 5e-3):
+		"""
+		bandwidth: bytes per second sent to the board
+		frameOverhead: fixed time to send one frame (seconds)
+		actionTime: time to send one action (reset) to the board (seconds)
+		"""
+		self.bandwidth = bandwidth
+		self.frameOverhead = frameOverhead
+		self.actionTime = actionTime
+
+	def uploadTime(self, frames, reset = False):
+		"""
+		Predicted time (seconds) to send the frames, after a reset if asked
+		"""
+		time = sum(self.frameOverhead + frame.size / self.bandwidth for frame in frames)
+		if reset:
+			time+= self.actionTime
+		return time
+
+class ConfigDiff:
+	"""
+	Frames to send to go from an old configuration to a new one
+	"""
+
+	def __init__(self, old, new, started = False, instances = None):
+		"""
+		old: CompiledConfig currently on the board (None if the board is empty)
+		new: CompiledConfig to set
+		started: has the board been started since the old configuration was sent?
+			Once started, only a reset brings it back to configuration.
+		instances: number of flow generators of the board.
+			If unknown, appending flows is never considered possible.
+		"""
+		if old is None:
+			old = CompiledConfig([])
+		self.__old = old
+		self.__new = new
+		self.__started = started
+		self.__instances = instances
+		self.__changes = self.__computeChanges()
+		self.__reason = None
+		self.__resetRequired = False
+		self.__frames = []
+		self.__plan()
+
+	def __computeChanges(self):
+		"""
+		Compare both configurations frame by frame,
+		per flow and per modifier identifier
+		"""
+		changes = []
+		oldFlows = self.__old.flows
+		newFlows = self.__new.flows
+		for index in range(max(len(oldFlows), len(newFlows))):
+			oldFrames = {}
+			newFrames = {}
+			if index < len(oldFlows):
+				oldFrames = dict((frame.modifierId, frame) for frame in oldFlows[index].frames)
+			if index < len(newFlows):
+				newFrames = dict((frame.modifierId, frame) for frame in newFlows[index].frames)
+			for modId, newFrame in newFrames.items():
+				oldFrame = oldFrames.get(modId)
+				if oldFrame is None:
+					changes.append(FrameChange(index, modId, FrameChange.ADDED, None, newFrame))
+				elif oldFrame != newFrame:
+					changes.append(FrameChange(index, modId, FrameChange.MODIFIED, oldFrame, newFrame))
+			for modId, oldFrame in oldFrames.items():
+				if modId not in newFrames:
+					changes.append(FrameChange(index, modId, FrameChange.REMOVED, oldFrame, None))
+		return changes
+
+	def __plan(self):
+		"""
+		Decide if a reset is needed and which frames to send
+		"""
+		oldFlows = self.__old.flows
+		newFlows = self.__new.flows
+		if self.__started:
+			self.__reason = "the board has been started: only a reset allows a new configuration"
+		elif not self.__changes:
+			self.__reason = "the configuration did not change"
+			return
+		elif len(oldFlows) == 0:
+			self.__reason = "the board is empty"
+			self.__frames = self.__new.frames
+			return
+		else:
+			appendOnly = len(newFlows) > len(oldFlows) and all(change.flowIndex >= len(oldFlows) for change in self.__changes)
+			if appendOnly and self.__instances is not None and len(oldFlows) < self.__instances:
+				self.__reason = "flows were only appended to a configuration still being received"
+				for flow in newFlows[len(oldFlows):]:
+					self.__frames+= flow.frames
+				return
+			firstFlow = min(change.flowIndex for change in self.__changes)
+			if appendOnly:
+				self.__reason = "flows were appended to a board that may be fully configured"
+			else:
+				self.__reason = "flow " + str(firstFlow+1) + " changed: the board cannot reconfigure one flow alone"
+		self.__resetRequired = True
+		self.__frames = self.__new.frames
+
+	@property
+	def changes(self):
+		"""
+		List of FrameChange between both configurations
+		"""
+		return list(self.__changes)
+
+	@property
+	def changedFlows(self):
+		"""
+		Sorted positions of the flows with at least one changed frame
+		"""
+		return sorted(set(change.flowIndex for change in self.__changes))
+
+	@property
+	def resetRequired(self):
+		"""
+		Should the reset action be sent before the frames?
+		"""
+		return self.__resetRequired
+
+	@property
+	def reason(self):
+		"""
+		Explanation of the chosen upload
+		"""
+		return self.__reason
+
+	@property
+	def frames(self):
+		"""
+		Frames to send, in order
+		"""
+		return list(self.__frames)
+
+	@property
+	def bytesToSend(self):
+		"""
+		Number of bytes to send
+		"""
+		return sum(frame.size for frame in self.__frames)
+
+	@property
+	def bytesTotal(self):
+		"""
+		Number of bytes of a full upload of the new configuration
+		"""
+		return self.__new.size
+
+	@property
+	def bytesSaved(self):
+		"""
+		Number of bytes not sent compared to a full upload
+		"""
+		return self.bytesTotal - self.bytesToSend
+
+	def uploadTime(self, model = None):
+		"""
+		Predicted time (seconds) of this upload
+		"""
+		if model is None:
+			model = UploadModel()
+		return model.uploadTime(self.__frames, self.__resetRequired)
+
+	def fullUploadTime(self, model = None):
+		"""
+		Predicted time (seconds) of a full upload (reset and all frames)
+		"""
+		if model is None:
+			model = UploadModel()
+		return model.uploadTime(self.__new.frames, True)
+
+	@property
+	def configData(self):
+		"""
+		Frames to send in the configuration file format
+		"""
+		return "".join(frame.configData for frame in self.__frames)
+
+	def exportConfig(self, filename):
+		"""
+		Export the frames to send to a file readable by the traffic_generator tool
+		"""
+		with open(filename, 'w') as configFile:
+			configFile.write(self.configData)
+
+	def report(self, model = None):
+		"""
+		What-if report of this upload compared to a full upload
+		"""
+		if model is None:
+			model = UploadModel()
+		lines = []
+		lines.append("Changed frames: " + str(len(self.__changes)))
+		for change in self.__changes:
+			lines.append("\t" + str(change))
+		lines.append("Reset required: " + ("yes" if self.__resetRequired else "no") + " (" + self.__reason + ")")
+		lines.append("Frames to send: " + str(len(self.__frames)) + " / " + str(len(self.__new.frames)))
+		lines.append("Bytes to send: " + str(self.bytesToSend) + " / " + str(self.bytesTotal) + " (saved: " + str(self.bytesSaved) + ")")
+		lines.append("Predicted upload time: %.3f ms (full upload: %.3f ms)" % (self.uploadTime(model) * 1e3, self.fullUploadTime(model) * 1e3))
+		return "\n".join(lines)
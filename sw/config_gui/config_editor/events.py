@@ -3,6 +3,8 @@ Enables some very simple event-driven programming
 without main loop (no threading)
 """
 
+from . import instrumentation
+
 class Event:
 	"""
 	Event definition as a class attribute
@@ -24,6 +26,13 @@ class Event:
 		self.__doc__ = fullDoc
 		# Initialize handlers list
 		self.__handlers = {}
+		self.__name = None
+
+	def __set_name__(self, owner, name):
+		"""
+		Remember the event name (for instrumentation)
+		"""
+		self.__name = owner.__name__ + "." + name
 
 	def __get__(self, inst, instClass):
 		"""
@@ -32,7 +41,7 @@ class Event:
 		if inst is None:
 			return self
 		if inst not in self.__handlers:
-			self.__handlers[inst] = EventHandler(inst)
+			self.__handlers[inst] = EventHandler(inst, self.__name)
 		return self.__handlers[inst]
 
 	def __set__(self, obj, value):
@@ -46,11 +55,12 @@ class EventHandler:
 	Event handler that keeps a list of callbacks
 	"""
 
-	def __init__(self, instance):
+	def __init__(self, instance, name = None):
 		"""
 		Remembers the instance that fires this event 
 		"""
 		self.__instance = instance
+		self.__name = name
 		self.__callbacks = []
 
 	def __iadd__(self, callback):
@@ -69,5 +79,8 @@ class EventHandler:
 		"""
 		Call all callbacks: makes the handler callable
 		"""
+		if instrumentation.active:
+			instrumentation.dispatch(self.__name, self.__instance, self.__callbacks, args, kwargs)
+			return
 		for callback in self.__callbacks:
 			callback(self.__instance, *args, **kwargs)
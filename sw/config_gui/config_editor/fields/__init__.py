@@ -1,4 +1,4 @@
 from .bits_field import BitsField
 from .unsigned_field import UnsignedField 
-from .packet_field import PacketField
+from .packet_field import PacketField, parseHex
 from .select_field import SelectField
\ No newline at end of file
@@ -76,7 +76,10 @@ class Field:
 		Override to add field-specific behaviour if needed.
 		"""
 		self.bitSize = field.bitSize
-		self.userBytes = field.userBytes
+		if field.hasUserValue:
+			self.userBytes = field.userBytes
+		else:
+			self.clearUserBytes()
 		self.autoBytes = field.autoBytes
 		self.auto = field.auto
 
@@ -202,20 +205,46 @@ class Field:
 		if self.__autoByteValue != self.__byteValue:
 			self.valueChangeEvent()
 
+	@property
+	def hasUserValue(self):
+		"""
+		Has the user value been set?
+		(It is copied from the auto value when first read.)
+		"""
+		return self.__byteValue is not None
+
+	def clearUserBytes(self):
+		"""
+		Unset the user value: it will be copied
+		from the auto value when first read
+		"""
+		if self.__byteValue is None:
+			return
+		changed = self.__byteValue != self.__autoByteValue
+		self.__byteValue = None
+		if changed and not self.auto:
+			self.valueChangeEvent()
+
 	def getBytes(self, auto = False):
 		"""
 		Get a copy of the current user or auto value 
 		as a byte array.
 		The user value is copied from the auto value if never set.
 		"""
-		value = None
+		return bytearray(self.getView(auto))
+
+	def getView(self, auto = False):
+		"""
+		Get the current user or auto value as a read-only memoryview,
+		without copy. The view follows later changes of the value,
+		but not changes of the size.
+		The user value is copied from the auto value if never set.
+		"""
 		if auto:
-			value = self.__autoByteValue
-		else:
-			if self.__byteValue is None:
-				self.__byteValue = bytearray(self.__autoByteValue)
-			value = self.__byteValue	
-		return bytearray(value)
+			return memoryview(self.__autoByteValue).toreadonly()
+		if self.__byteValue is None:
+			self.__byteValue = bytearray(self.__autoByteValue)
+		return memoryview(self.__byteValue).toreadonly()
 
 	def setBytes(self, value, auto = False):
 		"""
@@ -229,16 +258,29 @@ class Field:
 			if self.__byteValue is None:
 				self.__byteValue = bytearray(self.__autoByteValue)
 			toChange = self.__byteValue
-		valueLen = len(value)
-		for i in range(0, self.byteSize):
-			if valueLen > i:
-				toChange[i] = value[i]
-			else:
-				toChange[i] = 0
+		# Copy in place, truncated or completed with zeros
+		size = self.byteSize
+		length = min(len(value), size)
+		toChange[:length] = value[:length]
+		toChange[length:] = bytes(size - length)
 		# Fire the change event
 		if auto == self.auto:
 			self.valueChangeEvent()
 
+	def getInt(self, auto = False):
+		"""
+		Get the current user or auto value as an unsigned
+		integer, byte 0 being the least significant byte
+		"""
+		return int.from_bytes(self.getView(auto), 'little')
+
+	def setInt(self, value, auto = False):
+		"""
+		Set the current user or auto value from an unsigned
+		integer, byte 0 being the least significant byte
+		"""
+		self.setBytes(value.to_bytes(self.byteSize, 'little'), auto)
+
 	@property
 	def bytes(self):
 		"""
@@ -247,6 +289,14 @@ class Field:
 		"""
 		return self.getBytes(self.auto)
 
+	@property
+	def view(self):
+		"""
+		Get the current value (user or automatic) of
+		the field as a read-only memoryview, without copy.
+		"""
+		return self.getView(self.auto)
+
 	@property
 	def userBytes(self):
 		"""
@@ -1,5 +1,62 @@
+import re
+from array import array
 from .field import Field
-from math import ceil
+
+# Characters ignored when reading hexadecimal packet data
+_NOT_HEX = re.compile(r'[^a-fA-F0-9]')
+
+def parseHex(text):
+	"""
+	Returns the bytes written in hexadecimal in a text.
+	Characters other than hexadecimal digits are ignored,
+	an odd last digit is completed with a 0.
+	"""
+	# Fast path: pairs of digits separated by whitespace
+	try:
+		return bytearray.fromhex(text)
+	except ValueError:
+		pass
+	text = _NOT_HEX.sub('', text)
+	if len(text) % 2 != 0:
+		text+= "0"
+	return bytearray.fromhex(text)
+
+def packetToStored(value):
+	"""
+	Stored order of packet data: the 8 bytes words in reverse order,
+	the last incomplete word first, so that the first packet byte
+	is sent first once each word is reversed on the bus.
+	Words are moved as 64 bits items of an array (no per-byte work).
+	"""
+	full = len(value) - len(value) % 8
+	words = array('Q')
+	words.frombytes(bytes(value[:full]))
+	words.reverse()
+	return bytearray(value[full:]) + words.tobytes()
+
+def storedToPacket(stored):
+	"""
+	Packet data from its stored order (inverse of packetToStored)
+	"""
+	remaining = len(stored) % 8
+	words = array('Q')
+	words.frombytes(bytes(stored[remaining:]))
+	words.reverse()
+	return bytearray(words.tobytes()) + stored[:remaining]
+
+def alignLastWord(data, size):
+	"""
+	Configuration bytes (most significant first, see Modifier.bytes)
+	ending with a packet of size bytes that starts on a word boundary:
+	zeros are inserted before the last incomplete word of the packet,
+	so that it is sent in the first lanes of the bus, which the REM of
+	the last word designates (skeleton_sender.vhd sends stored words as is)
+	"""
+	remaining = size % 8
+	if remaining:
+		data = bytearray(data)
+		data[len(data)-remaining:len(data)-remaining] = bytes(8 - remaining)
+	return data
 
 class PacketField(Field):
 	"""
@@ -14,37 +71,18 @@ class PacketField(Field):
 		"""
 		super().__init__(bitSize, fieldId, name, description, editable, inConfig, minSize = minSize, maxSize = maxSize)
 
-	def __getByteIndex(self, pos):
-		"""
-		Returns the index in the stored bytes
-		from the position in the value
-		"""
-		word = int(pos / 8)
-		offset = pos % 8
-		start = word * 8
-		wordLen = min(8, self.byteSize - start)
-		newPos = start + wordLen - (offset+1)
-		return self.byteSize - (newPos + 1)
-
 	def __getValue(self, auto = False):
 		"""
 		Get the bytes value (auto or user)
 		"""
-		bytes = self.getBytes(auto)
-		value = bytearray(self.byteSize)
-		for pos in range(0, self.byteSize):
-			value[pos] = bytes[self.__getByteIndex(pos)]
-		return value
+		return storedToPacket(self.getView(auto))
 
 	def __setValue(self, value, auto = False):
 		"""
 		Set the bytes value (auto or user)
 		"""
 		self.bitSize = len(value) * 8
-		bytes = bytearray(self.byteSize)
-		for pos in range(0, self.byteSize):
-			bytes[self.__getByteIndex(pos)] = value[pos]
-		self.setBytes(bytes, auto)
+		self.setBytes(packetToStored(value), auto)
 
 	@property
 	def value(self):
@@ -57,9 +57,9 @@ class SelectField(Field):
 		Get the string value (auto or user)
 		None if unknown value.
 		"""
-		bytes = self.getBytes(auto)
+		view = self.getView(auto)
 		for name, value in self.__options.items():
-			if value == bytes:
+			if value == view:
 				return name
 		return None
 
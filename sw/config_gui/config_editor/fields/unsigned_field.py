@@ -54,12 +54,7 @@ class UnsignedField(Field):
 		"""
 		Get the integer value (auto or user)
 		"""
-		bytes = self.getBytes(auto)
-		size = self.byteSize
-		value = 0
-		for i in range(0, size):
-			value += bytes[i] * (1 << (8*i));
-		return value
+		return self.getInt(auto)
 
 	def __setValue(self, value, auto = False):
 		"""
@@ -72,11 +67,7 @@ class UnsignedField(Field):
 			return
 		if value < self.__min or value > self.__max:
 			raise FieldError(self, "value should be between the minimum and maximum")
-		bytes = self.getBytes(auto)
-		size = self.byteSize
-		for i in range(0, size):
-			bytes[i] = (value >> (8*i)) & 0xFF;
-		self.setBytes(bytes, auto)
+		self.setInt(value, auto)
 
 	@property
 	def value(self):
@@ -3,24 +3,72 @@ from .events import Event
 
 class FlowGenerator:
 	"""
-	Represents one flow generator with its modifiers
+	Represents one flow generator with its modifiers.
+	Flow generators of a hardware share a layout (modifier classes and
+	options) and create their modifiers only when they are first needed.
 	"""
 
 	enabledChangeEvent = Event("the flow has been enabled or disabled")
 	descriptionChangeEvent = Event("the flow description has been changed")
+	modifiersCreatedEvent = Event("the modifiers have been created from the layout")
 
-	def __init__(self):
+	def __init__(self, layout = None):
+		"""
+		layout: list of (modifier class, options) shared by flow generators,
+			modifiers are created from it on first access
+		"""
 		self.__enabled = False
-		# List with unique ids
-		self.__modifiers = []
+		self.__layout = layout
+		# List with unique ids (None until created from the layout)
+		self.__modifiers = None if layout else []
+		# Identifier -> modifier, type -> first modifier of this type
+		self.__modifierIds = {}
+		self.__modifierTypes = {}
 		self.__description = None
 
+	def __setstate__(self, state):
+		"""
+		Rebuild the indexes of flow generators saved without them
+		"""
+		self.__dict__.update(state)
+		self.__dict__.setdefault('_FlowGenerator__layout', None)
+		self.__modifierIds = {}
+		self.__modifierTypes = {}
+		for modifier in self.__modifiers or []:
+			self.__index(modifier)
+
+	def __index(self, modifier):
+		"""
+		Add a modifier to the indexes
+		"""
+		self.__modifierIds[modifier.id] = modifier
+		self.__modifierTypes.setdefault(modifier.type, modifier)
+
+	def __materialize(self):
+		"""
+		Create the modifiers from the layout, if not done yet
+		"""
+		if self.__modifiers is None:
+			self.__modifiers = []
+			for modClass, options in self.__layout:
+				self.addModifier(modClass(self, options))
+			self.modifiersCreatedEvent()
+		return self.__modifiers
+
+	@property
+	def materialized(self):
+		"""
+		Have the modifiers of this flow generator been created?
+		Until then, they all have their default values.
+		"""
+		return self.__modifiers is not None
+
 	def reset(self):
 		"""
 		Resets the values of this generator
 		"""
 		self.enabled = False
-		for modifier in self.__modifiers:
+		for modifier in self.__modifiers or []:
 			modifier.reset()
 
 	@property
@@ -54,6 +102,8 @@ class FlowGenerator:
 		"""
 		if enabled == self.__enabled:
 			return
+		if enabled:
+			self.__materialize()
 		self.__enabled = enabled
 		self.enabledChangeEvent()
 
@@ -64,6 +114,7 @@ class FlowGenerator:
 		if self.getModifier(modifier.id) is not None:
 			raise ModifierError(modifier, "the identifier is already used")
 		self.__modifiers.append(modifier)
+		self.__index(modifier)
 
 	def updateModifier(self, modifier):
 		"""
@@ -80,7 +131,7 @@ class FlowGenerator:
 		"""
 		Get a copy of the modifiers list 
 		"""
-		return list(self.__modifiers)
+		return list(self.__materialize())
 
 	@property
 	def enabled_modifiers(self):
@@ -88,7 +139,7 @@ class FlowGenerator:
 		Get a copy of the enabled modifiers list 
 		"""
 		mods = []
-		for modifier in self.__modifiers:
+		for modifier in self.__materialize():
 			if modifier.enabled:
 				mods.append(modifier)
 		return mods
@@ -97,25 +148,28 @@ class FlowGenerator:
 		"""
 		Get the modifier of given id, or None
 		"""
-		for modifier in self.__modifiers:
-			if modifier.id == modId:
-				return modifier
-		return None
+		self.__materialize()
+		return self.__modifierIds.get(modId)
 
 	def getModifierByType(self, modType):
 		"""
 		Get the first modifier of given type, or None
 		"""
-		for modifier in self.__modifiers:
-			if modifier.type == modType:
-				return modifier
-		return None
+		self.__materialize()
+		return self.__modifierTypes.get(modType)
 
 	@property
 	def configData(self):
 		"""
 		Get the configuration data 
 		"""
+		return self.getConfigData()
+
+	def getConfigData(self, cache = None):
+		"""
+		Get the configuration data,
+		with modifier bytes from a CompileCache if given
+		"""
 		data = ""
 		modifiers = self.enabled_modifiers
 		count = len(modifiers)
@@ -124,6 +178,6 @@ class FlowGenerator:
 				data+= "00000000\n00000000\n$\n"
 			else:
 				data+= "FFFFFFFF\nFFFFFFFF\n$\n"
-			data+= modifier.configData
+			data+= modifier.getConfigData(cache)
 			data+= "\n#\n"
 		return data
\ No newline at end of file
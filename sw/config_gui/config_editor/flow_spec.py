@@ -0,0 +1,223 @@
+"""
+Logical flow specifications, independent of a hardware layout.
+A specification is a dictionnary (usually read from JSON):
+
+{
+	"name": "dns",
+	"description": "DNS queries",
+	"skeleton": "01 00 5e 00 00 02 ...",
+	"iterations": 1000,
+	"rate": 500,
+	"modifiers": [
+		{"type": "checksum", "id": 3, "fields": {"start-offset": 14, "type": "IPv4"}},
+		{"type": "ethernet_fcs"}
+	]
+}
+
+"rate" (Mb/s) may be replaced by "gap" (bytes). Modifiers are matched
+by identifier if given, otherwise by type. Listed optional modifiers are
+enabled, the other ones are disabled.
+"""
+
+import json
+
+from .exceptions import ConfigError, FieldError, ModifierError
+from .fields import parseHex
+from .modifiers.rate import MIN_GAP, MAX_RATE as LINK_RATE
+
+# Skeleton sizes accepted by the skeleton sender (bytes)
+MIN_SKELETON_SIZE = 64
+MAX_SKELETON_SIZE = 1522
+# Largest inter-frame gap of the Rate modifier (32 bits, bytes)
+MAX_GAP = (1 << 32) - 1
+
+class FlowSpec:
+	"""
+	Specification of one logical flow
+	"""
+
+	def __init__(self, spec, source = "<spec>"):
+		"""
+		spec: specification dictionnary
+		source: name of the specification origin (for errors)
+		"""
+		self.__source = source
+		if type(spec) is not dict:
+			raise ConfigError(source, 'flow', 'should be a dictionnary')
+		self.__spec = spec
+		self.name = spec.get('name', "")
+		self.description = spec.get('description', self.name)
+		skeleton = spec.get('skeleton')
+		if type(skeleton) is not str:
+			raise ConfigError(source, 'skeleton', 'should be a hexadecimal string')
+		self.skeleton = bytes(parseHex(skeleton))
+		if not MIN_SKELETON_SIZE <= len(self.skeleton) <= MAX_SKELETON_SIZE:
+			raise ConfigError(source, 'skeleton', 'should be ' + str(MIN_SKELETON_SIZE) + ' to ' + str(MAX_SKELETON_SIZE) + ' bytes long, not ' + str(len(self.skeleton)))
+		self.iterations = spec.get('iterations')
+		if self.iterations is not None and (type(self.iterations) is not int or self.iterations < 1):
+			raise ConfigError(source, 'iterations', 'should be an integer of 1 or more')
+		self.rate = spec.get('rate')
+		if self.rate is not None and (type(self.rate) not in (int, float) or not 1 <= self.rate <= LINK_RATE):
+			raise ConfigError(source, 'rate', 'should be a number from 1 to ' + str(LINK_RATE) + ' (Mb/s)')
+		self.gap = spec.get('gap')
+		if self.gap is not None and (type(self.gap) is not int or not MIN_GAP <= self.gap <= MAX_GAP):
+			raise ConfigError(source, 'gap', 'should be an integer of ' + str(MIN_GAP) + ' or more (bytes)')
+		if self.rate is not None and self.gap is not None:
+			raise ConfigError(source, 'rate', 'rate and gap may not be both set')
+		modifiers = spec.get('modifiers', [])
+		if type(modifiers) is not list:
+			raise ConfigError(source, 'modifiers', 'should be a list')
+		for modifier in modifiers:
+			if type(modifier) is not dict or type(modifier.get('type')) is not str:
+				raise ConfigError(source, 'modifiers', 'items should be dictionnaries with a type')
+			if type(modifier.get('fields', {})) is not dict:
+				raise ConfigError(source, 'fields', 'should be a dictionnary')
+		self.modifiers = modifiers
+
+	@classmethod
+	def fromFile(cls, filename):
+		"""
+		Read a list of specifications from a JSON file:
+		either a list or a dictionnary with a "flows" list
+		"""
+		with open(filename) as specFile:
+			data = json.load(specFile)
+		if type(data) is dict:
+			data = data.get('flows')
+		if type(data) is not list:
+			raise ConfigError(filename, 'flows', 'should be a list')
+		return [cls(spec, filename) for spec in data]
+
+	@property
+	def spec(self):
+		"""
+		Specification dictionnary
+		"""
+		return self.__spec
+
+	@property
+	def requiredTypes(self):
+		"""
+		Dictionnary modifier type => number of modifiers of this type needed
+		"""
+		types = {}
+		for modifier in self.modifiers:
+			types[modifier['type']] = types.get(modifier['type'], 0) + 1
+		return types
+
+	@property
+	def linkRate(self):
+		"""
+		Rate used on the link (Mb/s), from the rate or gap.
+		Full link rate if none is set.
+		"""
+		if self.rate is not None:
+			return self.rate
+		if self.gap is not None:
+			size = len(self.skeleton) + 1
+			return (size + MIN_GAP) * LINK_RATE / (size + self.gap)
+		return LINK_RATE
+
+	def __findModifiers(self, flow):
+		"""
+		Find the flow modifier of each listed modifier.
+		Returns a list of (modifier, spec), or raises a ConfigError.
+		"""
+		found = []
+		used = set()
+		for modSpec in self.modifiers:
+			modifier = None
+			if 'id' in modSpec:
+				modifier = flow.getModifier(modSpec['id'])
+				if modifier is not None and modifier.type != modSpec['type']:
+					modifier = None
+			else:
+				for candidate in flow.modifiers:
+					if candidate.type == modSpec['type'] and candidate.id not in used:
+						modifier = candidate
+						break
+			if modifier is None or modifier.id in used:
+				raise ConfigError(self.__source, 'modifiers', self.name + ": no " + modSpec['type'] + " modifier available")
+			used.add(modifier.id)
+			found.append((modifier, modSpec))
+		return found
+
+	def fits(self, flow):
+		"""
+		Can this specification be applied to this flow generator?
+		"""
+		try:
+			self.__findModifiers(flow)
+		except ConfigError:
+			return False
+		return True
+
+	def __setField(self, field, key, value):
+		"""
+		Set the user value of a field, invalid values
+		raise a ConfigError on key
+		"""
+		try:
+			setFieldValue(field, value)
+		except (FieldError, ModifierError) as e:
+			raise ConfigError(self.__source, key, self.name + ": " + str(e))
+
+	def apply(self, flow):
+		"""
+		Configure a flow generator with this specification.
+		Raises a ConfigError if a value is not accepted.
+		"""
+		found = self.__findModifiers(flow)
+		flow.enabled = True
+		flow.description = self.description
+		# Skeleton first: other modifiers depend on its size
+		skeletonSender = flow.getModifierByType("skeleton_sender")
+		self.__setField(skeletonSender.getField("data"), 'skeleton', self.skeleton)
+		if self.iterations is not None:
+			self.__setField(skeletonSender.getField("iterations"), 'iterations', self.iterations)
+		listed = set(modifier.id for modifier, modSpec in found)
+		for modifier in flow.modifiers:
+			if not modifier.mandatory:
+				modifier.enabled = modifier.id in listed
+		for modifier, modSpec in found:
+			for fieldId, value in modSpec.get('fields', {}).items():
+				field = modifier.getField(fieldId)
+				if field is None:
+					raise ConfigError(self.__source, fieldId, self.name + ": unknown field of " + modSpec['type'])
+				self.__setField(field, fieldId, value)
+		# Rate last, once the size is known
+		rate = flow.getModifierByType("rate")
+		if self.rate is not None:
+			self.__setField(rate.getField("rate"), 'rate', int(round(self.rate)))
+		elif self.gap is not None:
+			self.__setField(rate.getField("gap"), 'gap', self.gap)
+
+def setFieldValue(field, value):
+	"""
+	Set the user value of a field from a simple value
+	(integer, option name, hexadecimal string or bytes).
+	Raises a FieldError if the value has the wrong type or range.
+	"""
+	if field.type == "UnsignedField":
+		if type(value) is not int:
+			raise FieldError(field, "value should be an integer")
+		field.userValue = value
+	elif field.type == "SelectField":
+		if type(value) is not str or value not in field.options:
+			raise FieldError(field, "value should be one of " + ", ".join(sorted(field.options)))
+		field.userValue = value
+	else:
+		if isinstance(value, str):
+			value = parseHex(value)
+		try:
+			# An integer would give a buffer of zeros
+			if isinstance(value, int):
+				raise TypeError()
+			value = bytearray(value)
+		except (TypeError, ValueError):
+			raise FieldError(field, "value should be a hexadecimal string or a list of bytes")
+		if field.type == "PacketField":
+			field.userValue = value
+		else:
+			field.userBytes = value
+	field.auto = False
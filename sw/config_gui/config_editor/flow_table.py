@@ -0,0 +1,408 @@
+"""
+Columnar view over the flows of a hardware, for bulk edits:
+one array per modifier field, one packed buffer for the skeletons.
+
+table = FlowTable(hardware)
+table.set("rate", "rate", linspace(100, 6400, 64), range(64))
+table.set("increment", "offset", 30)
+config = table.compile()
+table.sync()
+
+Values are validated for all edited flows at once, and compiled
+without going through the Field objects. They are written back to
+the Field objects only by sync() (or when reading table.hardware),
+and only for the edited cells.
+"""
+
+from array import array
+
+from .exceptions import FieldError, ModifierError
+from .compiled import Frame, CompiledFlow, CompiledConfig
+from .fields.packet_field import packetToStored, alignLastWord
+from .modifiers.rate import gapFromRate, rateFromGap
+
+def linspace(start, stop, count):
+	"""
+	count integers evenly spaced from start to stop (included)
+	"""
+	if count == 1:
+		return [int(round(start))]
+	step = (stop - start) / (count - 1)
+	return [int(round(start + i * step)) for i in range(count)]
+
+class _Column:
+	"""
+	Raw values of one field in every flow
+	"""
+
+	def __init__(self, fields):
+		"""
+		fields: the field of each flow
+		"""
+		self.field = fields[0]
+		self.fields = fields
+		self.values = array('Q') if self.field.bitSize <= 64 else []
+		self.auto = bytearray(len(fields))
+		# Cells changed since the last sync
+		self.dirty = bytearray(len(fields))
+		self.load()
+
+	def load(self):
+		"""
+		Read the values of the fields
+		"""
+		values = [int.from_bytes(field.bytes, 'little') for field in self.fields]
+		self.values[:] = array('Q', values) if type(self.values) is array else values
+		self.auto[:] = bytes(bool(field.auto) for field in self.fields)
+		self.dirty[:] = bytes(len(self.fields))
+
+	def toRaw(self, values):
+		"""
+		Check values for this field and convert them to raw integers.
+		Raises a FieldError if a value is invalid.
+		"""
+		field = self.field
+		if field.type == "UnsignedField":
+			if not all(type(value) is int for value in values):
+				raise FieldError(field, "values should be integers")
+			if values and (min(values) < field.minimum or max(values) > field.maximum):
+				raise FieldError(field, "value should be between the minimum and maximum")
+			return values
+		if field.type == "SelectField":
+			options = dict((name, int.from_bytes(value, 'little')) for name, value in field.options.items())
+			try:
+				return [options[value] for value in values]
+			except (KeyError, TypeError):
+				raise FieldError(field, "values should be option names")
+		raise FieldError(field, "this field may not be edited in a table")
+
+	def fromRaw(self, raw):
+		"""
+		Value of the field for a raw integer
+		"""
+		if self.field.type == "SelectField":
+			for name, value in self.field.options.items():
+				if int.from_bytes(value, 'little') == raw:
+					return name
+			return None
+		return raw
+
+class FlowTable:
+	"""
+	Columnar copy of the configuration of all flows of a hardware.
+	All flow generators of a hardware have the same modifiers.
+	"""
+
+	def __init__(self, hardware):
+		self.__hardware = hardware
+		flows = hardware.flows
+		self.__count = len(flows)
+		prototype = flows[0]
+		# Modifier layout: (id, type, [field keys in config order])
+		self.__layout = []
+		# Modifier id or type -> id, (id, field id) -> column
+		self.__modifierIds = {}
+		self.__columns = {}
+		for modifier in prototype.modifiers:
+			self.__modifierIds[modifier.id] = modifier.id
+			self.__modifierIds.setdefault(modifier.type, modifier.id)
+			keys = []
+			for index, field in enumerate(modifier.fields):
+				key = (modifier.id, field.id if field.id is not None else index)
+				if field.type == "PacketField":
+					self.__packetKey = key
+				else:
+					self.__columns[key] = _Column([flow.getModifier(modifier.id).fields[index] for flow in flows])
+				if field.inConfig:
+					keys.append((key, field.bitSize))
+			self.__layout.append((modifier.id, modifier.type, modifier.mandatory, keys))
+		skeletonId = self.__modifierIds["skeleton_sender"]
+		rateId = self.__modifierIds["rate"]
+		self.__sizeColumn = self.__columns[(skeletonId, "size")]
+		self.__rateColumn = self.__columns[(rateId, "rate")]
+		self.__gapColumn = self.__columns[(rateId, "gap")]
+		# Skeletons: fixed stride buffer and lengths
+		packetField = prototype.getModifier(skeletonId).getField("data")
+		self.__packetFields = [flow.getModifier(skeletonId).getField("data") for flow in flows]
+		self.__stride = packetField.maxBitSize // 8
+		self.__minLength = packetField.minBitSize // 8
+		self.__skeletons = bytearray(self.__stride * self.__count)
+		self.__lengths = array('H', bytes(2 * self.__count))
+		self.__skeletonDirty = bytearray(self.__count)
+		# Enabled flows and modifiers
+		self.__enabled = bytearray(self.__count)
+		self.__modifierEnabled = dict((modId, bytearray(self.__count)) for modId, modType, mandatory, keys in self.__layout)
+		self.__enabledDirty = bytearray(self.__count)
+		# Compiled flows, None when changed since the last compilation
+		self.__compiled = [None] * self.__count
+		self.refresh()
+
+	def refresh(self):
+		"""
+		Read the configuration of the hardware again.
+		Changes not synchronized are lost.
+		"""
+		for column in self.__columns.values():
+			column.load()
+		for index, field in enumerate(self.__packetFields):
+			self.__storeSkeleton(index, field.value)
+		self.__skeletonDirty[:] = bytes(self.__count)
+		for index, flow in enumerate(self.__hardware.flows):
+			self.__enabled[index] = flow.enabled
+			for modifier in flow.modifiers:
+				self.__modifierEnabled[modifier.id][index] = modifier.enabled
+		self.__enabledDirty[:] = bytes(self.__count)
+		self.__compiled = [None] * self.__count
+
+	def __len__(self):
+		return self.__count
+
+	def __indexes(self, flows):
+		"""
+		List of flow indexes from None (all), an index, a slice or an iterable
+		"""
+		if flows is None:
+			return range(self.__count)
+		if isinstance(flows, slice):
+			return range(*flows.indices(self.__count))
+		if isinstance(flows, int):
+			flows = [flows]
+		flows = list(flows)
+		if flows and (min(flows) < 0 or max(flows) >= self.__count):
+			raise IndexError("flow index out of range")
+		return flows
+
+	def __spread(self, values, indexes, scalarTypes):
+		"""
+		List of one value per index from a scalar or a sequence
+		"""
+		if isinstance(values, scalarTypes):
+			return [values] * len(indexes)
+		values = list(values)
+		if len(values) != len(indexes):
+			raise ValueError(str(len(values)) + " values for " + str(len(indexes)) + " flows")
+		return values
+
+	def __column(self, modifier, fieldId):
+		"""
+		Column of a field, modifier is an identifier or a type
+		"""
+		modId = self.__modifierIds.get(modifier)
+		column = self.__columns.get((modId, fieldId))
+		if column is None:
+			raise KeyError("no field " + str(fieldId) + " in modifier " + str(modifier))
+		return column
+
+	def get(self, modifier, fieldId, flows = None):
+		"""
+		Values of a field (integers or option names)
+		modifier: modifier identifier or type
+		"""
+		column = self.__column(modifier, fieldId)
+		return [column.fromRaw(column.values[index]) for index in self.__indexes(flows)]
+
+	def set(self, modifier, fieldId, values, flows = None):
+		"""
+		Set the user value of a field in several flows.
+		modifier: modifier identifier or type
+		values: one value for all flows or a sequence of values
+		flows: None (all flows), an index, a slice or a list of indexes
+		All values are checked before any change.
+		"""
+		column = self.__column(modifier, fieldId)
+		if not column.field.editable:
+			raise FieldError(column.field, "this field may not be edited")
+		indexes = self.__indexes(flows)
+		raw = column.toRaw(self.__spread(values, indexes, (int, str)))
+		if isinstance(indexes, range) and indexes.step == 1 and type(column.values) is array:
+			column.values[indexes.start:indexes.stop] = array('Q', raw)
+			column.auto[indexes.start:indexes.stop] = bytes(len(indexes))
+			column.dirty[indexes.start:indexes.stop] = b'\x01' * len(indexes)
+		else:
+			for index, value in zip(indexes, raw):
+				column.values[index] = value
+				column.auto[index] = 0
+				column.dirty[index] = 1
+		# Like the Rate modifier, setting the rate or gap makes the other one automatic
+		if column is self.__rateColumn or column is self.__gapColumn:
+			other = self.__gapColumn if column is self.__rateColumn else self.__rateColumn
+			for index in indexes:
+				other.auto[index] = 1
+		self.__derive(indexes)
+
+	@property
+	def skeletons(self):
+		"""
+		Packet data of each flow
+		"""
+		return [self.skeleton(index) for index in range(self.__count)]
+
+	def skeleton(self, index):
+		"""
+		Packet data of one flow
+		"""
+		start = index * self.__stride
+		return bytes(self.__skeletons[start:start+self.__lengths[index]])
+
+	def __storeSkeleton(self, index, data):
+		"""
+		Copy packet data in the buffer
+		"""
+		start = index * self.__stride
+		self.__skeletons[start:start+len(data)] = data
+		self.__lengths[index] = len(data)
+
+	def setSkeletons(self, values, flows = None):
+		"""
+		Set the packet data of several flows
+		values: one packet for all flows or a sequence of packets
+		"""
+		indexes = self.__indexes(flows)
+		values = self.__spread(values, indexes, (bytes, bytearray))
+		lengths = [len(value) for value in values]
+		if lengths and (min(lengths) < self.__minLength or max(lengths) > self.__stride):
+			raise FieldError(self.__packetFields[0], "unauthorized field size")
+		for index, value in zip(indexes, values):
+			self.__storeSkeleton(index, value)
+			self.__skeletonDirty[index] = 1
+		self.__derive(indexes)
+
+	def __derive(self, indexes):
+		"""
+		Update the automatic values depending on other fields
+		(data size, rate and gap), like the modifiers do
+		"""
+		size = self.__sizeColumn
+		rate = self.__rateColumn
+		gap = self.__gapColumn
+		for index in indexes:
+			size.values[index] = self.__lengths[index]
+			if not gap.auto[index]:
+				rate.values[index] = rateFromGap(gap.values[index], size.values[index])
+			else:
+				gap.values[index] = gapFromRate(rate.values[index], size.values[index])
+				if rate.auto[index]:
+					rate.values[index] = rateFromGap(gap.values[index], size.values[index])
+			self.__compiled[index] = None
+
+	@property
+	def enabled(self):
+		"""
+		Is each flow enabled?
+		"""
+		return [bool(value) for value in self.__enabled]
+
+	def setEnabled(self, values, flows = None):
+		"""
+		Enable or disable several flows
+		"""
+		indexes = self.__indexes(flows)
+		for index, value in zip(indexes, self.__spread(values, indexes, (bool, int))):
+			self.__enabled[index] = bool(value)
+			self.__enabledDirty[index] = 1
+			self.__compiled[index] = None
+
+	def setModifierEnabled(self, modifier, values, flows = None):
+		"""
+		Enable or disable a modifier in several flows
+		"""
+		modId = self.__modifierIds.get(modifier)
+		if modId is None:
+			raise KeyError("no modifier " + str(modifier))
+		indexes = self.__indexes(flows)
+		values = self.__spread(values, indexes, (bool, int))
+		for layoutId, modType, mandatory, keys in self.__layout:
+			if layoutId == modId and mandatory and not all(values):
+				raise ModifierError(self.__hardware.flows[0].getModifier(modId), "Mandatory modifiers may not be disabled")
+		enabled = self.__modifierEnabled[modId]
+		for index, value in zip(indexes, values):
+			enabled[index] = bool(value)
+			self.__enabledDirty[index] = 1
+			self.__compiled[index] = None
+
+	def __modifierBytes(self, index, modId, keys):
+		"""
+		Same bytes as Modifier.bytes, from the columns:
+		the identifier and each field, most significant bits first
+		(with the last word of the skeleton aligned as by SkeletonSender)
+		"""
+		value = modId
+		bitSize = 8
+		packetSize = None
+		for key, fieldBits in keys:
+			if key == self.__packetKey:
+				packetSize = self.__lengths[index]
+				fieldBits = packetSize * 8
+				raw = int.from_bytes(packetToStored(self.skeleton(index)), 'little')
+			else:
+				raw = self.__columns[key].values[index]
+			value = (value << fieldBits) | raw
+			bitSize+= fieldBits
+		padding = -bitSize % 8
+		data = (value << padding).to_bytes((bitSize + padding) // 8, 'big')
+		if packetSize is not None:
+			data = bytes(alignLastWord(data, packetSize))
+		return data
+
+	def compileFlow(self, index):
+		"""
+		Compile one flow from the columns (reused if unchanged)
+		"""
+		if self.__compiled[index] is None:
+			modifiers = [(modId, keys) for modId, modType, mandatory, keys in self.__layout if self.__modifierEnabled[modId][index]]
+			frames = []
+			for i, (modId, keys) in enumerate(reversed(modifiers)):
+				frames.append(Frame.fromModifierBytes(self.__modifierBytes(index, modId, keys), i == len(modifiers) - 1))
+			self.__compiled[index] = CompiledFlow(frames, index + 1)
+		return self.__compiled[index]
+
+	def compile(self):
+		"""
+		Compile the enabled flows, without synchronizing the fields
+		"""
+		return CompiledConfig([self.compileFlow(index) for index in range(self.__count) if self.__enabled[index]])
+
+	def sync(self):
+		"""
+		Write the changed cells to the Field objects.
+		Skeletons are written first and rate fields last,
+		so that the automatic values are computed by the modifiers.
+		Returns the number of cells written.
+		"""
+		written = 0
+		flows = self.__hardware.flows
+		for index in range(self.__count):
+			if self.__enabledDirty[index]:
+				flow = flows[index]
+				flow.enabled = bool(self.__enabled[index])
+				for modifier in flow.modifiers:
+					modifier.enabled = bool(self.__modifierEnabled[modifier.id][index])
+				self.__enabledDirty[index] = 0
+				written+= 1
+			if self.__skeletonDirty[index]:
+				field = self.__packetFields[index]
+				field.userValue = bytearray(self.skeleton(index))
+				field.auto = False
+				self.__skeletonDirty[index] = 0
+				written+= 1
+		columns = sorted(self.__columns.values(), key = lambda column: column is self.__rateColumn or column is self.__gapColumn)
+		for column in columns:
+			if not any(column.dirty):
+				continue
+			for index in range(self.__count):
+				if column.dirty[index]:
+					if not column.auto[index]:
+						field = column.fields[index]
+						field.userValue = column.fromRaw(column.values[index])
+						field.auto = False
+						written+= 1
+					column.dirty[index] = 0
+		return written
+
+	@property
+	def hardware(self):
+		"""
+		Hardware, with the changes synchronized
+		"""
+		self.sync()
+		return self.__hardware
@@ -4,7 +4,7 @@ import pickle
 from .exceptions import ConfigError, ModifierError
 from .flow_generator import FlowGenerator
 from .modifiers import getModifier
-from pprint import pprint
+from . import instrumentation
 
 class Hardware:
 	"""
@@ -36,20 +36,22 @@ class Hardware:
 		if 'modifiers' not in flowConfig or type(flowConfig['modifiers']) is not list:
 			raise ConfigError(hardwarePath, 'modifiers', 'should be a list')
 		modifiersConfig = flowConfig['modifiers']
+		# Modifier layout, shared by all flow generators
+		layout = []
+		for modifierConfig in modifiersConfig:
+			if type(modifierConfig) is not dict:
+				raise ConfigError(hardwarePath, 'modifiers', 'items in the list should be dictionnaries')
+			if 'type' not in modifierConfig or type(modifierConfig['type']) is not str:
+				raise ConfigError(hardwarePath, 'type', 'should contain the modifier type name')
+			if 'config' not in modifierConfig or type(modifierConfig['config']) is not dict:
+				raise ConfigError(hardwarePath, 'config', 'should contain the modifier configuration dictionnary')
+			modClass = getModifier(modifierConfig['type'])
+			if modClass is None:
+				raise ConfigError(hardwarePath, 'type', modifierConfig['type'] + " is an unknown modifier type")
+			layout.append((modClass, modifierConfig['config']))
+		# Flow generators create their modifiers when first needed
 		for index in range(0, instances):
-			generator = FlowGenerator()
-			self.__flows.append(generator)
-			for modifierConfig in modifiersConfig:
-				if type(modifierConfig) is not dict:
-					raise ConfigError(hardwarePath, 'modifiers', 'items in the list should be dictionnaries')
-				if 'type' not in modifierConfig or type(modifierConfig['type']) is not str:
-					raise ConfigError(hardwarePath, 'type', 'should contain the modifier type name')
-				if 'config' not in modifierConfig or type(modifierConfig['config']) is not dict:
-					raise ConfigError(hardwarePath, 'config', 'should contain the modifier configuration dictionnary')
-				modClass = getModifier(modifierConfig['type'])
-				if modClass is None:
-					raise ConfigError(hardwarePath, 'type', modifierConfig['type'] + " is an unknown modifier type")
-				generator.addModifier(modClass(generator, modifierConfig['config']))
+			self.__flows.append(FlowGenerator(layout))
 		# Initialize
 		self.__initState()
 
@@ -74,30 +76,65 @@ class Hardware:
 		"""
 		return self.__flows
 
+	def flowConfigData(self, index, cache = None):
+		"""
+		Get the configuration data of one flow, with its comments.
+		cache: CompileCache to get the modifier bytes from, if any
+		"""
+		flow = self.__flows[index]
+		data = "--------------------\n"
+		data+= "-- Flow " + str(index+1) + "\n"
+		if flow.description:
+			data+= "-- \n"
+			for line in flow.description.split("\n"):
+				data+= "-- " + line + "\n"
+		data+= "--------------------\n"
+		data+= flow.getConfigData(cache)
+		return data
+
 	@property
 	def configData(self):
 		"""
 		Get the configuration data 
 		"""
+		return self.getConfigData()
+
+	@instrumentation.timed("Hardware.configData")
+	def getConfigData(self, cache = None):
+		"""
+		Get the configuration data,
+		with modifier bytes from a CompileCache if given
+		"""
 		data = ""
 		for i, flow in enumerate(self.__flows):
 			if flow.enabled:
-				data+= "--------------------\n"
-				data+= "-- Flow " + str(i+1) + "\n"
-				if flow.description:
-					data+= "-- \n"
-					for line in flow.description.split("\n"):
-						data+= "-- " + line + "\n"
-				data+= "--------------------\n"				
-				data+= flow.configData
+				data+= self.flowConfigData(i, cache)
 		return data
 
-	def exportConfig(self, filename):
+	@instrumentation.timed("Hardware.exportConfig")
+	def exportConfig(self, filename, cache = None):
 		"""
-		Export the configuration to a file
+		Export the configuration to a file.
+		cache: CompileCache checked before compiling each modifier, if any
 		"""
 		with open(filename, 'w') as configFile:
-				configFile.write(self.configData)
+				configFile.write(self.getConfigData(cache))
+
+	def snapshot(self):
+		"""
+		Get a copy of the current state as bytes,
+		to be used in an other thread or process (see fromSnapshot)
+		"""
+		return pickle.dumps(self)
+
+	@staticmethod
+	def fromSnapshot(snapshot):
+		"""
+		Get an independent hardware from a snapshot.
+		Its modifiers do not update automatic values anymore:
+		it should only be read.
+		"""
+		return pickle.loads(snapshot)
 
 	@property
 	def filename(self):
@@ -126,10 +163,11 @@ class Hardware:
 			return False
 		return True
 
-	def load(self, filename):
+	def load(self, filename, remember = True):
 		"""
 		Loads the configuration from a given file.
-		Tries to adapt to different hardware nicely
+		Tries to adapt to different hardware nicely.
+		remember: save to this file afterwards (see save)
 		"""
 		hardware = None
 		try:
@@ -142,12 +180,18 @@ class Hardware:
 				break
 			# Copy flow properties
 			myFlow = self.__flows[i]
+			# Never created modifiers have their default values
+			if not flow.materialized:
+				myFlow.reset()
 			myFlow.enabled = flow.enabled
 			try:
 				myFlow.description = flow.description
 			except AttributeError:
 				myFlow.description = ""
 			# Copy modifier properties
+			# Never created modifiers have their default values
+			if not flow.materialized:
+				continue
 			for modifier in flow.modifiers:
 				try:
 					self.__flows[i].updateModifier(modifier)
@@ -155,7 +199,8 @@ class Hardware:
 					# If the modifier could not be replaced, ignore it
 					pass
 		# Remember the file name
-		self.__filename = filename
+		if remember:
+			self.__filename = filename
 		return True
 
 
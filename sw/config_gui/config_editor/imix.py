@@ -0,0 +1,332 @@
+"""
+Mapping of a packet size distribution (IMIX) on flow instances.
+Each flow sends one skeleton size, so the distribution is split over
+several flows: skeletons are resized from a template flow, and the
+gaps of the Rate modifiers are solved so that the merged stream has
+the requested share of packets and bytes of each size at the target rate.
+Sizes are merged when there are more of them than flow instances,
+and a size is split over several instances when the integer gap
+of one instance cannot give its frame rate precisely enough.
+"""
+
+import os
+import json
+from math import ceil, floor
+
+from .hardware import Hardware
+from .compiled import CompiledConfig
+from .skeleton import resizeFlow
+from .modifiers.rate import rateFromGap, MIN_GAP, MAX_RATE
+
+# Simple IMIX: frame sizes (bytes, with FCS) and packet weights
+SIMPLE_IMIX = [(64, 7), (594, 4), (1518, 1)]
+# Skeleton sizes accepted by the skeleton sender (bytes)
+MIN_SIZE = 64
+MAX_SIZE = 1522
+# Bytes per second on the link (see Rate.frameRate)
+LINK_BYTE_RATE = MAX_RATE * 1e6 / 8
+# Relative frame rate error accepted for each size before using more instances
+TOLERANCE = 1e-3
+# Number of instances added at most at once to a size
+LOOKAHEAD = 4
+# Sending duration giving the iterations of each flow (s)
+DURATION = 1.0
+
+def parseDistribution(text):
+	"""
+	Read a size distribution: "simple" (simple IMIX), weights of the
+	simple IMIX sizes ("7:4:1"), size:weight pairs ("64:7,594:4,1518:1"),
+	or a histogram file (JSON object size -> weight, or lines "size weight").
+	Returns a list of (size, weight).
+	"""
+	if os.path.isfile(text):
+		with open(text) as histogramFile:
+			content = histogramFile.read()
+		try:
+			data = json.loads(content)
+		except ValueError:
+			data = None
+		if isinstance(data, dict):
+			pairs = [(int(size), float(weight)) for size, weight in data.items()]
+		elif isinstance(data, list):
+			pairs = [(int(size), float(weight)) for size, weight in data]
+		else:
+			pairs = []
+			for line in content.splitlines():
+				line = line.split("#")[0].replace(",", " ").split()
+				if line:
+					if len(line) != 2:
+						raise ValueError("expected size and weight: " + " ".join(line))
+					pairs.append((int(line[0]), float(line[1])))
+	elif text == "simple":
+		pairs = list(SIMPLE_IMIX)
+	elif "," not in text and text.count(":") == len(SIMPLE_IMIX) - 1:
+		pairs = [(size, float(weight)) for (size, default), weight in zip(SIMPLE_IMIX, text.split(":"))]
+	else:
+		pairs = []
+		for part in text.split(","):
+			size, separator, weight = part.partition(":")
+			pairs.append((int(size), float(weight) if separator else 1.0))
+	pairs = [(size, weight) for size, weight in pairs if weight > 0]
+	if not pairs:
+		raise ValueError("empty size distribution")
+	for size, weight in pairs:
+		if size < MIN_SIZE or size > MAX_SIZE:
+			raise ValueError("size " + str(size) + " out of " + str(MIN_SIZE) + "-" + str(MAX_SIZE) + " bytes")
+	return pairs
+
+def mergeSizes(distribution, count):
+	"""
+	Merge neighbour sizes of a distribution until at most count sizes
+	are left. Two sizes are replaced by their mean weighted by packets,
+	which keeps the packet and byte counts (up to the size rounding);
+	the pair merged each time is the one changing the sizes the least.
+	"""
+	bins = {}
+	for size, weight in distribution:
+		bins[size] = bins.get(size, 0) + weight
+	bins = [[float(size), weight] for size, weight in sorted(bins.items())]
+	while len(bins) > count:
+		costs = [left[1] * right[1] / (left[1] + right[1]) * (right[0] - left[0]) ** 2 for left, right in zip(bins, bins[1:])]
+		i = costs.index(min(costs))
+		(leftSize, leftWeight), (rightSize, rightWeight) = bins[i], bins[i+1]
+		weight = leftWeight + rightWeight
+		bins[i:i+2] = [[(leftSize * leftWeight + rightSize * rightWeight) / weight, weight]]
+	merged = {}
+	for size, weight in bins:
+		size = int(round(size))
+		merged[size] = merged.get(size, 0) + weight
+	return sorted(merged.items())
+
+def maxGap(size):
+	"""
+	Largest gap (bytes) of a frame size the Rate modifier accepts (rate of 1 Mb/s)
+	"""
+	gap = int((size + 1 + MIN_GAP) * MAX_RATE * 2) - size - 1
+	while rateFromGap(gap, size) < 1:
+		gap-= 1
+	return gap
+
+def frameRate(size, gap):
+	"""
+	Frames per second of a flow (see Rate.frameRate)
+	"""
+	return LINK_BYTE_RATE / (size + 1 + gap)
+
+def splitRate(size, rate, count):
+	"""
+	Gaps of count instances of a frame size giving a total frame rate
+	as close as possible: all gaps are the floor or the ceiling of the exact gap.
+	Returns the list of gaps and the obtained frame rate.
+	"""
+	exact = LINK_BYTE_RATE * count / rate - size - 1
+	highest = maxGap(size)
+	low = min(max(MIN_GAP, int(floor(exact))), highest)
+	high = min(low + 1, highest)
+	best = None
+	for lowCount in range(count + 1):
+		obtained = lowCount * frameRate(size, low) + (count - lowCount) * frameRate(size, high)
+		if best is None or abs(obtained - rate) < abs(best[1] - rate):
+			best = (lowCount, obtained)
+	lowCount, obtained = best
+	return [low] * lowCount + [high] * (count - lowCount), obtained
+
+class ImixPlan:
+	"""
+	Flow instances sending a size distribution, and the obtained mix
+	"""
+
+	def __init__(self, distribution, requested, rate, sizes, flows):
+		"""
+		distribution: requested (size, weight) list
+		requested: distribution after merging, one entry per used size
+		rate: target aggregate rate (Mb/s)
+		sizes: list of (size, target frame rate, obtained frame rate, instances)
+		flows: list of dictionnaries per instance: number, size, gap, frame_rate, iterations
+		"""
+		self.distribution = distribution
+		self.requested = requested
+		self.rate = rate
+		self.sizes = sizes
+		self.flows = flows
+		# Compiled configuration, set by the mapper
+		self.config = None
+
+	@property
+	def instances(self):
+		"""
+		Number of flow instances used
+		"""
+		return len(self.flows)
+
+	@property
+	def obtainedRate(self):
+		"""
+		Aggregate rate of the instances (Mb/s, as the Rate modifier)
+		"""
+		return sum(flow["frame_rate"] * (flow["size"] + 1 + MIN_GAP) for flow in self.flows) * 8 / 1e6
+
+	def shares(self, merged = False):
+		"""
+		Requested and obtained share of packets and bytes of each size,
+		requested or sent, in size order: list of (size, instances,
+		requested packets, obtained packets, requested bytes, obtained bytes).
+		merged: compare with the distribution after merging instead of the requested one
+		"""
+		requested = self.requested if merged else self.distribution
+		sizes = {}
+		for size, weight in requested:
+			sizes.setdefault(size, [0, 0, 0])[0]+= weight
+		for size, target, obtained, count in self.sizes:
+			entry = sizes.setdefault(size, [0, 0, 0])
+			entry[1]+= obtained
+			entry[2]+= count
+		requestedPackets = sum(weight for weight, obtained, count in sizes.values())
+		requestedBytes = sum(size * weight for size, (weight, obtained, count) in sizes.items())
+		obtainedPackets = sum(obtained for weight, obtained, count in sizes.values())
+		obtainedBytes = sum(size * obtained for size, (weight, obtained, count) in sizes.items())
+		shares = []
+		for size, (weight, obtained, count) in sorted(sizes.items()):
+			shares.append((size, count, weight / requestedPackets, obtained / obtainedPackets, size * weight / requestedBytes, size * obtained / obtainedBytes))
+		return shares
+
+	def residualOf(self, merged = False):
+		"""
+		Largest difference between a requested and an obtained
+		share of packets or bytes (fraction of the total), see shares
+		"""
+		return max(max(abs(packets - requestedPackets), abs(octets - requestedBytes)) for size, count, requestedPackets, packets, requestedBytes, octets in self.shares(merged))
+
+	@property
+	def residual(self):
+		"""
+		Residual error against the requested distribution:
+		includes the sizes changed by merging
+		"""
+		return self.residualOf()
+
+	@property
+	def rateResidual(self):
+		"""
+		Residual error against the merged distribution:
+		only due to the gaps of the instances
+		"""
+		return self.residualOf(True)
+
+	@property
+	def meanSize(self):
+		"""
+		Requested and obtained mean frame size (bytes)
+		"""
+		requested = sum(size * weight for size, weight in self.distribution) / sum(weight for size, weight in self.distribution)
+		frames = sum(flow["frame_rate"] for flow in self.flows)
+		obtained = sum(flow["frame_rate"] * flow["size"] for flow in self.flows) / frames
+		return requested, obtained
+
+	def __str__(self):
+		lines = []
+		lines.append("%d sizes requested, %d used, on %d flow instances" % (len(self.distribution), len(self.requested), self.instances))
+		lines.append("%6s %9s %10s %10s %10s %10s" % ("size", "instances", "packets %", "obtained", "bytes %", "obtained"))
+		for size, count, requestedPackets, packets, requestedBytes, octets in self.shares():
+			lines.append("%6d %9d %10.3f %10.3f %10.3f %10.3f" % (size, count, requestedPackets * 100, packets * 100, requestedBytes * 100, octets * 100))
+		requested, obtained = self.meanSize
+		lines.append("Mean frame size: %.2f bytes requested, %.2f obtained" % (requested, obtained))
+		lines.append("Aggregate rate: %g Mb/s requested, %.2f obtained (%+.3f%%)" % (self.rate, self.obtainedRate, (self.obtainedRate / self.rate - 1) * 100))
+		lines.append("Residual error: %.4f%% of the packets or bytes" % (self.residual * 100))
+		if len(self.requested) < len(self.distribution):
+			lines.append("Error of the gaps alone: %.4f%% of the packets or bytes of the merged sizes" % (self.rateResidual * 100))
+		return "\n".join(lines)
+
+class ImixMapper:
+	"""
+	Maps size distributions on the flows of a hardware.
+	The first enabled flow of the base configuration is the template
+	of every flow instance, its skeleton is resized for each size.
+	"""
+
+	def __init__(self, hardwarePath, baseConfig = None):
+		"""
+		hardwarePath: hardware configuration file (JSON)
+		baseConfig: saved configuration to start from (.gcf), if any
+		"""
+		self.__hardware = Hardware(hardwarePath)
+		base = Hardware(hardwarePath)
+		if baseConfig is not None and not base.load(baseConfig, remember = False):
+			raise ValueError(baseConfig + " could not be loaded")
+		enabled = [flow for flow in base.flows if flow.enabled]
+		self.__template = enabled[0] if enabled else base.flows[0]
+
+	@property
+	def hardware(self):
+		"""
+		Hardware with the last mapped distribution
+		"""
+		return self.__hardware
+
+	def solve(self, distribution, rate, instances = None, tolerance = TOLERANCE):
+		"""
+		Choose the sizes and the instances of each size, and solve the gaps.
+		Instances are added one at a time to the size with the largest
+		frame rate error, until all errors are below the tolerance.
+		Returns the merged distribution and the list of (size, target frame rate,
+		obtained frame rate, gaps).
+		"""
+		available = len(self.__hardware.flows) if instances is None else min(instances, len(self.__hardware.flows))
+		if rate <= 0 or rate > MAX_RATE:
+			raise ValueError("the rate should be between 0 and " + str(MAX_RATE) + " Mb/s")
+		requested = mergeSizes(distribution, available)
+		packets = sum(weight for size, weight in requested)
+		# Total frame rate giving the aggregate rate (see rateFromGap)
+		totalFrameRate = rate * 1e6 / 8 / sum((size + 1 + MIN_GAP) * weight / packets for size, weight in requested)
+		targets = [totalFrameRate * weight / packets for size, weight in requested]
+		solutions = [splitRate(size, target, 1) for (size, weight), target in zip(requested, targets)]
+		used = len(requested)
+		# Sizes which do not improve with more instances
+		saturated = set()
+		while used < available:
+			errors = [abs(obtained - target) / target if i not in saturated else 0 for i, (target, (gaps, obtained)) in enumerate(zip(targets, solutions))]
+			worst = errors.index(max(errors))
+			if errors[worst] <= tolerance:
+				break
+			size = requested[worst][0]
+			count = len(solutions[worst][0])
+			# The error does not decrease steadily with the instances: try a few more
+			for extra in range(1, min(LOOKAHEAD, available - used) + 1):
+				solution = splitRate(size, targets[worst], count + extra)
+				if abs(solution[1] - targets[worst]) / targets[worst] < errors[worst]:
+					solutions[worst] = solution
+					used+= extra
+					break
+			else:
+				saturated.add(worst)
+		return requested, [(size, target, obtained, gaps) for (size, weight), target, (gaps, obtained) in zip(requested, targets, solutions)]
+
+	def map(self, distribution, rate, instances = None, tolerance = TOLERANCE, duration = DURATION):
+		"""
+		Configure the hardware to send a distribution (list of (size, weight))
+		at an aggregate rate (Mb/s). Flows are configured so that all of them
+		end together after about duration seconds.
+		instances: maximum number of flow instances to use (all if None)
+		tolerance: relative frame rate error accepted for each size
+		Returns an ImixPlan.
+		"""
+		requested, sizes = self.solve(distribution, rate, instances, tolerance)
+		flows = []
+		for size, target, obtained, gaps in sizes:
+			for gap in gaps:
+				flows.append({"size": size, "gap": gap, "frame_rate": frameRate(size, gap), "iterations": max(1, int(ceil(duration * frameRate(size, gap))))})
+		for i, flow in enumerate(self.__hardware.flows):
+			flow.enabled = i < len(flows)
+			if i >= len(flows):
+				continue
+			flows[i]["number"] = i+1
+			for modifier in self.__template.modifiers:
+				flow.updateModifier(modifier)
+			resizeFlow(flow, flows[i]["size"])
+			for modifierType, fieldId, value in (("rate", "gap", flows[i]["gap"]), ("skeleton_sender", "iterations", flows[i]["iterations"])):
+				field = flow.getModifierByType(modifierType).getField(fieldId)
+				field.userValue = value
+				field.auto = False
+		plan = ImixPlan(list(distribution), requested, rate, [(size, target, obtained, len(gaps)) for size, target, obtained, gaps in sizes], flows)
+		plan.config = CompiledConfig.fromHardware(self.__hardware)
+		return plan
@@ -0,0 +1,164 @@
+"""
+Optional measures of the model hot paths:
+event dispatches per event and source, depth of callback cascades
+(a skeleton change updating the size, then the rate...)
+and durations of configuration compilations.
+Disabled by default: instrumented code then only tests the active flag.
+"""
+
+import time
+import threading
+from functools import wraps
+
+# Set by enable/disable, tested by the instrumented code
+active = False
+
+# Event name -> source -> number of dispatches
+__dispatches = {}
+# Cascade depth -> number of top-level dispatches reaching this depth
+__depths = {}
+# Chain of dispatches of the deepest cascade: [(event name, source)]
+__deepest = []
+# Timed call name -> [count, total, min, max] (s)
+__timings = {}
+# Per-thread stack of the running dispatches
+__local = threading.local()
+
+def enable(reset = True):
+	"""
+	Start recording, from zero if reset
+	"""
+	global active
+	if reset:
+		clear()
+	active = True
+
+def disable():
+	"""
+	Stop recording, keeping the recorded data
+	"""
+	global active
+	active = False
+
+def clear():
+	"""
+	Forget all recorded data
+	"""
+	global __deepest
+	__dispatches.clear()
+	__depths.clear()
+	__timings.clear()
+	__deepest = []
+
+def sourceName(instance):
+	"""
+	Name of an object firing events: class and identifier
+	"""
+	name = type(instance).__name__
+	identifier = getattr(instance, 'id', None)
+	if identifier is not None:
+		name+= ":" + str(identifier)
+	return name
+
+def dispatch(eventName, instance, callbacks, args, kwargs):
+	"""
+	Call the callbacks of an event, counting the dispatch
+	"""
+	global __deepest
+	source = sourceName(instance)
+	sources = __dispatches.setdefault(eventName, {})
+	sources[source] = sources.get(source, 0) + 1
+	stack = getattr(__local, 'stack', None)
+	if stack is None:
+		stack = __local.stack = []
+		__local.maxDepth = 0
+	stack.append((eventName, source))
+	if len(stack) > __local.maxDepth:
+		__local.maxDepth = len(stack)
+		if len(stack) > len(__deepest):
+			__deepest = list(stack)
+	try:
+		for callback in callbacks:
+			callback(instance, *args, **kwargs)
+	finally:
+		stack.pop()
+		if not stack:
+			# End of a cascade
+			__depths[__local.maxDepth] = __depths.get(__local.maxDepth, 0) + 1
+			__local.maxDepth = 0
+
+def timed(name, key = None):
+	"""
+	Decorator measuring the duration of a method when active.
+	key: function giving a suffix of the name from the instance
+	(the modifier type for example)
+	"""
+	def decorator(method):
+		@wraps(method)
+		def wrapper(self, *args, **kwargs):
+			if not active:
+				return method(self, *args, **kwargs)
+			begin = time.perf_counter()
+			try:
+				return method(self, *args, **kwargs)
+			finally:
+				duration = time.perf_counter() - begin
+				fullName = name if key is None else name + "/" + str(key(self))
+				timing = __timings.get(fullName)
+				if timing is None:
+					__timings[fullName] = [1, duration, duration, duration]
+				else:
+					timing[0]+= 1
+					timing[1]+= duration
+					timing[2] = min(timing[2], duration)
+					timing[3] = max(timing[3], duration)
+		return wrapper
+	return decorator
+
+def snapshot():
+	"""
+	Copy of the recorded data, as a dictionnary
+	(can be dumped to JSON):
+	- "events": event name -> source -> dispatches
+	- "cascades": "depths" (max depth -> count of cascades),
+	  "max_depth" and "deepest" (list of "event@source" of the deepest cascade)
+	- "timings": call name -> count, total, mean, min and max (s)
+	"""
+	return {
+		'active': active,
+		'events': dict((name, dict(sources)) for name, sources in __dispatches.items()),
+		'cascades': {
+			'depths': dict(__depths),
+			'max_depth': max(__depths) if __depths else 0,
+			'deepest': [eventName + "@" + source for eventName, source in __deepest]
+		},
+		'timings': dict((name, {
+			'count': count,
+			'total': total,
+			'mean': total / count,
+			'min': minimum,
+			'max': maximum
+		}) for name, (count, total, minimum, maximum) in __timings.items())
+	}
+
+def report(data = None, top = 10):
+	"""
+	Human-readable report of a snapshot (the current data if None)
+	"""
+	if data is None:
+		data = snapshot()
+	lines = ["Event dispatches:"]
+	for eventName, sources in sorted(data['events'].items()):
+		lines.append("  %-36s %8d" % (eventName, sum(sources.values())))
+		for source, count in sorted(sources.items(), key = lambda item: -item[1])[:top]:
+			lines.append("    %-34s %8d" % (source, count))
+	cascades = data['cascades']
+	lines.append("Cascades: max depth %d" % cascades['max_depth'])
+	for depth, count in sorted(cascades['depths'].items()):
+		lines.append("  depth %-3s %8d" % (depth, count))
+	if cascades['deepest']:
+		lines.append("  deepest: " + " -> ".join(cascades['deepest']))
+	lines.append("Timings:")
+	for name, timing in sorted(data['timings'].items(), key = lambda item: -item[1]['total']):
+		lines.append("  %-36s %8d calls %10.3f ms total %9.1f us mean %9.1f us max" % (name, timing['count'], timing['total'] * 1e3, timing['mean'] * 1e6, timing['max'] * 1e6))
+	return "\n".join(lines)
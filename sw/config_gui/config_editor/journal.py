@@ -0,0 +1,431 @@
+"""
+Append-only journal of the user changes of a hardware configuration,
+for cheap autosave, undo/redo and crash recovery.
+Changes are recorded from the model events as absolute states
+(field user value or None if never set, size and auto flag,
+modifier or flow enabled, flow description), appended to <path>.journal after a snapshot
+of the configuration saved at <path>. Replaying the journal over the
+snapshot gives the last state, and compaction writes a new snapshot.
+"""
+
+import os
+import re
+import glob
+import zlib
+import pickle
+import struct
+import tempfile
+from contextlib import contextmanager
+
+# Size of the journal above which autosave compacts it (bytes)
+COMPACT_SIZE = 1024 * 1024
+# Header of a record: payload length and CRC-32
+RECORD_HEADER = struct.Struct("<II")
+# Journal file header
+MAGIC = b"TGJ1"
+
+class Journal:
+	"""
+	Journal of the changes of a hardware, with its undo and redo history.
+	Consecutive changes of the same field are one undo step,
+	edit() groups more changes in one step.
+	"""
+
+	def __init__(self, hardware, path, recover = False, compactSize = COMPACT_SIZE):
+		"""
+		hardware: Hardware to record
+		path: snapshot file, the journal is path + ".journal"
+		recover: replay an existing snapshot and journal on the hardware first
+		compactSize: journal size above which autosave compacts it
+		"""
+		self.__hardware = hardware
+		self.__path = path
+		self.__journalPath = path + ".journal"
+		self.__compactSize = compactSize
+		self.__file = None
+		# Key -> last recorded state
+		self.__states = {}
+		# Subscribed (event handler, callback)
+		self.__subscriptions = []
+		self.__undoSteps = []
+		self.__redoSteps = []
+		# Changes of the current edit() group, or None
+		self.__group = None
+		# Recording disabled (replay, pause)
+		self.__paused = False
+		# Changes are made by undo or redo: not a new step
+		self.__applying = False
+		self.recovered = 0
+		if recover:
+			self.__paused = True
+			try:
+				self.recovered = self.__recover()
+			finally:
+				self.__paused = False
+		for index, flow in enumerate(hardware.flows):
+			self.__watchFlow(index, flow)
+		self.compact()
+
+	@staticmethod
+	def recoverable(path):
+		"""
+		Is there a snapshot or journal left at path (unclean exit)?
+		"""
+		return os.path.exists(path) or os.path.exists(path + ".journal")
+
+	@staticmethod
+	def instancePath(path, pid = None):
+		"""
+		Snapshot path of one process (this one if pid is None),
+		so that several instances do not share their files: name.<pid>.ext
+		"""
+		root, extension = os.path.splitext(path)
+		return root + "." + str(os.getpid() if pid is None else pid) + extension
+
+	@staticmethod
+	def orphans(path):
+		"""
+		Snapshot paths of the instances of path (see instancePath)
+		whose process is not running anymore, most recent first
+		"""
+		root, extension = os.path.splitext(path)
+		pattern = re.compile(re.escape(root) + r"\.(\d+)" + re.escape(extension) + r"(\.journal)?$")
+		found = {}
+		for candidate in glob.glob(glob.escape(root) + ".*" + extension + "*"):
+			match = pattern.match(candidate)
+			if match is None or processRunning(int(match.group(1))):
+				continue
+			snapshot = Journal.instancePath(path, int(match.group(1)))
+			found[snapshot] = max(found.get(snapshot, 0), os.path.getmtime(candidate))
+		return sorted(found, key = lambda snapshot: found[snapshot], reverse = True)
+
+	@staticmethod
+	def adopt(source, path):
+		"""
+		Move the snapshot and journal left at source to path, to recover them
+		"""
+		for suffix in ("", ".journal"):
+			if os.path.exists(source + suffix):
+				os.replace(source + suffix, path + suffix)
+
+	@staticmethod
+	def discard(path):
+		"""
+		Remove the snapshot and journal left at path
+		"""
+		for suffix in ("", ".journal"):
+			if os.path.exists(path + suffix):
+				os.remove(path + suffix)
+
+	# Model state
+
+	def __flow(self, index):
+		"""
+		Flow generator of an index, or None
+		"""
+		flows = self.__hardware.flows
+		return flows[index] if index < len(flows) else None
+
+	def __target(self, key):
+		"""
+		Object of the model designated by a key, or None
+		"""
+		flow = self.__flow(key[1])
+		if flow is None or key[0] in ('e', 'd'):
+			return flow
+		modifier = flow.getModifier(key[2])
+		if modifier is None or key[0] == 'm':
+			return modifier
+		return modifier.getField(key[3])
+
+	def __state(self, key, target):
+		"""
+		Current state of a model object
+		"""
+		if key[0] == 'f':
+			# The user value is not created if never set (None)
+			value = bytes(target.getView(False)) if target.hasUserValue else None
+			return (target.bitSize, value, target.auto)
+		if key[0] == 'd':
+			return target.description
+		return target.enabled
+
+	def __apply(self, key, state):
+		"""
+		Set the state of a model object, ignored if it does not exist
+		"""
+		target = self.__target(key)
+		if target is None:
+			return
+		if key[0] == 'f':
+			bitSize, value, auto = state
+			target.bitSize = bitSize
+			if value is None:
+				# Auto first: reading the value of a user field would set it again
+				target.auto = auto
+				target.clearUserBytes()
+			else:
+				target.userBytes = bytearray(value)
+				target.auto = auto
+		elif key[0] == 'd':
+			target.description = state
+		else:
+			target.enabled = state
+
+	# Subscriptions
+
+	def __subscribe(self, handler, key, target):
+		"""
+		Record the changes of a model object notified by an event
+		"""
+		callback = lambda sender, *args, **kwargs: self.__onChange(key, target)
+		self.__subscriptions.append((handler, callback))
+		handler+= callback
+
+	def __watchFlow(self, index, flow):
+		"""
+		Record the changes of a flow generator and of its modifiers
+		"""
+		for key, handler in ((('e', index), flow.enabledChangeEvent), (('d', index), flow.descriptionChangeEvent)):
+			self.__states[key] = self.__state(key, flow)
+			self.__subscribe(handler, key, flow)
+		if flow.materialized:
+			self.__watchModifiers(index, flow)
+		else:
+			# Modifiers are watched once created
+			callback = lambda sender, *args, **kwargs: self.__watchModifiers(index, flow)
+			flow.modifiersCreatedEvent+= callback
+			self.__subscriptions.append((flow.modifiersCreatedEvent, callback))
+
+	def __watchModifiers(self, index, flow):
+		"""
+		Record the changes of the modifiers of a flow generator
+		"""
+		for modifier in flow.modifiers:
+			key = ('m', index, modifier.id)
+			self.__states[key] = self.__state(key, modifier)
+			self.__subscribe(modifier.enabledChangeEvent, key, modifier)
+			for field in modifier.fields:
+				if field.id is None:
+					continue
+				key = ('f', index, modifier.id, field.id)
+				self.__states[key] = self.__state(key, field)
+				self.__subscribe(field.valueChangeEvent, key, field)
+				self.__subscribe(field.autoChangeEvent, key, field)
+
+	def close(self, remove = True):
+		"""
+		Stop recording. The snapshot and journal are removed if remove
+		(clean exit), else kept up to date for a later recovery.
+		"""
+		for handler, callback in self.__subscriptions:
+			handler-= callback
+		self.__subscriptions = []
+		if self.__file is not None:
+			self.__file.close()
+			self.__file = None
+		if remove:
+			Journal.discard(self.__path)
+
+	# Recording
+
+	def __onChange(self, key, target):
+		"""
+		A model object notified a change: record its new state
+		"""
+		if self.__paused:
+			return
+		# Automatic values are not recorded: they follow the user values
+		if key[0] == 'f' and target.auto and self.__states.get(key, (None, None, True))[2]:
+			return
+		state = self.__state(key, target)
+		previous = self.__states.get(key)
+		if state == previous:
+			return
+		self.__states[key] = state
+		self.__append((key, state))
+		if self.__applying:
+			return
+		self.__redoSteps = []
+		if self.__group is not None:
+			self.__group.append((key, previous, state))
+		elif self.__undoSteps and len(self.__undoSteps[-1]) == 1 and self.__undoSteps[-1][0][0] == key:
+			# Same field changed again: same step
+			self.__undoSteps[-1][0] = (key, self.__undoSteps[-1][0][1], state)
+		else:
+			self.__undoSteps.append([(key, previous, state)])
+
+	def __append(self, record):
+		"""
+		Append a record to the journal (buffered until autosave)
+		"""
+		payload = pickle.dumps(record, protocol = 4)
+		self.__file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+
+	@contextmanager
+	def edit(self):
+		"""
+		Group all changes made in the block in one undo step
+		"""
+		if self.__group is not None:
+			yield
+			return
+		self.__group = []
+		try:
+			yield
+		finally:
+			group = self.__group
+			self.__group = None
+			if group:
+				self.__undoSteps.append(group)
+
+	@contextmanager
+	def paused(self):
+		"""
+		Do not record the changes made in the block
+		(call compact() after changing the whole configuration)
+		"""
+		paused = self.__paused
+		self.__paused = True
+		try:
+			yield
+		finally:
+			self.__paused = paused
+
+	# Undo and redo
+
+	@property
+	def canUndo(self):
+		"""
+		Is there a step to undo?
+		"""
+		return bool(self.__undoSteps)
+
+	@property
+	def canRedo(self):
+		"""
+		Is there a step to redo?
+		"""
+		return bool(self.__redoSteps)
+
+	def __applySteps(self, changes):
+		"""
+		Apply (key, state) changes without creating undo steps
+		"""
+		self.__applying = True
+		try:
+			for key, state in changes:
+				self.__apply(key, state)
+		finally:
+			self.__applying = False
+
+	def undo(self):
+		"""
+		Cancel the last step, returns False if there is none
+		"""
+		if not self.__undoSteps:
+			return False
+		step = self.__undoSteps.pop()
+		self.__applySteps([(key, old) for key, old, new in reversed(step)])
+		self.__redoSteps.append(step)
+		return True
+
+	def redo(self):
+		"""
+		Do again the last cancelled step, returns False if there is none
+		"""
+		if not self.__redoSteps:
+			return False
+		step = self.__redoSteps.pop()
+		self.__applySteps([(key, new) for key, old, new in step])
+		self.__undoSteps.append(step)
+		return True
+
+	def clearHistory(self):
+		"""
+		Forget the undo and redo steps
+		"""
+		self.__undoSteps = []
+		self.__redoSteps = []
+
+	# Files
+
+	@property
+	def size(self):
+		"""
+		Size of the journal (bytes), including buffered records
+		"""
+		return self.__file.tell() if self.__file is not None else 0
+
+	def autosave(self, sync = False):
+		"""
+		Write the buffered records (and to the disk if sync).
+		Compacts the journal if it got too big.
+		"""
+		if self.size > self.__compactSize:
+			self.compact()
+			return
+		self.__file.flush()
+		if sync:
+			os.fsync(self.__file.fileno())
+
+	def compact(self):
+		"""
+		Save a snapshot of the configuration and start an empty journal.
+		The snapshot is replaced atomically, and records left in the old
+		journal give the same state if replayed over the new snapshot.
+		"""
+		directory = os.path.dirname(os.path.abspath(self.__path))
+		with tempfile.NamedTemporaryFile('wb', dir = directory, suffix = ".tmp", delete = False) as snapshotFile:
+			snapshotFile.write(self.__hardware.snapshot())
+		os.replace(snapshotFile.name, self.__path)
+		if self.__file is not None:
+			self.__file.close()
+		self.__file = open(self.__journalPath, 'wb')
+		self.__file.write(MAGIC)
+		self.__file.flush()
+		# States are known again from the model
+		for key in list(self.__states):
+			target = self.__target(key)
+			if target is not None:
+				self.__states[key] = self.__state(key, target)
+
+	def __recover(self):
+		"""
+		Load the snapshot and replay the journal up to the first
+		incomplete or damaged record. Returns the number of replayed records.
+		"""
+		if os.path.exists(self.__path):
+			self.__hardware.load(self.__path, remember = False)
+		if not os.path.exists(self.__journalPath):
+			return 0
+		with open(self.__journalPath, 'rb') as journalFile:
+			data = journalFile.read()
+		if not data.startswith(MAGIC):
+			return 0
+		offset = len(MAGIC)
+		count = 0
+		while offset + RECORD_HEADER.size <= len(data):
+			length, crc = RECORD_HEADER.unpack_from(data, offset)
+			payload = data[offset+RECORD_HEADER.size:offset+RECORD_HEADER.size+length]
+			if len(payload) < length or zlib.crc32(payload) != crc:
+				# Interrupted write
+				break
+			key, state = pickle.loads(payload)
+			self.__apply(key, state)
+			count+= 1
+			offset+= RECORD_HEADER.size + length
+		return count
+
+def processRunning(pid):
+	"""
+	Is a process running? (POSIX: signal 0 only checks the process exists)
+	"""
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		# Running as another user
+		return True
+	return True
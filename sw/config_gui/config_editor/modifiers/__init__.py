@@ -1,6 +1,26 @@
-from .modifier import getModifier, getModifiers
-from .skeleton_sender import SkeletonSender
-from .ethernet_fcs import EthernetFCS
-from .increment import Increment
-from .checksum import Checksum
-from .rate import Rate
\ No newline at end of file
+from .modifier import getModifier, getModifiers, registerModifierModule
+
+# Built-in modifiers: modules are imported when a hardware uses them
+registerModifierModule('skeleton_sender', __name__ + '.skeleton_sender')
+registerModifierModule('ethernet_fcs', __name__ + '.ethernet_fcs')
+registerModifierModule('increment', __name__ + '.increment')
+registerModifierModule('checksum', __name__ + '.checksum')
+registerModifierModule('rate', __name__ + '.rate')
+
+# Modifier classes, imported on first access
+__classModules = {
+	'SkeletonSender': 'skeleton_sender',
+	'EthernetFCS': 'ethernet_fcs',
+	'Increment': 'increment',
+	'Checksum': 'checksum',
+	'Rate': 'rate'
+}
+
+def __getattr__(name):
+	"""
+	Import a modifier class when it is first accessed
+	"""
+	if name in __classModules:
+		from importlib import import_module
+		return getattr(import_module(__name__ + '.' + __classModules[name]), name)
+	raise AttributeError("module " + __name__ + " has no attribute " + name)
\ No newline at end of file
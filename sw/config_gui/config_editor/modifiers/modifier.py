@@ -1,6 +1,7 @@
-from math import ceil
+from importlib import import_module
 from ..exceptions import ModifierError, ExtendError
 from ..events import Event
+from .. import instrumentation
 
 class Modifier:
 	"""
@@ -27,8 +28,17 @@ class Modifier:
 		self.__id = options['id']
 		# Initialize
 		self.__fields = []
+		# Field identifier -> field
+		self.__fieldIds = {}
 		self.__enabled = False
 
+	def __setstate__(self, state):
+		"""
+		Rebuild the field index of modifiers saved without it
+		"""
+		self.__dict__.update(state)
+		self.__fieldIds = dict((field.id, field) for field in self.__fields if field.id is not None)
+
 	def reset(self):
 		"""
 		Resets the values of this modifier.
@@ -115,10 +125,7 @@ class Modifier:
 		Returns the field with the given identifier.
 		Or None if not found.
 		"""
-		for field in self.__fields:
-			if field.id == fieldId:
-				return field
-		return None
+		return self.__fieldIds.get(fieldId)
 
 	def _addFields(self, fields):
 		"""
@@ -128,6 +135,8 @@ class Modifier:
 		for field in fields:
 			if field.id is not None and self.getField(field.id) is not None:
 				raise ModifierError(self, "The field identifier " + field.id + " is already used.")
+			if field.id is not None:
+				self.__fieldIds[field.id] = field
 		self.__fields+= fields
 
 	@property 
@@ -135,39 +144,32 @@ class Modifier:
 		"""
 		Get the concatenated field bytes, with the identifier byte
 		"""
-		bytes = bytearray([self.__id])
+		# Fields are concatenated most significant bits first,
+		# the identifier being the most significant byte
+		value = self.__id
 		bitSize = 8
 		for field in self.__fields:
 			if field.inConfig:
-				# Create space for the new field
-				bytes+= bytearray(field.byteSize)
-				# Add data byte by byte with the proper bit shift
-				remainingBits = field.bitSize
-				# The first (most significant) byte may have up to 7 empty bits
-				emptyBits = field.byteSize * 8 - field.bitSize
-				for byte in reversed(field.bytes):
-					shift = (bitSize % 8) - emptyBits
-					if shift == 0:
-						bytes[int(bitSize/8)]|= byte
-					elif shift > 0:
-						bytes[int(bitSize/8)]|= byte >> shift
-						bytes[int(bitSize/8)+1]|= (byte << (8 - shift)) & 0xFF
-					else:
-						bytes[int(bitSize/8)]|= byte << (-shift)
-						bytes[int(bitSize/8)-1]|= (byte >> (8 + shift)) & 0xFF
-					# Prepare for next byte
-					bitSize+= 8 - emptyBits
-					emptyBits = 0
-		# Cuts useless bytes
-		byteSize = int(ceil(float(bitSize)/8))
-		bytes = bytes[:byteSize]
-		return bytes
+				fieldValue = field.getInt(field.auto) & ((1 << field.bitSize) - 1)
+				value = (value << field.bitSize) | fieldValue
+				bitSize+= field.bitSize
+		# Completes the last byte
+		padding = -bitSize % 8
+		return bytearray((value << padding).to_bytes((bitSize + padding) // 8, 'big'))
 
 	@property
 	def configData(self):
 		"""
 		Get the configuration data 
 		"""
+		return self.getConfigData()
+
+	@instrumentation.timed("Modifier.configData", lambda modifier: modifier.type)
+	def getConfigData(self, cache = None):
+		"""
+		Get the configuration data,
+		with the bytes from a CompileCache if given
+		"""
 		# Comments
 		data = "-- " + self.name + "\n"
 		data+= "--------------------\n"
@@ -176,23 +178,23 @@ class Modifier:
 			if field.strValue is not None:
 				data+= "-- " + field.name + ": " + field.strValue + "\n"
 		# Ensures data is in a multiple of 8 bytes
-		bytes = self.bytes
+		bytes = self.bytes if cache is None else cache.modifierBytes(self)
 		if len(bytes) % 8 > 0:
-			bytes+= bytearray(8 - len(bytes) % 8)
-		# Transforms data into hexadecimal values
+			bytes = bytes + bytearray(8 - len(bytes) % 8)
+		# Transforms data into hexadecimal values:
+		# for each 8 bytes word, the 4 last bytes then the 4 first ones
 		lines = []
-		for i in range(0, int(ceil(len(bytes)/8))):
-			for j in reversed(range(0, 2)):
-				line = ""
-				for k in range(0, 4):
-					index = i * 8 + j * 4 + k
-					line+= "%02X" % bytes[index]
-				lines.append(line)
+		for start in range(0, len(bytes), 8):
+			lines.append(bytes[start+4:start+8].hex().upper())
+			lines.append(bytes[start:start+4].hex().upper())
 		data += "\n".join(lines)
 		return data
 
 # Modifiers that were declared and are available
 __modifiers = {}
+# Modifiers that will be declared when their module is imported:
+# type -> module name
+__modifierModules = {}
 
 def registerModifier(modifierType, modifierClass, mandatory = False):
 	"""
@@ -209,10 +211,20 @@ def registerModifier(modifierType, modifierClass, mandatory = False):
 	# Put in the list
 	__modifiers[modifierType] = modifierClass
 
+def registerModifierModule(modifierType, moduleName):
+	"""
+	Declares the module that registers a modifier type.
+	It is imported only when the type is first needed.
+	"""
+	__modifierModules[modifierType] = moduleName
+
 def getModifier(modifierType):
 	"""
-	Returns the modifier class if it has been registered, or None
+	Returns the modifier class if it has been registered, or None.
+	Imports the module of the type if needed.
 	"""
+	if modifierType not in __modifiers and modifierType in __modifierModules:
+		import_module(__modifierModules[modifierType])
 	if modifierType in __modifiers:
 		return __modifiers[modifierType]
 	return None
@@ -222,9 +234,10 @@ def getModifiers(mandatoryOnly = False):
 	Returns a list of all modifier classes,
 	or only mandatory ones
 	"""
+	for modifierType in list(__modifierModules):
+		getModifier(modifierType)
 	modifiers = []
-	for type, modClass in self.__modifiers:
-		if not mandatoryOnly or modClass['mandatory']:
-			modifiers << modClass
+	for modClass in __modifiers.values():
+		if not mandatoryOnly or modClass.mandatory:
+			modifiers.append(modClass)
 	return modifiers
-
@@ -1,6 +1,29 @@
 from .modifier import Modifier, registerModifier
 from ..fields import BitsField, UnsignedField, PacketField, SelectField
 
+# Minimum inter-frame gap (bytes)
+MIN_GAP = 12
+# Maximum rate (including min. gap and preamble)
+MAX_RATE = 10000
+
+def gapFromRate(rate, size):
+	"""
+	Inter-frame gap (bytes) giving a rate (Mb/s)
+	for a data size (bytes)
+	"""
+	# + preamble and minimum gap
+	minSize = size + MIN_GAP + 1
+	return int(round((minSize / rate) * MAX_RATE)) - minSize + MIN_GAP
+
+def rateFromGap(gap, size):
+	"""
+	Rate (Mb/s) obtained with an inter-frame gap (bytes)
+	for a data size (bytes)
+	"""
+	# Data size (with preamble)
+	size+= 1
+	return int(round(((size + MIN_GAP) * MAX_RATE) / (size + gap)))
+
 class Rate(Modifier):
 	"""
 	Modifier definition
@@ -10,10 +33,8 @@ class Rate(Modifier):
 		Modifier options
 		"""
 		super().__init__(flow, "Rate", "Limits the rate of a flow", options)
-		# Minimum inter-frame gap (bytes)
-		self.__minGap = 12
-		# Maximum rate (including min. gap and preamble)
-		self.__maxRate = 10000
+		self.__minGap = MIN_GAP
+		self.__maxRate = MAX_RATE
 		# Fields list
 		self._addFields([
 			UnsignedField(bitSize = 32,
@@ -76,28 +97,21 @@ class Rate(Modifier):
 		"""
 		Sets the gap value from the set rate
 		"""
-		# Wanted rate
-		rate = self.__rateField.value
-		# Data size
-		minSize = self.__sizeField.value
-		# + preamble and minimum gap
-		minSize+= self.__minGap + 1
-		size = int(round((minSize / rate) * self.__maxRate))
-		gap = size - minSize + self.__minGap
-		self.__gapField.autoValue = gap
+		self.__gapField.autoValue = gapFromRate(self.__rateField.value, self.__sizeField.value)
 
 	def __setRateFromGap(self, *args, **kwargs):
 		"""
 		Set the rate from the set gap value
 		"""
-		# Wanted gap
-		gap = self.__gapField.value
-		# Data size (with preamble)
-		size = self.__sizeField.value + 1
-		minSize = size + self.__minGap
-		size+= gap
-		rate = int(round((minSize * self.__maxRate) / size))
-		self.__rateField.autoValue = rate
+		self.__rateField.autoValue = rateFromGap(self.__gapField.value, self.__sizeField.value)
+
+	@property
+	def frameRate(self):
+		"""
+		Number of frames per second sent with the current gap
+		"""
+		size = self.__sizeField.value + 1 + self.__gapField.value
+		return self.__maxRate * 1e6 / 8 / size
 
 
 
@@ -1,5 +1,6 @@
 from .modifier import Modifier, registerModifier
 from ..fields import BitsField, UnsignedField, PacketField
+from ..fields.packet_field import alignLastWord
 
 
 class SkeletonSender(Modifier):
@@ -41,6 +42,14 @@ class SkeletonSender(Modifier):
 		self.__packetField.sizeChangeEvent+= self.__onPacketSizeChange
 		self.__onPacketSizeChange()
 
+	@property
+	def bytes(self):
+		"""
+		Get the concatenated field bytes, the last incomplete
+		word of the packet data being aligned on the first lanes
+		"""
+		return alignLastWord(super().bytes, self.__packetField.byteSize)
+
 	def __onPacketSizeChange(self, *args, **kwargs):
 		"""
 		Set the size field value
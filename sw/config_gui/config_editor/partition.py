@@ -0,0 +1,204 @@
+"""
+Distribution of logical flows over several generator boards.
+Each board has its own hardware configuration (instances and modifiers).
+Flows are packed with a best-fit decreasing heuristic on their rate,
+respecting the number of flow generators of each board,
+the modifiers each flow needs and the rate of each link.
+"""
+
+import os
+
+from .hardware import Hardware
+from .compiled import CompiledConfig
+from .flow_spec import FlowSpec, LINK_RATE
+
+class BoardPlan:
+	"""
+	Flows assigned to one board
+	"""
+
+	def __init__(self, name, hardwarePath, instances, linkRate = LINK_RATE):
+		self.name = name
+		self.hardwarePath = hardwarePath
+		self.instances = instances
+		self.linkRate = linkRate
+		# Assigned FlowSpec, in assignment order
+		self.specs = []
+		self.rate = 0
+		self.__hardware = None
+		self.__compiled = None
+
+	@property
+	def freeInstances(self):
+		"""
+		Number of flow generators still free
+		"""
+		return self.instances - len(self.specs)
+
+	@property
+	def freeRate(self):
+		"""
+		Rate still available on the link (Mb/s)
+		"""
+		return self.linkRate - self.rate
+
+	@property
+	def instanceUtilisation(self):
+		"""
+		Fraction of the flow generators used
+		"""
+		return len(self.specs) / self.instances
+
+	@property
+	def rateUtilisation(self):
+		"""
+		Fraction of the link rate used
+		"""
+		return self.rate / self.linkRate
+
+	def assign(self, spec):
+		"""
+		Add a flow to this board
+		"""
+		self.specs.append(spec)
+		self.rate+= spec.linkRate
+		self.__hardware = None
+		self.__compiled = None
+
+	@property
+	def hardware(self):
+		"""
+		Hardware configured with the assigned flows (built once)
+		"""
+		if self.__hardware is None:
+			hardware = Hardware(self.hardwarePath)
+			for flow, spec in zip(hardware.flows, self.specs):
+				spec.apply(flow)
+			for flow in hardware.flows[len(self.specs):]:
+				flow.enabled = False
+			self.__hardware = hardware
+		return self.__hardware
+
+	@property
+	def compiled(self):
+		"""
+		Compiled configuration of the board
+		"""
+		if self.__compiled is None:
+			self.__compiled = CompiledConfig.fromHardware(self.hardware)
+		return self.__compiled
+
+	def __str__(self):
+		return "%-20s %4d/%-4d flows (%5.1f%%) %8.1f/%d Mb/s (%5.1f%%)" % (self.name, len(self.specs), self.instances, self.instanceUtilisation * 100, self.rate, self.linkRate, self.rateUtilisation * 100)
+
+class Partition:
+	"""
+	Result of a partitioning: one BoardPlan per board
+	and the flows that could not be placed
+	"""
+
+	def __init__(self, boards, unassigned):
+		"""
+		boards: list of BoardPlan
+		unassigned: list of (FlowSpec, reason)
+		"""
+		self.boards = boards
+		self.unassigned = unassigned
+
+	@property
+	def complete(self):
+		"""
+		Has every flow been placed?
+		"""
+		return not self.unassigned
+
+	@property
+	def configs(self):
+		"""
+		Dictionnary board name => CompiledConfig
+		"""
+		return dict((board.name, board.compiled) for board in self.boards)
+
+	def exportConfigs(self, directory):
+		"""
+		Export the configuration of each used board to directory/<name>.txt.
+		Returns the list of written paths.
+		"""
+		paths = []
+		for board in self.boards:
+			if not board.specs:
+				continue
+			path = os.path.join(directory, board.name + ".txt")
+			board.compiled.exportConfig(path)
+			paths.append(path)
+		return paths
+
+	def report(self):
+		"""
+		Human-readable utilisation report
+		"""
+		lines = [str(board) for board in self.boards]
+		totalRate = sum(board.rate for board in self.boards)
+		totalFlows = sum(len(board.specs) for board in self.boards)
+		lines.append("Total: %d flows, %.1f Mb/s on %d boards" % (totalFlows, totalRate, len([board for board in self.boards if board.specs])))
+		for spec, reason in self.unassigned:
+			lines.append("Not placed: %s (%s)" % (spec.name or spec.description, reason))
+		return "\n".join(lines)
+
+class Partitioner:
+	"""
+	Places logical flows on a set of boards
+	"""
+
+	def __init__(self, boards, linkRate = LINK_RATE):
+		"""
+		boards: list of (board name, hardware configuration path)
+		linkRate: rate of the link of each board (Mb/s)
+		"""
+		self.__boards = list(boards)
+		self.__linkRate = linkRate
+		# Hardware configuration path -> model flow generator
+		self.__profiles = {}
+		for name, hardwarePath in self.__boards:
+			if hardwarePath not in self.__profiles:
+				self.__profiles[hardwarePath] = Hardware(hardwarePath).flows
+		# (hardware path, modifier requirements) -> does it fit?
+		self.__fitCache = {}
+
+	def __fits(self, spec, hardwarePath):
+		"""
+		Do the flow generators of a hardware configuration have
+		the modifiers a flow needs? All instances are identical.
+		"""
+		key = (hardwarePath, tuple((modSpec['type'], modSpec.get('id')) for modSpec in spec.modifiers))
+		if key not in self.__fitCache:
+			self.__fitCache[key] = spec.fits(self.__profiles[hardwarePath][0])
+		return self.__fitCache[key]
+
+	def partition(self, specs):
+		"""
+		Place a list of FlowSpec (or specification dictionnaries).
+		Returns a Partition.
+		"""
+		specs = [spec if isinstance(spec, FlowSpec) else FlowSpec(spec) for spec in specs]
+		boards = [BoardPlan(name, hardwarePath, len(self.__profiles[hardwarePath]), self.__linkRate) for name, hardwarePath in self.__boards]
+		unassigned = []
+		# Decreasing rates, stable for equal rates
+		for spec in sorted(specs, key = lambda spec: -spec.linkRate):
+			rate = spec.linkRate
+			candidates = [board for board in boards if self.__fits(spec, board.hardwarePath)]
+			if not candidates:
+				unassigned.append((spec, "no board has the needed modifiers"))
+				continue
+			candidates = [board for board in candidates if board.freeInstances > 0]
+			if not candidates:
+				unassigned.append((spec, "no flow generator left"))
+				continue
+			candidates = [board for board in candidates if board.freeRate >= rate]
+			if not candidates:
+				unassigned.append((spec, "no link with %.1f Mb/s left" % rate))
+				continue
+			# Best fit: the board with the least rate left afterwards
+			best = min(candidates, key = lambda board: (board.freeRate, board.freeInstances))
+			best.assign(spec)
+		return Partition(boards, unassigned)
@@ -0,0 +1,69 @@
+"""
+Helpers to change the size of packet skeletons
+while keeping the flow configuration consistent.
+"""
+
+# Ethernet FCS size (the skeleton includes it)
+FCS_SIZE = 4
+# Ethernet types
+_VLAN = 0x8100
+_IPV4 = 0x0800
+_IPV6 = 0x86DD
+# IP protocol number of UDP
+_UDP = 17
+
+def resizeSkeleton(data, size):
+	"""
+	Returns the skeleton data truncated or padded with zeros to size bytes.
+	IPv4 total length, IPv6 payload length and UDP length are updated
+	if the skeleton is an Ethernet frame with these headers.
+	"""
+	data = bytearray(data[:size])
+	if len(data) < size:
+		data+= bytearray(size - len(data))
+	# Find the network header
+	offset = 12
+	if len(data) < offset + 2:
+		return data
+	etherType = int.from_bytes(data[offset:offset+2], 'big')
+	if etherType == _VLAN and len(data) >= 18:
+		offset = 16
+		etherType = int.from_bytes(data[offset:offset+2], 'big')
+	ipOffset = offset + 2
+	end = size - FCS_SIZE
+	udpOffset = None
+	if etherType == _IPV4 and len(data) >= ipOffset + 20:
+		headerSize = (data[ipOffset] & 0x0F) * 4
+		data[ipOffset+2:ipOffset+4] = max(0, end - ipOffset).to_bytes(2, 'big')
+		if data[ipOffset+9] == _UDP:
+			udpOffset = ipOffset + headerSize
+	elif etherType == _IPV6 and len(data) >= ipOffset + 40:
+		data[ipOffset+4:ipOffset+6] = max(0, end - ipOffset - 40).to_bytes(2, 'big')
+		if data[ipOffset+6] == _UDP:
+			udpOffset = ipOffset + 40
+	if udpOffset is not None and len(data) >= udpOffset + 8:
+		data[udpOffset+4:udpOffset+6] = max(0, end - udpOffset).to_bytes(2, 'big')
+	return data
+
+def resizeFlow(flow, size):
+	"""
+	Resize the skeleton of a flow to size bytes.
+	Checksum end offsets pointing to the end of the packet
+	(last data byte or after) are moved with it.
+	The Rate modifier recomputes its gap or rate by itself.
+	"""
+	packetField = flow.getModifierByType("skeleton_sender").getField("data")
+	oldSize = packetField.byteSize
+	if oldSize == size:
+		return
+	packetField.userValue = resizeSkeleton(packetField.value, size)
+	packetField.auto = False
+	for modifier in flow.modifiers:
+		if modifier.type != "checksum":
+			continue
+		endField = modifier.getField("end-offset")
+		endOffset = endField.value
+		if endOffset < oldSize - FCS_SIZE - 1 or endOffset >= endField.maximum:
+			continue
+		endField.userValue = max(0, min(endOffset + size - oldSize, size - 1))
+		endField.auto = False
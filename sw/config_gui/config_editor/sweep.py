@@ -0,0 +1,242 @@
+"""
+Parametric sweeps (RFC 2544 style): grids over frame size,
+aggregate rate and flow count, built from a base configuration
+and compiled in a process pool.
+"""
+
+import os
+import json
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+from .hardware import Hardware
+from .compiled import Frame, CompiledFlow, CompiledConfig
+from .skeleton import resizeFlow
+from .archive import ArchiveWriter
+from .compile_cache import CompileCache
+
+# Frame sizes of RFC 2544 (bytes, with FCS)
+RFC2544_SIZES = [64, 128, 256, 512, 1024, 1280, 1518]
+
+def grid(frameSizes, rates, flowCounts):
+	"""
+	List of sweep points (parameter dictionnaries),
+	ordered so that points sharing a frame size and flow count follow each other
+	"""
+	points = []
+	for frameSize, flowCount, rate in itertools.product(frameSizes, flowCounts, rates):
+		points.append({"frame_size": frameSize, "flow_count": flowCount, "rate": rate})
+	return points
+
+class SweepBuilder:
+	"""
+	Applies sweep points to one hardware model and compiles them.
+	Each flow of the base configuration is a template: flows that are not
+	enabled in the base configuration copy the first flow.
+	"""
+
+	def __init__(self, hardwarePath, baseConfig = None, cacheDirectory = None):
+		"""
+		hardwarePath: hardware configuration file (JSON)
+		baseConfig: saved configuration to start from (.gcf), if any
+		cacheDirectory: directory of a persistent CompileCache, if any
+		"""
+		self.__hardware = Hardware(hardwarePath)
+		self.__base = Hardware(hardwarePath)
+		if baseConfig is not None and not self.__base.load(baseConfig):
+			raise ValueError(baseConfig + " could not be loaded")
+		self.__templates = [flow if flow.enabled else self.__base.flows[0] for flow in self.__base.flows]
+		# Current (frame size, flow count) applied to the hardware
+		self.__shape = None
+		# Compiled frames of each modifier, keyed by its type, id and field bytes
+		self.__frames = {}
+		self.__cache = None if cacheDirectory is None else CompileCache(cacheDirectory)
+
+	@property
+	def hardware(self):
+		"""
+		Hardware with the last applied point
+		"""
+		return self.__hardware
+
+	@property
+	def cache(self):
+		"""
+		Persistent CompileCache, or None
+		"""
+		return self.__cache
+
+	def apply(self, point):
+		"""
+		Apply a sweep point to the hardware.
+		Skeletons are only changed when the frame size or flow count changes.
+		"""
+		flows = self.__hardware.flows
+		flowCount = point["flow_count"]
+		if flowCount < 1 or flowCount > len(flows):
+			raise ValueError("flow count should be between 1 and " + str(len(flows)))
+		shape = (point["frame_size"], flowCount)
+		if shape != self.__shape:
+			for i, flow in enumerate(flows):
+				flow.enabled = i < flowCount
+				if i < flowCount:
+					for modifier in self.__templates[i].modifiers:
+						flow.updateModifier(modifier)
+					resizeFlow(flow, point["frame_size"])
+			self.__shape = shape
+		rate = max(1, int(round(point["rate"] / flowCount)))
+		for flow in flows[:flowCount]:
+			rateField = flow.getModifierByType("rate").getField("rate")
+			rateField.userValue = rate
+			rateField.auto = False
+
+	def compile(self):
+		"""
+		Compile the hardware, reusing the frames of modifiers
+		already compiled with the same field values
+		(in this builder, or in the persistent cache)
+		"""
+		flows = []
+		for i, flow in enumerate(self.__hardware.flows):
+			if not flow.enabled:
+				continue
+			modifiers = flow.enabled_modifiers
+			frames = []
+			for j, modifier in enumerate(reversed(modifiers)):
+				last = j == len(modifiers) - 1
+				key = (modifier.type, modifier.id, last, tuple(bytes(field.bytes) for field in modifier.fields if field.inConfig))
+				frame = self.__frames.get(key)
+				if frame is None:
+					modifierBytes = modifier.bytes if self.__cache is None else self.__cache.modifierBytes(modifier)
+					frame = Frame.fromModifierBytes(modifierBytes, last)
+					self.__frames[key] = frame
+				frames.append(frame)
+			flows.append(CompiledFlow(frames, i+1))
+		return CompiledConfig(flows)
+
+	def predict(self):
+		"""
+		Predicted rates of the enabled flows of the hardware
+		"""
+		flows = []
+		for i, flow in enumerate(self.__hardware.flows):
+			if flow.enabled:
+				rate = flow.getModifierByType("rate")
+				flows.append({
+					"number": i+1,
+					"rate": rate.getField("rate").value,
+					"gap": rate.getField("gap").value,
+					"frame_rate": rate.frameRate
+				})
+		return {
+			"flows": flows,
+			"rate": sum(flow["rate"] for flow in flows),
+			"frame_rate": sum(flow["frame_rate"] for flow in flows)
+		}
+
+	def build(self, point):
+		"""
+		Apply and compile one point.
+		Returns the compiled configuration and the predicted rates.
+		"""
+		self.apply(point)
+		return self.compile(), self.predict()
+
+# Builder of each worker process
+_builder = None
+
+def _initWorker(hardwarePath, baseConfig, cacheDirectory):
+	"""
+	Create the builder of a worker process
+	"""
+	global _builder
+	_builder = SweepBuilder(hardwarePath, baseConfig, cacheDirectory)
+
+def _buildPoint(point):
+	"""
+	Build one point in a worker process.
+	Returns the compiled configuration, the predicted rates
+	and the cache hits and misses of this point.
+	"""
+	cache = _builder.cache
+	if cache is None:
+		return _builder.build(point) + (0, 0)
+	hits, misses = cache.hits, cache.misses
+	config, prediction = _builder.build(point)
+	return config, prediction, cache.hits - hits, cache.misses - misses
+
+class Sweep:
+	"""
+	Sweep over a grid of points
+	"""
+
+	def __init__(self, hardwarePath, points, baseConfig = None, name = "sweep", cacheDirectory = None):
+		"""
+		hardwarePath: hardware configuration file (JSON)
+		points: list of points, see grid()
+		baseConfig: saved configuration to start from (.gcf), if any
+		name: scenario name of the points in the archive
+		cacheDirectory: directory of a persistent CompileCache, if any
+		"""
+		self.__hardwarePath = hardwarePath
+		self.__points = list(points)
+		self.__baseConfig = baseConfig
+		self.__name = name
+		self.__cacheDirectory = cacheDirectory
+		# Persistent cache lookups of the last build
+		self.cacheHits = 0
+		self.cacheMisses = 0
+
+	@property
+	def points(self):
+		"""
+		Get a copy of the points list
+		"""
+		return list(self.__points)
+
+	def build(self, workers = None, chunkSize = None):
+		"""
+		Compile every point in a process pool (in this process if workers is 1).
+		Yields (point, compiled configuration, predicted rates) in order.
+		"""
+		self.cacheHits = 0
+		self.cacheMisses = 0
+		if workers == 1:
+			_initWorker(self.__hardwarePath, self.__baseConfig, self.__cacheDirectory)
+			results = map(_buildPoint, self.__points)
+			for point, (config, prediction, hits, misses) in zip(self.__points, results):
+				self.cacheHits+= hits
+				self.cacheMisses+= misses
+				yield point, config, prediction
+			return
+		if workers is None:
+			workers = os.cpu_count() or 1
+		if chunkSize is None:
+			chunkSize = max(1, len(self.__points) // (4 * workers))
+		with ProcessPoolExecutor(workers, initializer = _initWorker, initargs = (self.__hardwarePath, self.__baseConfig, self.__cacheDirectory)) as executor:
+			results = executor.map(_buildPoint, self.__points, chunksize = chunkSize)
+			for point, (config, prediction, hits, misses) in zip(self.__points, results):
+				self.cacheHits+= hits
+				self.cacheMisses+= misses
+				yield point, config, prediction
+
+	def write(self, archivePath, manifestPath = None, workers = None):
+		"""
+		Compile every point to an archive, and write the manifest
+		of predicted rates (JSON) if a path is given.
+		Returns the manifest.
+		"""
+		manifest = {"name": self.__name, "points": []}
+		with ArchiveWriter(archivePath) as archive:
+			for point, config, prediction in self.build(workers):
+				archive.add(self.__name, config, point)
+				manifest["points"].append({"params": point, "predicted": prediction})
+			manifest["unique_frames"] = archive.uniqueFrames
+			manifest["referenced_frames"] = archive.referencedFrames
+		if self.__cacheDirectory is not None:
+			manifest["cache_hits"] = self.cacheHits
+			manifest["cache_misses"] = self.cacheMisses
+		if manifestPath is not None:
+			with open(manifestPath, 'w') as manifestFile:
+				json.dump(manifest, manifestFile, indent = 1)
+		return manifest
@@ -0,0 +1,73 @@
+"""
+Checks of a configuration before it is exported:
+values accepted by the fields but that the hardware
+would not handle as expected.
+"""
+
+from .modifiers.rate import MAX_RATE
+
+class Issue:
+	"""
+	One problem found in a configuration
+	"""
+
+	def __init__(self, flowNumber, modifier, message):
+		"""
+		flowNumber: flow number in the hardware (1-based), None for the whole configuration
+		modifier: concerned modifier name, None for the whole flow
+		"""
+		self.flowNumber = flowNumber
+		self.modifier = modifier
+		self.message = message
+
+	def __str__(self):
+		text = ""
+		if self.flowNumber is not None:
+			text+= "Flow " + str(self.flowNumber) + ": "
+		if self.modifier is not None:
+			text+= self.modifier + ": "
+		return text + self.message
+
+def validateFlow(flow, number = None):
+	"""
+	Check one flow generator, returns a list of Issue
+	"""
+	issues = []
+	size = flow.getModifierByType("skeleton_sender").getField("size").value
+	for modifier in flow.enabled_modifiers:
+		def check(condition, message):
+			if not condition:
+				issues.append(Issue(number, modifier.name, message))
+		if modifier.type == "increment":
+			offset = modifier.getField("offset").value
+			check(offset + 2 <= size, "the counter at offset " + str(offset) + " is after the end of the packet")
+			check(modifier.getField("min").value <= modifier.getField("max").value, "the minimum is greater than the maximum")
+		elif modifier.type == "checksum":
+			start = modifier.getField("start-offset").value
+			end = modifier.getField("end-offset").value
+			value = modifier.getField("value-offset").value
+			check(start < size, "the data start offset is after the end of the packet")
+			check(start <= end, "the data end offset is before the start offset")
+			check(value + 2 <= size, "the value at offset " + str(value) + " is after the end of the packet")
+			if modifier.getField("type").value != "None":
+				check(modifier.getField("ip-offset").value < size, "the IP header offset is after the end of the packet")
+	return issues
+
+def validateHardware(hardware):
+	"""
+	Check all enabled flows of a hardware, returns a list of Issue
+	"""
+	issues = []
+	rate = 0
+	enabled = 0
+	for i, flow in enumerate(hardware.flows):
+		if not flow.enabled:
+			continue
+		enabled+= 1
+		issues+= validateFlow(flow, i+1)
+		rate+= flow.getModifierByType("rate").getField("rate").value
+	if enabled == 0:
+		issues.append(Issue(None, None, "no flow is enabled"))
+	if rate > MAX_RATE:
+		issues.append(Issue(None, None, "the flows need " + str(rate) + " Mb/s, more than the " + str(MAX_RATE) + " Mb/s of the link"))
+	return issues
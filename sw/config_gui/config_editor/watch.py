@@ -0,0 +1,271 @@
+"""
+Recompilation of configurations when flow specification files change
+(see flow_spec.py): each specification file is a scenario compiled to
+one configuration file with its own hardware model, kept between changes.
+Only the flows whose specification changed are reconfigured and compiled.
+"""
+
+import os
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import tempfile
+
+from .hardware import Hardware
+from .exceptions import ConfigError
+from .flow_spec import FlowSpec
+
+# Specification of a flow in an unknown state (failed update)
+_UNKNOWN = object()
+
+class Scenario:
+	"""
+	One flow specification file compiled to one configuration file
+	"""
+
+	def __init__(self, specPath, outputPath, hardware, cache = None):
+		"""
+		specPath: flow specification file (JSON)
+		outputPath: configuration file to write
+		hardware: Hardware model used only by this scenario
+		cache: CompileCache for the modifier bytes, if any
+		"""
+		self.specPath = specPath
+		self.outputPath = outputPath
+		self.__hardware = hardware
+		self.__cache = cache
+		# Applied specification dictionnary of each flow (None if disabled)
+		self.__applied = [_UNKNOWN] * len(hardware.flows)
+		# Compiled configuration of each flow
+		self.__flowData = [""] * len(hardware.flows)
+
+	@property
+	def hardware(self):
+		"""
+		Hardware model of the scenario
+		"""
+		return self.__hardware
+
+	def update(self):
+		"""
+		Read the specification file again, reconfigure and compile
+		the flows that changed, and rewrite the configuration if needed.
+		Returns the list of the recompiled flow indexes.
+		Raises a ConfigError if the specification is wrong:
+		the configuration file is then not written.
+		"""
+		specs = FlowSpec.fromFile(self.specPath)
+		flows = self.__hardware.flows
+		if len(specs) > len(flows):
+			raise ConfigError(self.specPath, 'flows', str(len(specs)) + " flows for " + str(len(flows)) + " flow generators")
+		changed = []
+		for i, flow in enumerate(flows):
+			spec = specs[i] if i < len(specs) else None
+			specData = spec.spec if spec is not None else None
+			if specData == self.__applied[i]:
+				continue
+			self.__applied[i] = _UNKNOWN
+			flow.reset()
+			if spec is not None:
+				spec.apply(flow)
+				self.__flowData[i] = self.__hardware.flowConfigData(i, self.__cache)
+			else:
+				self.__flowData[i] = ""
+			self.__applied[i] = specData
+			changed.append(i)
+		if changed:
+			self.__write()
+		return changed
+
+	def __write(self):
+		"""
+		Replace the configuration file once completely written
+		"""
+		directory = os.path.dirname(os.path.abspath(self.outputPath))
+		with tempfile.NamedTemporaryFile('w', dir = directory, suffix = ".tmp", delete = False) as configFile:
+			configFile.write("".join(self.__flowData))
+		os.replace(configFile.name, self.outputPath)
+
+class PollingWatcher:
+	"""
+	Detects file changes by comparing their status periodically
+	"""
+
+	def __init__(self, paths, interval = 0.05):
+		self.__paths = [os.path.abspath(path) for path in paths]
+		self.__interval = interval
+		self.__states = dict((path, self.__state(path)) for path in self.__paths)
+
+	def __state(self, path):
+		"""
+		Status of a file compared between checks, None if it does not exist
+		"""
+		try:
+			stat = os.stat(path)
+		except FileNotFoundError:
+			return None
+		return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+	def wait(self, timeout = None):
+		"""
+		Wait for changes. Returns the set of changed paths
+		(empty if the timeout expired).
+		"""
+		end = None if timeout is None else time.monotonic() + timeout
+		while True:
+			changed = set()
+			for path in self.__paths:
+				state = self.__state(path)
+				if state != self.__states[path]:
+					self.__states[path] = state
+					if state is not None:
+						changed.add(path)
+			if changed or (end is not None and time.monotonic() >= end):
+				return changed
+			time.sleep(self.__interval)
+
+	def close(self):
+		"""
+		Nothing to release
+		"""
+		pass
+
+class InotifyWatcher:
+	"""
+	Detects file changes with inotify (Linux).
+	Directories are watched, so that files replaced
+	by a rename (as many editors do) are detected.
+	"""
+
+	# Events of inotify.h
+	IN_CLOSE_WRITE = 0x00000008
+	IN_MOVED_TO = 0x00000080
+	IN_NONBLOCK = 0x00000800
+	# Header of an event: watch descriptor, mask, cookie, name length
+	EVENT = struct.Struct("iIII")
+	# Time to wait for the other events of a save (s)
+	SETTLE_TIME = 0.01
+
+	def __init__(self, paths):
+		"""
+		Raises OSError if inotify is not available
+		"""
+		libcName = ctypes.util.find_library("c")
+		if libcName is None:
+			raise OSError("the C library was not found")
+		self.__libc = ctypes.CDLL(libcName, use_errno = True)
+		if not hasattr(self.__libc, "inotify_init1"):
+			raise OSError("inotify is not available")
+		self.__fd = self.__libc.inotify_init1(self.IN_NONBLOCK)
+		if self.__fd < 0:
+			raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+		# Watch descriptor -> directory
+		self.__directories = {}
+		self.__paths = set(os.path.abspath(path) for path in paths)
+		for directory in set(os.path.dirname(path) for path in self.__paths):
+			wd = self.__libc.inotify_add_watch(self.__fd, os.fsencode(directory), self.IN_CLOSE_WRITE | self.IN_MOVED_TO)
+			if wd < 0:
+				errno = ctypes.get_errno()
+				self.close()
+				raise OSError(errno, "cannot watch " + directory)
+			self.__directories[wd] = directory
+
+	def __read(self):
+		"""
+		Read the pending events, returns the set of changed watched paths
+		"""
+		changed = set()
+		try:
+			data = os.read(self.__fd, 65536)
+		except BlockingIOError:
+			return changed
+		offset = 0
+		while offset < len(data):
+			wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+			offset+= self.EVENT.size
+			name = data[offset:offset+length].rstrip(b"\0")
+			offset+= length
+			path = os.path.join(self.__directories.get(wd, ""), os.fsdecode(name))
+			if path in self.__paths:
+				changed.add(path)
+		return changed
+
+	def wait(self, timeout = None):
+		"""
+		Wait for changes. Returns the set of changed paths
+		(empty if the timeout expired).
+		"""
+		end = None if timeout is None else time.monotonic() + timeout
+		while True:
+			remaining = None if end is None else max(0, end - time.monotonic())
+			ready, unused, unused = select.select([self.__fd], [], [], remaining)
+			if not ready:
+				return set()
+			changed = self.__read()
+			if changed:
+				# Gather the events of the same save
+				while select.select([self.__fd], [], [], self.SETTLE_TIME)[0]:
+					changed|= self.__read()
+				return changed
+
+	def close(self):
+		"""
+		Stop watching
+		"""
+		if self.__fd >= 0:
+			os.close(self.__fd)
+			self.__fd = -1
+
+def createWatcher(paths, polling = False):
+	"""
+	Watcher of a list of files: inotify if available, else polling
+	"""
+	if not polling:
+		try:
+			return InotifyWatcher(paths)
+		except OSError:
+			pass
+	return PollingWatcher(paths)
+
+class WatchSession:
+	"""
+	Scenarios of several specification files, sharing one hardware description
+	"""
+
+	def __init__(self, hardwarePath, specPaths, outputDirectory, cache = None):
+		"""
+		hardwarePath: hardware configuration file (JSON), read once per scenario
+		specPaths: flow specification files
+		outputDirectory: directory of the configurations (<spec name>.txt)
+		cache: CompileCache for the modifier bytes, if any
+		"""
+		self.scenarios = {}
+		for specPath in specPaths:
+			name = os.path.splitext(os.path.basename(specPath))[0]
+			outputPath = os.path.join(outputDirectory, name + ".txt")
+			self.scenarios[os.path.abspath(specPath)] = Scenario(specPath, outputPath, Hardware(hardwarePath), cache)
+
+	@property
+	def paths(self):
+		"""
+		Watched specification files
+		"""
+		return list(self.scenarios)
+
+	def update(self, paths = None):
+		"""
+		Update the scenarios of the changed files (all if None).
+		Yields (scenario, recompiled flow indexes or the error, duration in s):
+		errors of a scenario are returned, never raised.
+		"""
+		for path in (self.scenarios if paths is None else paths):
+			scenario = self.scenarios[path]
+			begin = time.perf_counter()
+			try:
+				result = scenario.update()
+			except Exception as e:
+				# Any error of a specification: the session keeps watching
+				result = e
+			yield scenario, result, time.perf_counter() - begin
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Runs the benchmarks of the configuration model and export,
+and compares them with a baseline saved on the same machine.
+"""
+
+import sys
+import argparse
+
+from config_editor.benchmark import BenchmarkSuite, Baselines, MIN_DELTA, machineName
+
+def formatTime(seconds):
+    """
+    Human-readable duration
+    """
+    if seconds < 1e-3:
+        return "%8.2f us" % (seconds * 1e6)
+    return "%8.2f ms" % (seconds * 1e3)
+
+def main():
+    """
+    Parse the arguments, run the benchmarks and compare or save the results
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the configuration model and export.")
+    parser.add_argument("--hardware", default="config/hardware.json", help="hardware configuration (modifiers of each flow)")
+    parser.add_argument("--filter", help="only run the benchmarks matching this regular expression")
+    parser.add_argument("--repeat", type=int, default=5, help="number of measures of each benchmark, the best is kept")
+    parser.add_argument("--baselines", default="benchmarks/baselines.json", help="file of the saved baselines")
+    parser.add_argument("--compare", metavar="VERSION", help="baseline version to compare with (default: the latest saved on this machine)")
+    parser.add_argument("--save", metavar="VERSION", help="save the results as a baseline under this version")
+    parser.add_argument("--threshold", type=float, default=0.25, help="accepted slowdown before failing (0.25 for 25%%)")
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA * 1e6, help="accepted slowdown whatever the threshold (us, default: %g)" % (MIN_DELTA * 1e6))
+    parser.add_argument("--retries", type=int, default=2, help="times the suspected regressions are measured again (default: 2)")
+    args = parser.parse_args()
+
+    baselines = Baselines(args.baselines)
+    host = machineName()
+    version = args.compare if args.compare is not None else baselines.latestOn(host)
+    if version is not None and version not in baselines.versions:
+        parser.error("no baseline " + version + " in " + args.baselines)
+
+    suite = BenchmarkSuite(args.hardware)
+    try:
+        results = suite.run(args.filter, args.repeat, lambda name, time: print("%-32s %s" % (name, formatTime(time)), flush=True))
+        references = dict(suite.references)
+        comparison = []
+        if version is not None:
+            comparison = baselines.compare(version, results, references, args.threshold, args.min_delta * 1e-6)
+            # Noise gives slowdowns that a new measure does not confirm:
+            # the measure with the best time relative to its reference is kept
+            for retry in range(args.retries):
+                suspects = [name for name, baseline, time, ratio, regression in comparison if regression]
+                if not suspects:
+                    break
+                print("Measuring again: " + ", ".join(suspects), flush=True)
+                for name, time in suite.run(repeat=args.repeat, names=suspects).items():
+                    if time / suite.references[name] < results[name] / references[name]:
+                        results[name] = time
+                        references[name] = suite.references[name]
+                comparison = baselines.compare(version, results, references, args.threshold, args.min_delta * 1e-6)
+    finally:
+        suite.close()
+
+    regressions = 0
+    print()
+    if version is None:
+        print("No baseline saved on this machine (%s): not compared, save one with --save VERSION" % host)
+    else:
+        baseline = baselines.versions[version]
+        print("Compared with %s (%s), scaled by the reference work measured with each benchmark:" % (version, baseline['date']))
+        if baseline.get('host') != host:
+            print("Warning: baseline saved on another machine (%s)" % baseline.get('host', "unknown"))
+        for name, baselineTime, time, ratio, regression in comparison:
+            print("%-32s %s -> %s %+7.1f%%%s" % (name, formatTime(baselineTime), formatTime(time), (ratio - 1) * 100, "  REGRESSION" if regression else ""))
+            if regression:
+                regressions+= 1
+        print("%d regressions over %.0f%% and %g us" % (regressions, args.threshold * 100, args.min_delta))
+    if args.save is not None:
+        baselines.save(args.save, results, references)
+        print("Saved as " + args.save + " in " + args.baselines)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
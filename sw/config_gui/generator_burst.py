@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compiles a burst or on/off traffic pattern into flow instances
+or a multi-phase schedule, and reports the approximation error.
+"""
+
+import sys
+import argparse
+
+from board.burst import BurstSpec, BurstCompiler, STRATEGIES, SWITCH_TIME
+from board.device import ToolDevice, SimulatedDevice
+from config_editor.modifiers.rate import MAX_RATE
+
+# Time units accepted after a duration
+TIME_UNITS = [("ns", 1e-9), ("us", 1e-6), ("ms", 1e-3), ("s", 1)]
+
+def parseTime(text):
+    """
+    Parse a duration: seconds, or a number followed by ns, us, ms or s
+    """
+    for unit, scale in TIME_UNITS:
+        if text.endswith(unit):
+            try:
+                return float(text[:-len(unit)]) * scale
+            except ValueError:
+                break
+    try:
+        return float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected a duration such as 20us")
+
+def main():
+    """
+    Parse the arguments, compile the pattern, and export or run it
+    """
+    parser = argparse.ArgumentParser(description="Compile a burst or on/off traffic pattern.")
+    parser.add_argument("--hardware", default="config/hardware.json", help="hardware configuration file")
+    parser.add_argument("--base", help="saved configuration to take the flow template from (.gcf)")
+    parser.add_argument("--frame-size", type=int, help="frame size in bytes, with FCS (default: size of the template)")
+    parser.add_argument("--burst-size", type=int, required=True, help="frames per burst")
+    parser.add_argument("--burst-rate", type=float, default=MAX_RATE, help="rate during a burst (Mb/s, default: %d)" % MAX_RATE)
+    parser.add_argument("--off", type=parseTime, help="idle time between bursts (20us, 1.5ms...)")
+    parser.add_argument("--duty", type=float, help="duty cycle (0 to 1), instead of the off time")
+    parser.add_argument("--bursts", type=int, default=1000, help="number of bursts")
+    parser.add_argument("--strategy", choices=STRATEGIES, help="approximation strategy (default: smallest error)")
+    parser.add_argument("--switch-time", type=parseTime, default=SWITCH_TIME, help="minimum idle time between two phases (default: 1ms)")
+    parser.add_argument("--periods", type=int, default=3, help="number of periods in the timeline")
+    parser.add_argument("-o", "--output", help="file to export the configuration to")
+    parser.add_argument("--run", action="store_true", help="run the schedule on the board")
+    parser.add_argument("--tool", default="traffic_generator", help="path to the traffic_generator tool")
+    parser.add_argument("--simulate", action="store_true", help="run on a local stand-in board")
+    args = parser.parse_args()
+
+    try:
+        spec = BurstSpec(args.burst_size, args.burst_rate, args.off, args.duty, args.bursts)
+        compiler = BurstCompiler(args.hardware, args.base, args.frame_size, args.switch_time)
+        plan = compiler.compile(spec, args.strategy)
+    except ValueError as e:
+        print("Error: %s" % e, file=sys.stderr)
+        return 1
+    print(plan)
+    print("")
+    print(plan.timelineText(args.periods))
+    if args.output is not None:
+        plan.config.exportConfig(args.output)
+        print("Configuration exported to %s" % args.output)
+    if args.run or args.simulate:
+        instances = len(compiler.hardware.flows)
+        device = SimulatedDevice(instances=instances) if args.simulate else ToolDevice(instances=instances, command=args.tool)
+        print("")
+        print(plan.schedule().run(device))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
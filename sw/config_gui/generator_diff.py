@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compares two exported configurations and writes
+only the frames the board needs to go from one to the other.
+"""
+
+import sys
+import argparse
+
+from config_editor.compiled import CompiledConfig
+from config_editor.diff import ConfigDiff, UploadModel
+
+def main():
+    """
+    Parse the arguments and print the what-if report
+    """
+    parser = argparse.ArgumentParser(description="Compute the frames to send to go from one configuration to another.")
+    parser.add_argument("old", help="configuration currently on the board")
+    parser.add_argument("new", help="configuration to set")
+    parser.add_argument("-o", "--output", help="file to write the frames to send to")
+    parser.add_argument("--started", action="store_true", help="the board has been started since the old configuration was sent")
+    parser.add_argument("--instances", type=int, help="number of flow generators of the board")
+    parser.add_argument("--bandwidth", type=float, default=100e6, help="upload bandwidth (bytes/s)")
+    parser.add_argument("--frame-overhead", type=float, default=50e-6, help="fixed time to send one frame (s)")
+    parser.add_argument("--action-time", type=float, default=5e-3, help="time to send the reset action (s)")
+    args = parser.parse_args()
+
+    diff = ConfigDiff(CompiledConfig.fromFile(args.old), CompiledConfig.fromFile(args.new), args.started, args.instances)
+    print(diff.report(UploadModel(args.bandwidth, args.frame_overhead, args.action_time)))
+    if args.output is not None:
+        diff.exportConfig(args.output)
+        if diff.resetRequired:
+            print("Run 'traffic_generator reset' before sending " + args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
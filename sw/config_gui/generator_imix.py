@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Maps a packet size distribution (IMIX) on the flow instances
+of a board, and reports the obtained mix.
+"""
+
+import sys
+import argparse
+
+from config_editor.imix import ImixMapper, parseDistribution, TOLERANCE, DURATION
+
+def main():
+    """
+    Parse the arguments, map the distribution and export the configuration
+    """
+    parser = argparse.ArgumentParser(description="Map a packet size distribution on flow instances.")
+    parser.add_argument("distribution", help='"simple" (64, 594 and 1518 bytes, 7:4:1), weights of these sizes ("7:4:1"), size:weight pairs ("64:7,594:4,1518:1") or a histogram file')
+    parser.add_argument("--rate", type=float, required=True, help="aggregate rate (Mb/s)")
+    parser.add_argument("--hardware", default="config/hardware.json", help="hardware configuration file")
+    parser.add_argument("--base", help="saved configuration to take the flow template from (.gcf)")
+    parser.add_argument("--instances", type=int, help="maximum number of flow instances to use (default: all)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="relative frame rate error accepted for each size (default: %g)" % TOLERANCE)
+    parser.add_argument("--duration", type=float, default=DURATION, help="sending duration giving the iterations of each flow (s)")
+    parser.add_argument("-o", "--output", help="file to export the configuration to")
+    parser.add_argument("--save", help="file to save the configuration to (.gcf)")
+    args = parser.parse_args()
+
+    try:
+        distribution = parseDistribution(args.distribution)
+        mapper = ImixMapper(args.hardware, args.base)
+        plan = mapper.map(distribution, args.rate, args.instances, args.tolerance, args.duration)
+    except ValueError as e:
+        print("Error: %s" % e, file=sys.stderr)
+        return 1
+    print(plan)
+    if args.output is not None:
+        plan.config.exportConfig(args.output)
+        print("Configuration exported to %s" % args.output)
+    if args.save is not None:
+        mapper.hardware.saveTo(args.save)
+        print("Configuration saved to %s" % args.save)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
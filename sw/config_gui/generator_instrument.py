@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Loads, edits and exports a configuration with the model instrumentation
+enabled, and reports event dispatches, cascades and compilation times.
+"""
+
+import sys
+import json
+import argparse
+
+from config_editor import Hardware
+from config_editor import instrumentation
+from config_editor.skeleton import resizeFlow
+
+def main():
+    """
+    Parse the arguments, run the steps and print the report
+    """
+    parser = argparse.ArgumentParser(description="Report the events and compilation times of the configuration model.")
+    parser.add_argument("config", nargs="?", help="saved configuration (.gcf) to load")
+    parser.add_argument("--hardware", default="config/hardware.json", help="hardware configuration")
+    parser.add_argument("--resize", type=int, metavar="SIZE", help="resize the skeletons of the enabled flows to SIZE bytes")
+    parser.add_argument("-o", "--output", help="export the configuration to this file (else only compiled)")
+    parser.add_argument("--json", action="store_true", help="print the snapshot as JSON")
+    parser.add_argument("--top", type=int, default=10, help="number of sources listed per event")
+    args = parser.parse_args()
+
+    hardware = Hardware(args.hardware)
+    instrumentation.enable()
+    if args.config is not None and not hardware.load(args.config):
+        print("Cannot load " + args.config, file=sys.stderr)
+        return 1
+    if args.resize is not None:
+        for flow in hardware.flows:
+            if flow.enabled:
+                resizeFlow(flow, args.resize)
+    if args.output is not None:
+        hardware.exportConfig(args.output)
+    else:
+        hardware.configData
+    instrumentation.disable()
+
+    if args.json:
+        print(json.dumps(instrumentation.snapshot(), indent=1))
+    else:
+        print(instrumentation.report(top=args.top))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Measures the rate and inter-frame gap of each flow live,
+in a capture written to a pipe or to a growing pcap file,
+and compares them with the rates of the configuration.
+"""
+
+import sys
+import json
+import time
+import argparse
+
+from config_editor import Hardware
+from board.meter import RateMeter
+
+def formatValue(value, format):
+    """
+    Format a value that may be missing
+    """
+    return "-" if value is None else format % value
+
+def printSnapshot(snapshot):
+    """
+    Print the statistics of each flow as a table
+    """
+    print("t=%.3f s" % snapshot["time"])
+    print("  flow     packets    frames/s   predicted   error %    Mb/s   gap (B)  predicted  jitter (us)")
+    for flow in snapshot["flows"]:
+        print("  %4d %11d %11s %11s %8s %7s %9s %10d %12s" % (
+            flow["number"], flow["packets"],
+            formatValue(flow["frame_rate"], "%.0f"), "%.0f" % flow["predicted_frame_rate"],
+            formatValue(flow.get("error"), "%+.2f"), formatValue(flow["rate"], "%.1f"),
+            formatValue(flow.get("gap"), "%.1f"), flow["predicted_gap"],
+            formatValue(flow["jitter"] * 1e6 if "jitter" in flow else None, "%.3f")))
+    unmatched = snapshot["unmatched"]
+    print("  other %10d %11s" % (unmatched["packets"], formatValue(unmatched["frame_rate"], "%.0f")), flush=True)
+
+def main():
+    """
+    Parse the arguments and read the capture until its end or an interruption
+    """
+    parser = argparse.ArgumentParser(description="Measure the rate and gap of each flow in a live capture.")
+    parser.add_argument("pcap", help="pcap stream: file, named pipe, or - for the standard input (tcpdump -w -)")
+    parser.add_argument("config", help="saved configuration of the board (.gcf)")
+    parser.add_argument("--hardware", default="config/hardware.json", help="hardware configuration file")
+    parser.add_argument("--interval", type=float, default=1.0, help="time between reports (s, capture time)")
+    parser.add_argument("--window", type=float, default=1.0, help="sliding window of the rates (s)")
+    parser.add_argument("--buckets", type=int, default=10, help="number of time buckets of the window")
+    parser.add_argument("--follow", action="store_true", help="wait for a growing file instead of stopping at its end")
+    parser.add_argument("--fcs", action="store_true", help="captured packets include the Ethernet FCS")
+    parser.add_argument("--strict", action="store_true", help="compare all stable bytes of the packets (slower), other traffic is reported as other")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per report")
+    args = parser.parse_args()
+
+    hardware = Hardware(args.hardware)
+    hardware.load(args.config, remember=False)
+    meter = RateMeter.fromHardware(hardware, args.fcs, args.interval, args.window, args.buckets, args.strict)
+    report = (lambda snapshot: print(json.dumps(snapshot), flush=True)) if args.json else printSnapshot
+    begin = time.perf_counter()
+    try:
+        if args.pcap == "-":
+            snapshot = meter.run(sys.stdin.buffer, report, args.follow)
+        else:
+            with open(args.pcap, 'rb') as pcapFile:
+                snapshot = meter.run(pcapFile, report, args.follow)
+    except KeyboardInterrupt:
+        snapshot = meter.snapshot()
+    duration = time.perf_counter() - begin
+    if snapshot["time"] is None:
+        print("No packet", file=sys.stderr)
+        return 1
+    report(snapshot)
+    if not args.json:
+        packets = sum(flow["packets"] for flow in snapshot["flows"]) + snapshot["unmatched"]["packets"]
+        print("%d packets processed in %.2f s (%.0f packets/s)" % (packets, duration, packets / duration if duration > 0 else 0))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Monitors the status of a generator board continuously
+and serves metrics in the Prometheus text format.
+"""
+
+import sys
+import time
+import argparse
+
+from board.device import STATUS_NAMES
+from board.monitor import RegisterWindow, StatusMonitor, serveMetrics, createFakeRegisters, GEN_BASE_ADDR
+
+def parseAddress(text):
+    """
+    Parse a listening address: "host:port", ":port" or a Unix socket path
+    """
+    if "/" in text:
+        return text
+    host, separator, port = text.rpartition(":")
+    if not port.isdigit():
+        raise argparse.ArgumentTypeError("expected host:port or a Unix socket path")
+    return (host or "127.0.0.1", int(port))
+
+def main():
+    """
+    Parse the arguments, poll the board and serve the metrics until interrupted
+    """
+    parser = argparse.ArgumentParser(description="Monitor the status of a generator board.")
+    parser.add_argument("registers", help="file to map the registers from (board memory resource, or a fake register file)")
+    parser.add_argument("--offset", type=lambda text: int(text, 0), default=GEN_BASE_ADDR, help="offset of the generator registers in the file (default: 0x%X)" % GEN_BASE_ADDR)
+    parser.add_argument("--fake", action="store_true", help="create the register file if needed (tests without board)")
+    parser.add_argument("--board", default="board", help="board name in the metrics")
+    parser.add_argument("--frequency", type=float, default=1000, help="samples per second")
+    parser.add_argument("--capacity", type=int, default=65536, help="number of samples kept in memory")
+    parser.add_argument("--listen", type=parseAddress, default=("127.0.0.1", 9469), help="metrics address: host:port or a Unix socket path (default: 127.0.0.1:9469)")
+    args = parser.parse_args()
+
+    if args.fake:
+        createFakeRegisters(args.registers, args.offset).close()
+    window = RegisterWindow(args.registers, args.offset)
+    def onTransition(when, old, new):
+        print("%s %s -> %s" % (time.strftime("%H:%M:%S", time.localtime(when)) + ("%.3f" % (when % 1))[1:], STATUS_NAMES.get(old, "unknown"), STATUS_NAMES.get(new, "unknown")), flush=True)
+    monitor = StatusMonitor(window, args.board, args.frequency, args.capacity, onTransition=onTransition)
+    monitor.start()
+    server = serveMetrics(monitor, args.listen)
+    print("Monitoring %s at %g Hz, metrics on %s" % (args.registers, args.frequency, args.listen if isinstance(args.listen, str) else "http://%s:%d/metrics" % args.listen), flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        monitor.stop()
+        window.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
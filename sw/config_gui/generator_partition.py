@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Distributes a list of logical flows over several boards
+and writes one configuration per board.
+"""
+
+import sys
+import time
+import argparse
+
+from config_editor.flow_spec import FlowSpec
+from config_editor.exceptions import ConfigError
+from config_editor.partition import Partitioner
+
+def parseBoard(text):
+    """
+    Parse a board description: "name=hardware.json"
+    """
+    if "=" not in text:
+        raise argparse.ArgumentTypeError("expected name=hardware.json")
+    name, path = text.split("=", 1)
+    return name, path
+
+def main():
+    """
+    Parse the arguments, partition the flows and export the configurations
+    """
+    parser = argparse.ArgumentParser(description="Distribute logical flows over several boards.")
+    parser.add_argument("spec", help="JSON file with the list of flows")
+    parser.add_argument("--board", type=parseBoard, action="append", required=True, help="board name and hardware configuration (name=hardware.json), repeatable")
+    parser.add_argument("-o", "--output", help="directory to write one configuration per board to")
+    args = parser.parse_args()
+
+    begin = time.perf_counter()
+    try:
+        specs = FlowSpec.fromFile(args.spec)
+    except ConfigError as e:
+        print("Error: %s" % e, file=sys.stderr)
+        return 1
+    partition = Partitioner(args.board).partition(specs)
+    print(partition.report())
+    print("%d flows placed in %.3f s" % (len(specs) - len(partition.unassigned), time.perf_counter() - begin))
+    if args.output is not None:
+        try:
+            for path in partition.exportConfigs(args.output):
+                print("Written " + path)
+        except ConfigError as e:
+            # Values are only checked against the hardware when applied
+            print("Error: %s" % e, file=sys.stderr)
+            return 1
+    return 0 if partition.complete else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Measures the startup time of the configuration tools
+(import of the packages and loading of the hardware configuration)
+and checks it against a budget.
+Each measure runs in a new interpreter with "-X importtime".
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+# Startup entry points: name -> code run in a new interpreter
+ENTRY_POINTS = {
+    'core': "import config_editor; config_editor.Hardware({hardware!r})",
+    'gui': "import generator_gui; generator_gui.Hardware({hardware!r})"
+}
+# Packages and modules of this tool, reported in the slowest imports
+PACKAGES = ("config_editor", "board", "gui", "generator_gui")
+
+def measure(code, runs):
+    """
+    Run code in new interpreters, keep the fastest run.
+    Returns (total time in ms, {module: cumulative import time in ms}).
+    Raises a RuntimeError with the last error line if the code fails
+    (missing dependency).
+    """
+    best = None
+    for i in range(runs):
+        command = [sys.executable, "-X", "importtime", "-c", "import time; begin = time.perf_counter(); " + code + "; print((time.perf_counter() - begin) * 1000)"]
+        result = subprocess.run(command, cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        if result.returncode != 0:
+            errors = [line for line in result.stderr.splitlines() if line and not line.startswith("import time:")]
+            raise RuntimeError(errors[-1] if errors else "exit status %d" % result.returncode)
+        total = float(result.stdout.split()[-1])
+        if best is None or total < best[0]:
+            best = (total, parseImportTime(result.stderr))
+    return best
+
+def parseImportTime(text):
+    """
+    Parse the "-X importtime" output: module -> cumulative time in ms
+    """
+    modules = {}
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            cumulative = int(fields[1]) / 1000
+        except ValueError:
+            # Header line
+            continue
+        modules[fields[2].strip()] = cumulative
+    return modules
+
+def main():
+    """
+    Parse the arguments, measure each entry point and compare with the budgets
+    """
+    parser = argparse.ArgumentParser(description="Measure the startup time of the configuration tools.")
+    parser.add_argument("--hardware", default="config/hardware.json", help="hardware configuration to load")
+    parser.add_argument("--budget-core", type=float, default=100, help="startup budget of config_editor without GUI (ms)")
+    parser.add_argument("--budget-gui", type=float, default=400, help="startup budget of the GUI entry point, without the window (ms)")
+    parser.add_argument("--runs", type=int, default=5, help="number of runs, the fastest is kept")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to report")
+    parser.add_argument("--skip-missing", action="store_true", help="skip the entry points that cannot be imported (PyQt missing...) instead of failing")
+    args = parser.parse_args()
+
+    budgets = {'core': args.budget_core, 'gui': args.budget_gui}
+    failed = False
+    for name, code in sorted(ENTRY_POINTS.items()):
+        try:
+            total, modules = measure(code.format(hardware=args.hardware), args.runs)
+        except RuntimeError as e:
+            if args.skip_missing:
+                print("%s: skipped, cannot be imported here (%s)" % (name, e))
+            else:
+                print("%s: NOT MEASURED, cannot be imported here (%s)" % (name, e))
+                failed = True
+            continue
+        status = "OK" if total <= budgets[name] else "OVER BUDGET"
+        failed = failed or total > budgets[name]
+        print("%s: %.1f ms (budget %.0f ms) %s" % (name, total, budgets[name], status))
+        # Slowest imports of the packages of this tool (cumulative)
+        own = [(module, time) for module, time in modules.items() if module.split(".")[0] in PACKAGES]
+        for module, time in sorted(own, key=lambda item: -item[1])[:args.top]:
+            print("    %8.1f ms  %s" % (time, module))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
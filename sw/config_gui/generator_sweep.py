@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Builds a grid of configurations over frame size, rate and flow count
+(RFC 2544 style) from a base configuration.
+"""
+
+import sys
+import time
+import argparse
+
+from config_editor.sweep import Sweep, grid, RFC2544_SIZES
+
+def parseList(text):
+    """
+    Parse a list of integers: "64,128,256" or a range "64:1518:64"
+    """
+    values = []
+    for part in text.split(","):
+        if ":" in part:
+            start, stop, step = (int(value) for value in part.split(":"))
+            values+= list(range(start, stop + 1, step))
+        else:
+            values.append(int(part))
+    return values
+
+def main():
+    """
+    Parse the arguments and build the sweep
+    """
+    parser = argparse.ArgumentParser(description="Build a grid of configurations over frame size, rate and flow count.")
+    parser.add_argument("archive", help="archive file to write the compiled configurations to")
+    parser.add_argument("--hardware", default="config/hardware.json", help="hardware configuration file")
+    parser.add_argument("--base", help="saved configuration to start from (.gcf)")
+    parser.add_argument("--sizes", type=parseList, default=RFC2544_SIZES, help="frame sizes in bytes (default: RFC 2544 sizes)")
+    parser.add_argument("--rates", type=parseList, default=[10000], help="aggregate rates in Mb/s")
+    parser.add_argument("--flows", type=parseList, default=[1], help="flow counts")
+    parser.add_argument("--manifest", help="JSON file to write the predicted rates of each point to")
+    parser.add_argument("--name", default="sweep", help="scenario name in the archive")
+    parser.add_argument("--workers", type=int, help="number of worker processes")
+    parser.add_argument("--cache", metavar="DIRECTORY", help="persistent cache of compiled modifiers, shared between runs")
+    args = parser.parse_args()
+
+    begin = time.perf_counter()
+    sweep = Sweep(args.hardware, grid(args.sizes, args.rates, args.flows), args.base, args.name, args.cache)
+    manifest = sweep.write(args.archive, args.manifest, args.workers)
+    print("%d points compiled in %.2f s (%d unique frames for %d referenced)" % (len(manifest["points"]), time.perf_counter() - begin, manifest["unique_frames"], manifest["referenced_frames"]))
+    if args.cache is not None:
+        lookups = manifest["cache_hits"] + manifest["cache_misses"]
+        print("compile cache: %d hits, %d misses (%.1f%% hit rate)" % (manifest["cache_hits"], manifest["cache_misses"], 100 * manifest["cache_hits"] / max(1, lookups)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Exports saved configurations as simulation vectors of the flow generators
+(stimulus and expected words), and runs them with GHDL when it is installed.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+from config_editor import Hardware
+from board.testbench import hardwareCases, duplicateNames, GhdlRunner, PACKETS
+
+# Hardware sources, from the location of this script
+HDL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "hw", "traffic_generator")
+
+def findConfigs(paths):
+    """
+    Saved configurations (.gcf) given directly or found in directories:
+    list of (path, name), the name being the path relative to the given
+    directory, without extension and with _ instead of separators
+    """
+    configs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, subdirectories, names in os.walk(path):
+                subdirectories.sort()
+                for name in sorted(names):
+                    if name.endswith(".gcf"):
+                        configPath = os.path.join(directory, name)
+                        configs.append((configPath, os.path.relpath(configPath, path)))
+        else:
+            configs.append((path, os.path.basename(path)))
+    return [(configPath, os.path.splitext(name)[0].replace(os.sep, "_")) for configPath, name in configs]
+
+def main():
+    """
+    Parse the arguments, build the cases, and export or simulate them
+    """
+    parser = argparse.ArgumentParser(description="Export and simulate flow generator test vectors.")
+    parser.add_argument("configs", nargs="+", help="saved configurations (.gcf) or directories containing them")
+    parser.add_argument("--hardware", default="config/hardware.json", help="hardware configuration file")
+    parser.add_argument("--packets", type=int, default=PACKETS, help="frames compared per flow (default: %d)" % PACKETS)
+    parser.add_argument("--keep-rate", action="store_true", help="send the Rate configuration too (slower, the rate only changes the timing)")
+    parser.add_argument("-o", "--output", help="directory to export the stimulus and expected files to")
+    parser.add_argument("--run", action="store_true", help="simulate the cases with GHDL")
+    parser.add_argument("--jobs", type=int, help="parallel simulations (default: number of processors)")
+    parser.add_argument("--work", help="GHDL work directory (default: temporary)")
+    parser.add_argument("--hdl", default=HDL_PATH, help="hardware sources directory (hw/traffic_generator)")
+    parser.add_argument("--ghdl", default="ghdl", help="path to the GHDL executable")
+    args = parser.parse_args()
+
+    errors = 0
+    cases = []
+    names = set()
+    caseNames = set()
+    for config, name in findConfigs(args.configs):
+        if name in names:
+            print("Error: %s: another configuration is named %s, skipped" % (config, name), file=sys.stderr)
+            errors+= 1
+            continue
+        names.add(name)
+        hardware = Hardware(args.hardware)
+        if not hardware.load(config, remember=False):
+            print("Error: %s could not be loaded" % config, file=sys.stderr)
+            errors+= 1
+            continue
+        try:
+            configCases = hardwareCases(hardware, name, args.packets, args.keep_rate)
+        except ValueError as e:
+            print("Error: %s: %s" % (config, e), file=sys.stderr)
+            errors+= 1
+            continue
+        duplicates = duplicateNames(configCases) + sorted(set(case.name for case in configCases) & caseNames)
+        if duplicates:
+            print("Error: %s: case names already used (%s), skipped" % (config, ", ".join(duplicates)), file=sys.stderr)
+            errors+= 1
+            continue
+        caseNames.update(case.name for case in configCases)
+        cases+= configCases
+    print("%d cases (%d distinct)" % (len(cases), len(set(case.key for case in cases))))
+
+    if args.output is not None:
+        os.makedirs(args.output, exist_ok=True)
+        for case in cases:
+            case.write(args.output)
+        print("Vectors exported to %s" % args.output)
+
+    if args.run:
+        with tempfile.TemporaryDirectory() as temporary:
+            runner = GhdlRunner(args.hdl, args.work or temporary, args.jobs, args.ghdl)
+            if not runner.available:
+                print("GHDL not found: simulation skipped", file=sys.stderr)
+                return 1 if errors else 0
+            begin = time.perf_counter()
+            try:
+                runner.prepare()
+            except RuntimeError as e:
+                print("Error: %s" % e, file=sys.stderr)
+                return 1
+            results = runner.run(cases, lambda result: print(result, flush=True) if not result.passed else None)
+            passed = sum(1 for result in results if result.passed)
+            failed = sum(1 for result in results if result.passed is False)
+            print("%d passed, %d failed, %d errors in %.1f s" % (passed, failed, len(results) - passed - failed, time.perf_counter() - begin))
+            if passed < len(results):
+                errors+= 1
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+RFC 2544 throughput test: finds the zero-loss rate
+of a device under test for each frame size.
+"""
+
+import sys
+import shlex
+import argparse
+
+from board import ToolDevice, SimulatedDevice
+from board.capture import CommandReceiver, SimulatedReceiver
+from board.throughput import ThroughputSearch
+from config_editor.sweep import RFC2544_SIZES
+from generator_sweep import parseList
+
+def main():
+    """
+    Parse the arguments and run the search
+    """
+    parser = argparse.ArgumentParser(description="Find the zero-loss throughput of a device under test for each frame size.")
+    parser.add_argument("--hardware", default="config/hardware.json", help="hardware configuration file")
+    parser.add_argument("--base", help="saved configuration to start from (.gcf)")
+    parser.add_argument("--sizes", type=parseList, default=RFC2544_SIZES, help="frame sizes in bytes (default: RFC 2544 sizes)")
+    parser.add_argument("--flows", type=int, default=1, help="number of flows sharing the rate")
+    parser.add_argument("--resolution", type=int, default=10, help="search resolution (Mb/s)")
+    parser.add_argument("--loss", type=float, default=0, help="fraction of lost frames accepted")
+    parser.add_argument("--duration", type=float, help="trial duration (s), base iterations if not set")
+    parser.add_argument("--timeout", type=float, default=120, help="maximum time to wait for the board (s)")
+    parser.add_argument("--pcap", default="/tmp/throughput.pcap", help="capture file")
+    parser.add_argument("--capture", default="tcpdump -i eth1 -w {path}", help="capture command, {path} is replaced by the capture file")
+    parser.add_argument("--fcs", action="store_true", help="captured packets include the Ethernet FCS")
+    parser.add_argument("--tool", default="traffic_generator", help="path to the traffic_generator tool")
+    parser.add_argument("--instances", type=int, help="number of flow generators of the board")
+    parser.add_argument("--simulate", type=float, metavar="CAPACITY", help="use a local stand-in board and device under test forwarding CAPACITY frames/s")
+    args = parser.parse_args()
+
+    if args.simulate is not None:
+        device = SimulatedDevice(instances=args.instances or 2)
+        receiver = SimulatedReceiver(device, args.pcap, args.simulate)
+    else:
+        device = ToolDevice(instances=args.instances, command=args.tool)
+        receiver = CommandReceiver(shlex.split(args.capture), args.pcap)
+    search = ThroughputSearch(device, receiver, args.hardware, args.base, args.flows, args.resolution, args.loss, args.duration, args.timeout, args.fcs)
+    results = search.run(args.sizes, print)
+    print("")
+    for result in results:
+        print(result)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Watches flow specification files and writes their configuration
+again each time one of them is saved.
+"""
+
+import os
+import sys
+import argparse
+
+from config_editor.watch import WatchSession, createWatcher
+from config_editor.compile_cache import CompileCache
+
+def printResults(results):
+    """
+    Print the result of each updated scenario
+    """
+    for scenario, result, duration in results:
+        if isinstance(result, Exception):
+            print("%s: error: %s" % (scenario.specPath, result), flush=True)
+        elif result:
+            print("%s: flows %s recompiled in %.1f ms -> %s" % (scenario.specPath, ",".join(str(i + 1) for i in result), duration * 1e3, scenario.outputPath), flush=True)
+        else:
+            print("%s: unchanged" % scenario.specPath, flush=True)
+
+def main():
+    """
+    Parse the arguments, compile every scenario and watch the files
+    """
+    parser = argparse.ArgumentParser(description="Recompile configurations when flow specification files change.")
+    parser.add_argument("specs", nargs="+", help="flow specification files (JSON), one configuration each")
+    parser.add_argument("-o", "--output", default=".", help="directory of the configurations (<spec name>.txt)")
+    parser.add_argument("--hardware", default="config/hardware.json", help="hardware configuration file")
+    parser.add_argument("--poll", action="store_true", help="check the files periodically instead of using inotify")
+    parser.add_argument("--cache", metavar="DIRECTORY", help="persistent cache of compiled modifiers")
+    parser.add_argument("--once", action="store_true", help="compile once and exit")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    cache = CompileCache(args.cache) if args.cache is not None else None
+    session = WatchSession(args.hardware, args.specs, args.output, cache)
+    printResults(session.update())
+    if args.once:
+        return 0
+    watcher = createWatcher(session.paths, args.poll)
+    print("Watching %d files (%s), Ctrl+C to stop" % (len(session.paths), type(watcher).__name__), flush=True)
+    try:
+        while True:
+            printResults(session.update(watcher.wait()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+from PyQt4 import QtCore
+
+from config_editor import Hardware
+from config_editor.validation import validateHardware
+
+class ExportWorker(QtCore.QObject):
+	"""
+	Validates and exports a snapshot of the hardware,
+	to be run in a thread so that the GUI keeps responding.
+	Results are given back with signals.
+	"""
+
+	# Flows done, flows to do
+	progress = QtCore.pyqtSignal(int, int)
+	# Exported file (empty for validation only), list of issues
+	finished = QtCore.pyqtSignal(str, object)
+	# Error message
+	failed = QtCore.pyqtSignal(str)
+	cancelled = QtCore.pyqtSignal()
+
+	def __init__(self, snapshot, filename = None):
+		"""
+		snapshot: Hardware.snapshot() taken when the export was asked
+		filename: file to export to, None to only validate
+		"""
+		super().__init__()
+		self.__snapshot = snapshot
+		self.__filename = filename
+		self.__cancelled = False
+
+	def cancel(self):
+		"""
+		Ask the worker to stop (called from the GUI thread)
+		"""
+		self.__cancelled = True
+
+	def run(self):
+		"""
+		Validate, then write the configuration flow by flow.
+		The file is replaced only once completely written,
+		the temporary file is removed if cancelled or failed.
+		"""
+		# Temporary file while it is not moved to the destination
+		temporaryPath = None
+		try:
+			hardware = Hardware.fromSnapshot(self.__snapshot)
+			issues = validateHardware(hardware)
+			if self.__filename is None:
+				self.finished.emit("", issues)
+				return
+			indexes = [i for i, flow in enumerate(hardware.flows) if flow.enabled]
+			directory = os.path.dirname(os.path.abspath(self.__filename))
+			with tempfile.NamedTemporaryFile('w', dir = directory, suffix = ".tmp", delete = False) as configFile:
+				temporaryPath = configFile.name
+				for done, index in enumerate(indexes):
+					if self.__cancelled:
+						break
+					self.progress.emit(done, len(indexes))
+					configFile.write(hardware.flowConfigData(index))
+			if self.__cancelled:
+				os.remove(temporaryPath)
+				self.cancelled.emit()
+				return
+			os.replace(temporaryPath, self.__filename)
+			temporaryPath = None
+			self.progress.emit(len(indexes), len(indexes))
+			self.finished.emit(self.__filename, issues)
+		except Exception as e:
+			if temporaryPath is not None:
+				try:
+					os.remove(temporaryPath)
+				except OSError:
+					pass
+			self.failed.emit(str(e))
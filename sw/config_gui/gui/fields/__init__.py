@@ -1,4 +1,22 @@
-from .common import getFieldWidget
-from .unsigned_widget import UnsignedWidget
-from .packet_widget import PacketWidget
-from .select_widget import SelectWidget
\ No newline at end of file
+from .common import getFieldWidget, registerFieldWidgetModule
+
+# Built-in widgets: modules are imported when a field of their type is shown
+registerFieldWidgetModule("UnsignedField", __name__ + ".unsigned_widget")
+registerFieldWidgetModule("PacketField", __name__ + ".packet_widget")
+registerFieldWidgetModule("SelectField", __name__ + ".select_widget")
+
+# Widget classes, imported on first access
+__classModules = {
+	'UnsignedWidget': 'unsigned_widget',
+	'PacketWidget': 'packet_widget',
+	'SelectWidget': 'select_widget'
+}
+
+def __getattr__(name):
+	"""
+	Import a widget class when it is first accessed
+	"""
+	if name in __classModules:
+		from importlib import import_module
+		return getattr(import_module(__name__ + '.' + __classModules[name]), name)
+	raise AttributeError("module " + __name__ + " has no attribute " + name)
\ No newline at end of file
@@ -1,9 +1,19 @@
+from importlib import import_module
+
 __fieldWidgets = {}
+# Widgets that will be registered when their module is imported:
+# field type -> module name
+__fieldWidgetModules = {}
 
 def registerFieldWidget(fieldType, widgetClass):
 	__fieldWidgets[fieldType] = widgetClass
 
+def registerFieldWidgetModule(fieldType, moduleName):
+	__fieldWidgetModules[fieldType] = moduleName
+
 def getFieldWidget(fieldType):
+	if fieldType not in __fieldWidgets and fieldType in __fieldWidgetModules:
+		import_module(__fieldWidgetModules[fieldType])
 	if fieldType in __fieldWidgets:
 		return __fieldWidgets[fieldType]
 	return None
\ No newline at end of file
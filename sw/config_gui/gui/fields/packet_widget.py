@@ -1,14 +1,17 @@
-import re
-
-from PyQt4 import QtGui
+from PyQt4 import QtGui, QtCore
+from config_editor.fields import parseHex
 from .common import registerFieldWidget
 
 class PacketWidget(QtGui.QWidget):
 	"""
 	Represents packet data.
-	For now only the length of a field with 0s can be set.
+	Typed data is sent to the field after a pause in typing
+	or when the input loses focus, not at each key stroke.
 	"""
 
+	# Pause in typing before the value is sent to the field (ms)
+	COMMIT_DELAY = 400
+
 	def __init__(self, field):
 		"""
 		Takes the flow that should be configured
@@ -17,10 +20,15 @@ class PacketWidget(QtGui.QWidget):
 		self.__field = field
 		self.__input = None
 		self.__defaultCheck = None
+		# Restarted at each change, sends the value when it expires
+		self.__commitTimer = QtCore.QTimer(self)
+		self.__commitTimer.setSingleShot(True)
+		self.__commitTimer.setInterval(self.COMMIT_DELAY)
 		# initialize the UI
 		self.__initUI()
 		# Bind events
 		self.__input.textChanged.connect(self.__onInputChanged)
+		self.__commitTimer.timeout.connect(self.__commit)
 		self.__defaultCheck.stateChanged.connect(self.__onDefaultCheckChanged)
 		self.__field.valueChangeEvent+= self.__onFieldChanged
 		self.__field.autoChangeEvent+= self.__onFieldAutoChanged
@@ -28,6 +36,17 @@ class PacketWidget(QtGui.QWidget):
 		self.__input.focusOutEvent = self.__inputFocusOutEvent
 
 
+	def release(self):
+		"""
+		Stop following the field, before the widget is deleted.
+		Data typed but not sent yet is sent first.
+		"""
+		if self.__commitTimer.isActive():
+			self.__commitTimer.stop()
+			self.__commit()
+		self.__field.valueChangeEvent-= self.__onFieldChanged
+		self.__field.autoChangeEvent-= self.__onFieldAutoChanged
+
 	def __initUI(self):
 		"""
 		Initialize the GUI
@@ -52,39 +71,28 @@ class PacketWidget(QtGui.QWidget):
 		Returns the input value tranformed into bytes.
 		The transformation is very permissive and succeeds every time.
 		"""
-		text = self.__input.toPlainText()
-		text = re.sub(r'[^a-fA-F0-9]', '', text)
-		if len(text) % 2 != 0:
-			text = text + "0"
-		while len(text) * 4 < self.__field.minBitSize:
-			text+= "00"
-		text = text[0:int(self.__field.maxBitSize/4)]
-		bytes = bytearray()
-		for i in range(0, int(len(text)/2)):
-			char = text[i*2:(i+1)*2]
-			bytes.append(int(char, 16))
-		return bytes
+		value = parseHex(self.__input.toPlainText())
+		del value[self.__field.maxBitSize // 8:]
+		minSize = self.__field.minBitSize // 8
+		if len(value) < minSize:
+			value+= bytearray(minSize - len(value))
+		return value
 
 	@property
 	def __fieldText(self):
 		"""
 		Returns the field value transformed into a text
-		that can be displayed cleanly in the input
-		"""
-		bytes = self.__field.value
-		count = 0
-		text = ""
-		for byte in bytes:
-			if count > 0:
-				if count % 8 == 0:
-					text+= "\n"
-				elif count % 4 == 0:
-					text+= "\t"
-				else:
-					text+= " "
-			text+= "%02x" % byte
-			count+= 1
-		return text
+		that can be displayed cleanly in the input:
+		8 bytes per line, in 2 groups of 4
+		"""
+		value = self.__field.value
+		lines = []
+		for start in range(0, len(value), 8):
+			line = value[start:start+4].hex(' ')
+			if start + 4 < len(value):
+				line+= "\t" + value[start+4:start+8].hex(' ')
+			lines.append(line)
+		return "\n".join(lines)
 
 	def __setFieldText(self):
 		"""
@@ -96,24 +104,38 @@ class PacketWidget(QtGui.QWidget):
 
 	def __onInputChanged(self, *args):
 		"""
-		Input value changed 
+		Input value changed: wait for a pause before sending it
+		"""
+		self.__commitTimer.start()
+
+	def __commit(self):
+		"""
+		Send the input value to the field, if it changed
 		"""
-		self.__field.userValue = self.__inputValue
+		value = self.__inputValue
+		if value != self.__field.userValue:
+			self.__field.userValue = value
 		self.__field.auto = False
 
 	def __onFieldChanged(self, *args):
 		"""
 		Field changed
 		"""
+		# Data being typed is not replaced
+		if self.__commitTimer.isActive():
+			return
 		if self.__inputValue != self.__field.value:
 			self.__setFieldText()
 
 	def __inputFocusOutEvent(self, event):
 		"""
 		Override the input focus out event
-		to add value cleaning
+		to send the value and clean it
 		"""
 		self.__input.oldFocusOutEvent(event)
+		if self.__commitTimer.isActive():
+			self.__commitTimer.stop()
+			self.__commit()
 		if self.__fieldText != self.__input.toPlainText():
 			self.__setFieldText()
 
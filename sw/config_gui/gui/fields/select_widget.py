@@ -22,6 +22,13 @@ class SelectWidget(QtGui.QWidget):
 		self.__field.autoChangeEvent+= self.__onFieldAutoChanged
 		self.__field.valueChangeEvent+= self.__onFieldValueChanged
 
+	def release(self):
+		"""
+		Stop following the field, before the widget is deleted
+		"""
+		self.__field.autoChangeEvent-= self.__onFieldAutoChanged
+		self.__field.valueChangeEvent-= self.__onFieldValueChanged
+
 	def __initUI(self):
 		"""
 		Initialize the GUI
@@ -5,7 +5,9 @@ from .modifier_widget import ModifierWidget
 
 class FlowWidget(QtGui.QWidget):
 	"""
-	Widget representing the configuration of 1 flow generator
+	Widget representing the configuration of 1 flow generator.
+	Tab contents are created when the tab is shown,
+	and deleted when an other tab is shown.
 	"""
 
 	def __init__(self, flow):
@@ -15,12 +17,17 @@ class FlowWidget(QtGui.QWidget):
 		super().__init__()
 		self.__flow = flow
 		self.__descField = None
+		self.__tabs = None
+		# For each tab: page widget and function creating its content
+		self.__tabPages = []
+		self.__visibleContent = None
 		# initialize the UI
 		self.__initUI()
 		# Bind the events
 		flow.enabledChangeEvent+= self.__setEnabledStatus
 		flow.descriptionChangeEvent+= self.__getDescription
 		self.__descField.textChanged.connect(self.__setDescription)
+		self.__tabs.currentChanged.connect(self.__showTabContent)
 
 	def __initUI(self):
 		"""
@@ -38,21 +45,63 @@ class FlowWidget(QtGui.QWidget):
 		vbox.addWidget(self.__descField)
 		self.__getDescription()
 		# Create the tabs widget
-		tabs = QtGui.QTabWidget()
-		vbox.addWidget(tabs)
+		self.__tabs = QtGui.QTabWidget()
+		vbox.addWidget(self.__tabs)
 		# Show one tab per mandatory modifier
 		# and one tab for other modifiers
 		otherModifiers = []
 		for modifier in self.__flow.modifiers:
 			if modifier.mandatory:
-				tabs.addTab(ModifierWidget(modifier), modifier.name)
+				self.__addTab(modifier.name, lambda modifier = modifier: ModifierWidget(modifier))
 			else:
 				otherModifiers.append(modifier)
 		if otherModifiers:
-			tabs.addTab(ModifiersContainer(otherModifiers), "Modifiers")
+			self.__addTab("Modifiers", lambda: ModifiersContainer(otherModifiers))
+		self.__showTabContent(self.__tabs.currentIndex())
 		# Set the state
 		self.__setEnabledStatus()
 
+	@property
+	def flow(self):
+		"""
+		Configured flow
+		"""
+		return self.__flow
+
+	def release(self):
+		"""
+		Stop following the flow and its modifiers,
+		before the widget is deleted
+		"""
+		self.__flow.enabledChangeEvent-= self.__setEnabledStatus
+		self.__flow.descriptionChangeEvent-= self.__getDescription
+		if self.__visibleContent is not None:
+			self.__visibleContent.release()
+
+	def __addTab(self, name, createContent):
+		"""
+		Add an empty tab, filled by createContent() when shown
+		"""
+		page = QtGui.QWidget()
+		page.setLayout(QtGui.QVBoxLayout())
+		self.__tabs.addTab(page, name)
+		self.__tabPages.append((page, createContent))
+
+	def __showTabContent(self, index):
+		"""
+		Replaces the content of the previous tab by
+		the content of the tab of given index
+		"""
+		if self.__visibleContent is not None:
+			self.__visibleContent.release()
+			self.__visibleContent.parentWidget().layout().removeWidget(self.__visibleContent)
+			self.__visibleContent.deleteLater()
+			self.__visibleContent = None
+		if 0 <= index < len(self.__tabPages):
+			page, createContent = self.__tabPages[index]
+			self.__visibleContent = createContent()
+			page.layout().addWidget(self.__visibleContent)
+
 	def __setEnabledStatus(self, *args):
 		"""
 		Enable or disable the widget depending on the flow
@@ -1,11 +1,22 @@
 from PyQt4 import QtGui, QtCore
 from os.path import expanduser
 
+from config_editor.journal import Journal
+
 from .flow_widget import FlowWidget
+from .export_worker import ExportWorker
+
+# Snapshot and journal of the unsaved changes, kept until a clean exit.
+# Each instance uses its own files (see Journal.instancePath)
+AUTOSAVE_PATH = expanduser('~/.traffic_generator_autosave.gcf')
+# Autosave period (ms)
+AUTOSAVE_INTERVAL = 2000
 
 class MainWindow(QtGui.QMainWindow):
 	"""
-	Main configuration window: to open first
+	Main configuration window: to open first.
+	Only the selected flow has a widget, created when selected:
+	the window does not grow with the number of flow generators.
 	"""
 	def __init__(self, hardware):
 		"""
@@ -21,11 +32,24 @@ class MainWindow(QtGui.QMainWindow):
 		self.__openAction = None
 		self.__exitAction = None
 		self.__exportAction = None
-		self.__flowWidgets = []
+		self.__validateAction = None
+		self.__undoAction = None
+		self.__redoAction = None
+		self.__progressBar = None
+		self.__cancelButton = None
+		# Running export or validation: (thread, worker)
+		self.__worker = None
+		# Threads not finished yet, including the ones of cancelled workers
+		self.__threads = set()
+		self.__flowBox = None
 		self.__visibleFlowWidget = None
 		self.__mainWidget = None
+		# Journal of the changes: autosave and undo
+		self.__journal = None
+		self.__autosaveTimer = None
 		# initialize the UI
 		self.__initUI()
+		self.__startJournal()
 
 	def __initUI(self):
 		"""
@@ -35,6 +59,8 @@ class MainWindow(QtGui.QMainWindow):
 		self.__createMenu()
 		# Initialize the hardware GUI part
 		self.__initHardwareUI()
+		# Export progress, in the status bar
+		self.__createProgressArea()
 
 		# Window size
 		self.resize(500, 300)
@@ -54,8 +80,10 @@ class MainWindow(QtGui.QMainWindow):
 		# Add the flow selection area
 		flowSelectArea = self.__createFlowSelectArea()
 		vbox.addLayout(flowSelectArea)
-		# Add the flow configuration widgets
-		self.__createFlowWidgets(vbox)
+		# Add the flow configuration widget
+		self.__flowBox = QtGui.QVBoxLayout()
+		vbox.addLayout(self.__flowBox)
+		self.__showFlowWidget()
 		vbox.addStretch(1)
 		# Create the main widget
 		self.__mainWidget = QtGui.QWidget()
@@ -68,10 +96,13 @@ class MainWindow(QtGui.QMainWindow):
 		self.__saveAction.triggered.connect(self.__onSave)
 		self.__saveAsAction.triggered.connect(self.__onSaveAs)
 		self.__openAction.triggered.connect(self.__onOpen)
-		self.__exitAction.triggered.connect(QtGui.qApp.quit)
+		self.__exitAction.triggered.connect(self.close)
 		self.__exportAction.triggered.connect(self.__onExportConfig)
+		self.__validateAction.triggered.connect(self.__onValidateConfig)
+		self.__undoAction.triggered.connect(self.__onUndo)
+		self.__redoAction.triggered.connect(self.__onRedo)
 		for flow in self.__hardware.flows:
-			flow.enabledChangeEvent+= self.__updateFlowSelectArea
+			flow.enabledChangeEvent+= self.__onFlowEnabledChange
 
 	def __createMenu(self):
 		"""
@@ -89,6 +120,11 @@ class MainWindow(QtGui.QMainWindow):
 		self.__exitAction.setShortcut('Ctrl+Q')
 		self.__exportAction = QtGui.QAction('&Export to File', self)        
 		self.__exportAction.setShortcut('Ctrl+E')
+		self.__validateAction = QtGui.QAction('&Validate', self)
+		self.__undoAction = QtGui.QAction('&Undo', self)
+		self.__undoAction.setShortcut(QtGui.QKeySequence.Undo)
+		self.__redoAction = QtGui.QAction('&Redo', self)
+		self.__redoAction.setShortcut(QtGui.QKeySequence.Redo)
 
 		menu = self.menuBar()
 		fileMenu = menu.addMenu('&File')
@@ -97,8 +133,56 @@ class MainWindow(QtGui.QMainWindow):
 		fileMenu.addAction(self.__saveAction)
 		fileMenu.addAction(self.__saveAsAction)
 		fileMenu.addAction(self.__exitAction)
+		editMenu = menu.addMenu('&Edit')
+		editMenu.addAction(self.__undoAction)
+		editMenu.addAction(self.__redoAction)
 		configMenu = menu.addMenu('&Configuration')
 		configMenu.addAction(self.__exportAction)
+		configMenu.addAction(self.__validateAction)
+
+	def __startJournal(self):
+		"""
+		Record the changes for autosave and undo,
+		after proposing to recover an unclean exit
+		"""
+		path = Journal.instancePath(AUTOSAVE_PATH)
+		recover = False
+		# Only files of instances that are not running anymore
+		orphans = Journal.orphans(AUTOSAVE_PATH)
+		if orphans:
+			answer = QtGui.QMessageBox.question(self, "Recover changes", "A previous session was not closed properly. Recover its changes?", QtGui.QMessageBox.Yes | QtGui.QMessageBox.No)
+			recover = answer == QtGui.QMessageBox.Yes
+			if recover:
+				Journal.adopt(orphans[0], path)
+			else:
+				Journal.discard(orphans[0])
+		self.__journal = Journal(self.__hardware, path, recover)
+		if self.__journal.recovered:
+			self.statusBar().showMessage(str(self.__journal.recovered) + " changes recovered", 5000)
+		self.__autosaveTimer = QtCore.QTimer(self)
+		self.__autosaveTimer.timeout.connect(self.__journal.autosave)
+		self.__autosaveTimer.start(AUTOSAVE_INTERVAL)
+
+	def __restartJournal(self):
+		"""
+		The whole configuration was replaced: new snapshot, no history
+		"""
+		self.__journal.compact()
+		self.__journal.clearHistory()
+
+	def __createProgressArea(self):
+		"""
+		Create the progress bar and cancel button
+		of exports, hidden until an export starts
+		"""
+		self.__progressBar = QtGui.QProgressBar()
+		self.__progressBar.setMaximumWidth(150)
+		self.__cancelButton = QtGui.QPushButton("Cancel")
+		self.__cancelButton.clicked.connect(self.__onCancelExport)
+		self.statusBar().addPermanentWidget(self.__progressBar)
+		self.statusBar().addPermanentWidget(self.__cancelButton)
+		self.__progressBar.hide()
+		self.__cancelButton.hide()
 
 	def __createFlowSelectArea(self):
 		"""
@@ -116,6 +200,18 @@ class MainWindow(QtGui.QMainWindow):
 		hbox.addWidget(self.__flowEnabler)
 		return hbox
 
+	def __flowText(self, index, flow):
+		"""
+		Text of a flow in the flow selector
+		"""
+		text = "Flow " + str(index+1) + " ("
+		if flow.enabled:
+			text+= "enabled"
+		else:
+			text+= "disabled"
+		text+= ")"
+		return text
+
 	def __updateFlowSelectArea(self, *args, **kwargs):
 		"""
 		Fills the flow selector choices
@@ -124,12 +220,7 @@ class MainWindow(QtGui.QMainWindow):
 		# Choices
 		flowCount = 0
 		for flow in self.__hardware.flows:
-			text = "Flow " + str(flowCount+1) + " ("
-			if flow.enabled:
-				text+= "enabled"
-			else:
-				text+= "disabled"
-			text+= ")"
+			text = self.__flowText(flowCount, flow)
 			if self.__flowSelector.count() <= flowCount:
 				self.__flowSelector.addItem(text, flow)
 			else:
@@ -138,35 +229,35 @@ class MainWindow(QtGui.QMainWindow):
 		# Enabled
 		self.__flowEnabler.setChecked(self.__currentFlow.enabled)
 
-	def __createFlowWidgets(self, layout):
+	def __onFlowEnabledChange(self, flow, *args, **kwargs):
 		"""
-		Creates flow widgets and adds them to the layout 
+		A flow was enabled or disabled: update its choice only
 		"""
-		for flow in self.__hardware.flows:
-			flowWidget = FlowWidget(flow)
-			self.__flowWidgets.append(flowWidget)
-			layout.addWidget(flowWidget)
-			flowWidget.hide()
-		self.__showFlowWidget()
+		index = self.__hardware.flows.index(flow)
+		self.__flowSelector.setItemText(index, self.__flowText(index, flow))
+		if flow is self.__currentFlow:
+			self.__flowEnabler.setChecked(flow.enabled)
 
 	def __showFlowWidget(self):
 		"""
-		Sets the current flow widget as visible
+		Replaces the visible flow widget by
+		a widget of the current flow
 		"""
-		toShow = self.__currentFlowWidget
-		if toShow is self.__visibleFlowWidget:
-			return
+		flow = self.__currentFlow
 		if self.__visibleFlowWidget is not None:
-			self.__visibleFlowWidget.hide()
-		toShow.show()
-		self.__visibleFlowWidget = toShow
-
+			if self.__visibleFlowWidget.flow is flow:
+				return
+			self.__visibleFlowWidget.release()
+			self.__flowBox.removeWidget(self.__visibleFlowWidget)
+			self.__visibleFlowWidget.deleteLater()
+		self.__visibleFlowWidget = FlowWidget(flow)
+		self.__flowBox.addWidget(self.__visibleFlowWidget)
 
 	def __onFlowSelectorChanged(self, currentIndex):
 		"""
 		Other flow selected
 		"""
-		self.__updateFlowSelectArea()
+		self.__flowEnabler.setChecked(self.__currentFlow.enabled)
 		self.__showFlowWidget()
 
 	def __onFlowEnablerChanged(self, state):
@@ -174,13 +265,14 @@ class MainWindow(QtGui.QMainWindow):
 		Flow enabled or disabled
 		"""
 		self.__currentFlow.enabled = self.__flowEnabler.isChecked()
-		self.__updateFlowSelectArea()
 
 	def __onNew(self):
 		"""
 		Start a new configuration
 		"""
-		self.__hardware.reset()
+		with self.__journal.paused():
+			self.__hardware.reset()
+		self.__restartJournal()
 
 	def __onOpen(self):
 		"""
@@ -188,7 +280,9 @@ class MainWindow(QtGui.QMainWindow):
 		"""
 		filename = QtGui.QFileDialog.getOpenFileName(self, 'Open Configuration', expanduser('~/config.gcf'), 'Configuration file (*.gcf)')
 		if filename != '':
-			self.__hardware.load(filename)
+			with self.__journal.paused():
+				self.__hardware.load(filename)
+			self.__restartJournal()
 
 	def __onSave(self):
 		"""
@@ -205,24 +299,142 @@ class MainWindow(QtGui.QMainWindow):
 		if filename != '':
 			self.__hardware.saveTo(filename)
 
+	def __onUndo(self):
+		"""
+		Cancel the last change
+		"""
+		if not self.__journal.undo():
+			self.statusBar().showMessage("Nothing to undo", 2000)
+
+	def __onRedo(self):
+		"""
+		Do again the last cancelled change
+		"""
+		if not self.__journal.redo():
+			self.statusBar().showMessage("Nothing to redo", 2000)
+
 	def __onExportConfig(self):
 		"""
 		Export the current configuration
 		"""
 		filename = QtGui.QFileDialog.getSaveFileName(self, 'Export to File', expanduser('~/config.txt'), 'Text file (*.txt)')
 		if filename != '':
-			self.__hardware.exportConfig(filename)
+			self.__startWorker(filename)
 
-	@property 
-	def __currentFlow(self):
+	def __onValidateConfig(self):
 		"""
-		Flow currently configured
+		Check the current configuration
+		"""
+		self.__startWorker(None)
+
+	def __startWorker(self, filename):
+		"""
+		Export (or only validate if filename is None) a snapshot
+		of the configuration in a thread.
+		A running export is cancelled first.
+		"""
+		self.__onCancelExport()
+		thread = QtCore.QThread(self)
+		worker = ExportWorker(self.__hardware.snapshot(), filename)
+		worker.moveToThread(thread)
+		thread.started.connect(worker.run)
+		worker.progress.connect(self.__onExportProgress)
+		worker.finished.connect(self.__onExportFinished)
+		worker.failed.connect(self.__onExportFailed)
+		for signal in (worker.finished, worker.failed, worker.cancelled):
+			signal.connect(thread.quit)
+		thread.finished.connect(worker.deleteLater)
+		# Forgotten before deleteLater, which waits for the main event loop
+		thread.finished.connect(lambda: self.__threads.discard(thread))
+		thread.finished.connect(thread.deleteLater)
+		self.__threads.add(thread)
+		self.__worker = (thread, worker)
+		self.__progressBar.setValue(0)
+		self.__progressBar.show()
+		self.__cancelButton.show()
+		self.statusBar().showMessage("Exporting..." if filename is not None else "Validating...")
+		thread.start()
+
+	def __endWorker(self, message):
+		"""
+		Hide the progress and show a message
+		"""
+		self.__worker = None
+		self.__progressBar.hide()
+		self.__cancelButton.hide()
+		self.statusBar().showMessage(message, 5000)
+
+	def __onCancelExport(self):
+		"""
+		Cancel the running export, if any
 		"""
-		return self.__flowSelector.itemData(self.__flowSelector.currentIndex())
+		if self.__worker is not None:
+			thread, worker = self.__worker
+			worker.cancel()
+			self.__endWorker("Export cancelled")
+
+	def __onExportProgress(self, done, total):
+		"""
+		Some flows have been exported
+		"""
+		if self.sender() is not self.__currentWorker:
+			return
+		self.__progressBar.setMaximum(total)
+		self.__progressBar.setValue(done)
+
+	def __onExportFinished(self, filename, issues):
+		"""
+		Export or validation done
+		"""
+		if self.sender() is not self.__currentWorker:
+			return
+		if filename:
+			self.__endWorker("Exported to " + filename)
+		else:
+			self.__endWorker("Configuration checked")
+		if issues:
+			QtGui.QMessageBox.warning(self, "Configuration issues", "\n".join(str(issue) for issue in issues))
+		elif not filename:
+			QtGui.QMessageBox.information(self, "Configuration checked", "No issue found.")
+
+	def __onExportFailed(self, message):
+		"""
+		Export error
+		"""
+		if self.sender() is not self.__currentWorker:
+			return
+		self.__endWorker("Export failed")
+		QtGui.QMessageBox.critical(self, "Export failed", message)
+
+	def closeEvent(self, event):
+		"""
+		Stop the running export before closing,
+		and wait for the threads of the cancelled ones
+		"""
+		if self.__worker is not None:
+			thread, worker = self.__worker
+			worker.cancel()
+		for thread in list(self.__threads):
+			thread.quit()
+			thread.wait()
+		self.__threads.clear()
+		# Clean exit: the autosave is not needed anymore
+		self.__autosaveTimer.stop()
+		self.__journal.close()
+		super().closeEvent(event)
+
+	@property
+	def __currentWorker(self):
+		"""
+		Running worker, or None
+		"""
+		if self.__worker is None:
+			return None
+		return self.__worker[1]
 
 	@property 
-	def __currentFlowWidget(self):
+	def __currentFlow(self):
 		"""
-		Flow widget currently active
+		Flow currently configured
 		"""
-		return self.__flowWidgets[self.__flowSelector.currentIndex()]
\ No newline at end of file
+		return self.__flowSelector.itemData(self.__flowSelector.currentIndex())
\ No newline at end of file
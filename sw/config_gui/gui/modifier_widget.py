@@ -12,11 +12,28 @@ class ModifierWidget(QtGui.QWidget):
 		"""
 		super().__init__()
 		self.__modifier = modifier
+		self.__fieldWidgets = []
 		# initialize the UI
 		self.__initUI()
 		# Bind the events
 		modifier.enabledChangeEvent+= self.__setEnabledStatus
 
+	@property
+	def modifier(self):
+		"""
+		Configured modifier
+		"""
+		return self.__modifier
+
+	def release(self):
+		"""
+		Stop following the modifier and its fields,
+		before the widget is deleted
+		"""
+		self.__modifier.enabledChangeEvent-= self.__setEnabledStatus
+		for fieldWidget in self.__fieldWidgets:
+			fieldWidget.release()
+
 	def __initUI(self):
 		"""
 		Initialize the GUI
@@ -32,7 +49,9 @@ class ModifierWidget(QtGui.QWidget):
 			if field.editable:
 				widgetClass = getFieldWidget(field.type)
 				if widgetClass is not None:
-					vbox.addWidget(widgetClass(field))
+					fieldWidget = widgetClass(field)
+					self.__fieldWidgets.append(fieldWidget)
+					vbox.addWidget(fieldWidget)
 		# Layout
 		self.setLayout(vbox)
 		# Status
@@ -4,7 +4,8 @@ from .modifier_widget import ModifierWidget
 
 class ModifiersContainer(QtGui.QWidget):
 	"""
-	Container with a list of modifiers to configure
+	Container with a list of modifiers to configure.
+	Only the selected modifier has a widget, created when selected.
 	"""
 	def __init__(self, modifiers):
 		"""
@@ -14,7 +15,7 @@ class ModifiersContainer(QtGui.QWidget):
 		self.__modifiers = modifiers
 		self.__selector = None
 		self.__enabler = None
-		self.__modifierWidgets = []
+		self.__configBox = None
 		self.__visibleModifierWidget = None
 		# initialize the UI
 		self.__initUI()
@@ -24,6 +25,15 @@ class ModifiersContainer(QtGui.QWidget):
 		for modifier in self.__modifiers:
 			modifier.enabledChangeEvent+= self.__updateSelectArea
 
+	def release(self):
+		"""
+		Stop following the modifiers, before the widget is deleted
+		"""
+		for modifier in self.__modifiers:
+			modifier.enabledChangeEvent-= self.__updateSelectArea
+		if self.__visibleModifierWidget is not None:
+			self.__visibleModifierWidget.release()
+
 	def __initUI(self):
 		"""
 		Initialize the GUI
@@ -34,10 +44,10 @@ class ModifiersContainer(QtGui.QWidget):
 		mainBox.addLayout(selectArea)
 		mainBox.addStretch(1)
 		# Add the modifer configuration widgets
-		configBox = QtGui.QVBoxLayout()
-		self.__createModifierWidgets(configBox)
+		self.__configBox = QtGui.QVBoxLayout()
+		self.__showModifierWidget()
 		configGroup = QtGui.QGroupBox("Configuration")
-		configGroup.setLayout(configBox)
+		configGroup.setLayout(self.__configBox)
 		mainBox.addWidget(configGroup)
 		self.setLayout(mainBox)
 
@@ -79,29 +89,20 @@ class ModifiersContainer(QtGui.QWidget):
 		# Enabled
 		self.__enabler.setChecked(self.__currentModifier.enabled)
 
-	def __createModifierWidgets(self, layout):
-		"""
-		Creates modifier widgets and adds them to the layout 
-		"""
-		for modifier in self.__modifiers:
-			modifierWidget = ModifierWidget(modifier)
-			self.__modifierWidgets.append(modifierWidget)
-			layout.addWidget(modifierWidget)
-			modifierWidget.hide()
-		self.__showModifierWidget()
-
 	def __showModifierWidget(self):
 		"""
-		Sets the current modifier widget as visible
+		Replaces the visible modifier widget by
+		a widget of the current modifier
 		"""
-		toShow = self.__currentModifierWidget
-		if toShow is self.__visibleModifierWidget:
-			return
+		modifier = self.__currentModifier
 		if self.__visibleModifierWidget is not None:
-			self.__visibleModifierWidget.hide()
-		toShow.show()
-		self.__visibleModifierWidget = toShow
-
+			if self.__visibleModifierWidget.modifier is modifier:
+				return
+			self.__visibleModifierWidget.release()
+			self.__configBox.removeWidget(self.__visibleModifierWidget)
+			self.__visibleModifierWidget.deleteLater()
+		self.__visibleModifierWidget = ModifierWidget(modifier)
+		self.__configBox.addWidget(self.__visibleModifierWidget)
 
 	def __onSelectorChanged(self, currentIndex):
 		"""
@@ -122,11 +123,4 @@ class ModifiersContainer(QtGui.QWidget):
 		"""
 		Flow currently configured
 		"""
-		return self.__selector.itemData(self.__selector.currentIndex())
-
-	@property 
-	def __currentModifierWidget(self):
-		"""
-		Flow widget currently active
-		"""
-		return self.__modifierWidgets[self.__selector.currentIndex()]
\ No newline at end of file
+		return self.__selector.itemData(self.__selector.currentIndex())
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Tests of the edit journal (run from sw/config_gui: python3 -m pytest tests)
+"""
+
+import os
+import tempfile
+import unittest
+
+from config_editor import Hardware
+from config_editor.journal import Journal
+from config_editor.skeleton import resizeFlow
+
+HARDWARE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config", "hardware.json")
+
+class JournalTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.hardware = Hardware(HARDWARE)
+		self.journal = Journal(self.hardware, os.path.join(self.directory.name, "autosave.gcf"))
+
+	def tearDown(self):
+		self.journal.close()
+		self.directory.cleanup()
+
+	def sizeField(self):
+		return self.hardware.flows[0].getModifierByType("skeleton_sender").getField("size")
+
+	def test_field_leaving_auto_keeps_its_value(self):
+		"""
+		Recording must not create user values: a field switched out of auto keeps its current value
+		"""
+		resizeFlow(self.hardware.flows[0], 512)
+		size = self.sizeField()
+		size.auto = False
+		self.assertEqual(size.value, 512)
+
+	def test_undo_restores_unset_user_value(self):
+		size = self.sizeField()
+		self.assertFalse(size.hasUserValue)
+		size.userValue = 100
+		size.auto = False
+		self.assertTrue(self.journal.undo())
+		self.assertTrue(size.auto)
+		self.assertFalse(size.hasUserValue)
+		resizeFlow(self.hardware.flows[0], 512)
+		size.auto = False
+		self.assertEqual(size.value, 512)
+
+if __name__ == '__main__':
+	unittest.main()
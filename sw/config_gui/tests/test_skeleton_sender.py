@@ -0,0 +1,46 @@
+"""
+Tests of the compiled skeleton (run from sw/config_gui: python3 -m pytest tests)
+"""
+
+import os
+import unittest
+
+from config_editor import Hardware
+from config_editor.compiled import compileFlow
+from config_editor.flow_table import FlowTable
+
+HARDWARE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config", "hardware.json")
+
+class SkeletonSenderTest(unittest.TestCase):
+
+	def compiledSkeleton(self, packet):
+		"""
+		Hardware and data of the compiled skeleton frame (bus order) of its first flow
+		"""
+		hardware = Hardware(HARDWARE)
+		flow = hardware.flows[0]
+		skeletonSender = flow.getModifierByType("skeleton_sender")
+		data = skeletonSender.getField("data")
+		data.userValue = bytearray(packet)
+		data.auto = False
+		frames = compileFlow(flow).frames
+		return hardware, [frame.data for frame in frames if frame.modifierId == skeletonSender.id][0]
+
+	def test_packet_follows_first_word_in_bus_order(self):
+		"""
+		Words are sent as stored, lane i being byte i of the word:
+		the last incomplete word must be in the first lanes
+		"""
+		for size in (64, 68, 594, 1518, 1522):
+			packet = bytes((i * 7 + 1) & 0xFF for i in range(size))
+			hardware, data = self.compiledSkeleton(packet)
+			self.assertEqual(data[8:8+size], packet, size)
+			self.assertEqual(data[8+size:], bytes(-size % 8), size)
+
+	def test_flow_table_compiles_the_same_bytes(self):
+		hardware, data = self.compiledSkeleton(bytes(range(68)))
+		frames = FlowTable(hardware).compileFlow(0).frames
+		self.assertIn(data, [frame.data for frame in frames])
+
+if __name__ == '__main__':
+	unittest.main()